@@ -0,0 +1,144 @@
+import hashlib
+import os
+import shutil
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+import gdown
+
+
+# --- 🚚 Fetcher : 원격 파일을 dest 경로로 내려받는 함수 ---
+# fetcher(file_id, filename, dest) 형태의 callable이면 무엇이든 ArtifactCache에 끼울 수 있습니다.
+
+def gdrive_fetcher(file_id, filename, dest):
+    """Google Drive에서 파일을 내려받습니다."""
+    gdown.download(id=file_id, output=str(dest), quiet=False)
+
+
+def local_fetcher(source):
+    """로컬 폴더(또는 file:// URL)를 Google Drive 대신 사용하는 fetcher를 만듭니다.
+
+    폴더 안에서 원래 파일명(events.csv 등)을 먼저 찾고, 없으면 파일 ID 이름의 파일을 찾습니다.
+    """
+    if str(source).startswith("file://"):
+        source = url2pathname(urlparse(str(source)).path)
+    root = Path(source)
+
+    def fetch(file_id, filename, dest):
+        for candidate in (root / filename, root / file_id):
+            if candidate.exists():
+                shutil.copyfile(candidate, dest)
+                return
+        raise FileNotFoundError(f"{root}에서 '{filename}'({file_id}) 파일을 찾을 수 없습니다.")
+
+    return fetch
+
+
+def fetcher_from_source(source=None):
+    """데이터 소스 설정값으로 fetcher를 고릅니다. 비어 있으면 Google Drive를 사용합니다."""
+    if not source:
+        return gdrive_fetcher
+    return local_fetcher(source)
+
+
+def _sha256(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ArtifactCache:
+    """파일 ID + 체크섬(SHA-256)으로 키를 잡는 로컬 다운로드 캐시.
+
+    - 캐시 파일명: <file_id>-<sha256>.<확장자>
+    - 다운로드는 임시 파일에 받은 뒤 os.replace로 교체 (원자적 쓰기)
+    - 전체 용량이 max_bytes를 넘으면 가장 오래 사용하지 않은 파일부터 삭제 (LRU)
+    - ttl(초)을 주면 체크섬 없이 찾은 파일은 마지막 확인 후 ttl이 지나면 다시 내려받아 내용(체크섬)이 바뀌었는지 확인
+    """
+
+    def __init__(self, root, max_bytes=5 * 1024**3, fetcher=gdrive_fetcher, ttl=None):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.fetcher = fetcher
+        self.ttl = ttl
+
+    def _entries(self, file_id="*"):
+        return [p for p in self.root.glob(f"{file_id}-*") if not p.name.endswith((".tmp", ".checked"))]
+
+    def _checked_path(self, file_id):
+        """원격 파일을 마지막으로 확인한 시각을 mtime으로 기록하는 표시 파일 (내용이 같으면 캐시 파일은 그대로 둠)"""
+        return self.root / f"{file_id}.checked"
+
+    def _expired(self, file_id, path):
+        if self.ttl is None:
+            return False
+        checked = self._checked_path(file_id)
+        last_checked = max(path.stat().st_mtime, checked.stat().st_mtime if checked.exists() else 0)
+        return time.time() - last_checked > self.ttl
+
+    def lookup(self, file_id, checksum=None):
+        """캐시에 있는 파일 경로를 반환합니다. 없거나 ttl이 지났으면 None (네트워크 I/O 없음)."""
+        if not self.root.exists():
+            return None
+        entries = self._entries(file_id)
+        if checksum is not None:
+            entries = [p for p in entries if p.name.split(".")[0].endswith(f"-{checksum}")]
+        if not entries:
+            return None
+        # 체크섬을 지정하지 않으면 가장 최근에 받은 버전을 사용
+        path = max(entries, key=lambda p: p.stat().st_mtime)
+        # 체크섬으로 내용을 고정한 파일은 ttl과 관계없이 그대로 사용
+        if checksum is None and self._expired(file_id, path):
+            return None
+        # LRU 사용 시각은 atime에 기록 (mtime은 스냅샷 최신 여부 비교에 쓰이므로 유지)
+        os.utime(path, ns=(time.time_ns(), path.stat().st_mtime_ns))
+        return path
+
+    def stale(self, file_id, checksum=None):
+        """받아 둔 파일은 있지만 checksum과 다르거나 ttl이 지나 다시 받아 확인해야 하면 True"""
+        return self.root.exists() and bool(self._entries(file_id)) and self.lookup(file_id, checksum) is None
+
+    def get(self, file_id, filename, checksum=None, refresh=False):
+        """캐시에 있으면 바로 반환하고, 없으면(또는 refresh / ttl 만료) fetcher로 내려받아 저장한 뒤 경로를 반환합니다.
+
+        다시 받은 파일의 체크섬이 가장 최근 캐시 파일과 같으면 그 파일을 그대로 두므로(수정 시각 유지) 스냅샷도 다시 만들지 않습니다.
+        """
+        if not refresh:
+            path = self.lookup(file_id, checksum)
+            if path is not None:
+                return path
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.root / f"{file_id}-{os.getpid()}.tmp"
+        try:
+            self.fetcher(file_id, filename, tmp_path)
+            digest = _sha256(tmp_path)
+            if checksum is not None and digest != checksum:
+                raise ValueError(f"'{filename}' 체크섬 불일치: 기대값 {checksum}, 실제 {digest}")
+            path = self.root / f"{file_id}-{digest}{Path(filename).suffix}"
+            latest = max(self._entries(file_id), key=lambda p: p.stat().st_mtime, default=None)
+            if path != latest:
+                os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        self._checked_path(file_id).touch()
+
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        """전체 용량이 max_bytes 이하가 될 때까지 오래된 파일부터 삭제합니다."""
+        entries = sorted(self._entries(), key=lambda p: p.stat().st_atime)
+        total = sum(p.stat().st_size for p in entries)
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            total -= path.stat().st_size
+            path.unlink()
@@ -0,0 +1,77 @@
+"""차트 캐시 조회 비용 벤치마크: DataFrame 해시 vs (데이터셋 버전, 필터 값) 캐시 키
+
+    python bench/bench_cache_keys.py --rows 2400000 --repeat 5
+
+캐시가 이미 채워진 상태(= 위젯을 바꿔 rerun할 때)에서 차트 함수 한 번 호출에 드는 시간을 비교합니다.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from transformer.versioning import cache_key, stamp_version  # noqa: E402
+
+
+def make_events(rows, seed=0):
+    """events 테이블과 같은 스키마(schema.py)의 합성 데이터를 만듭니다."""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2023-01-01", tz="UTC").value
+    return pd.DataFrame({
+        "user_id": pd.array(rng.integers(1, 100_000, rows), dtype="Int32"),
+        "session_id": rng.integers(0, rows // 5, rows).astype(str).astype(object),
+        "traffic_source": pd.Categorical.from_codes(rng.integers(0, 5, rows),
+                                                    ["Adwords", "Email", "Facebook", "Organic", "YouTube"]),
+        "event_type": pd.Categorical.from_codes(rng.integers(0, 6, rows),
+                                                ["home", "department", "product", "cart", "purchase", "cancel"]),
+        "created_at": pd.to_datetime(rng.integers(start, start + 365 * 86_400 * 10**9, rows), utc=True),
+    })
+
+
+@st.cache_data
+def legacy_chart(events_df, start_date, end_date):
+    """기존 방식: DataFrame 인자 전체가 캐시 키로 해시됨"""
+    return events_df["event_type"].value_counts()
+
+
+@st.cache_data
+def keyed_chart(_events_df, cache_key, start_date, end_date):
+    """새 방식: DataFrame은 해시에서 제외하고 cache_key만 해시됨"""
+    return _events_df["event_type"].value_counts()
+
+
+def time_calls(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return np.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_400_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    events = stamp_version(make_events(args.rows), "events", "bench")
+    dates = ("2023-01-01", "2023-12-31")
+
+    # 첫 호출로 캐시를 채운 뒤, 캐시 적중 시의 rerun 비용만 측정
+    legacy_chart(events, *dates)
+    keyed_chart(events, cache_key(events), *dates)
+    before = time_calls(lambda: legacy_chart(events, *dates), args.repeat)
+    after = time_calls(lambda: keyed_chart(events, cache_key(events), *dates), args.repeat)
+
+    print(f"events {len(events):,} rows, 캐시 적중 1회 호출 (중앙값)")
+    print(f"  before (DataFrame 해시) : {before:10.2f} ms")
+    print(f"  after  (cache_key)      : {after:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
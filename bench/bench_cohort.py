@@ -0,0 +1,131 @@
+"""코호트 엔진 벤치마크: 기존 groupby/merge/pivot 방식 vs transformer.cohort
+
+    python bench/bench_cohort.py --rows 20000000
+    python bench/bench_cohort.py --rows 2000000 --legacy   # 기존 방식과 결과/시간 비교
+    python bench/bench_cohort.py --incremental 0.01        # 1% 새 주문을 증분 반영하는 시간
+                                                           # (+ 이미 반영한 주문을 고친 뒤 전체 재계산과 일치하는지)
+
+orders 테이블과 같은 스키마의 합성 주문으로 일/주/월 코호트 행렬 계산 시간을 측정합니다.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from transformer.cohort import cohort_matrix, complete_order_periods, incremental_cohort_matrix  # noqa: E402
+from transformer.model import build_orders_fact  # noqa: E402
+
+MAX_AGES = {"day": 31, "week": 12, "month": 12}
+
+
+def make_orders(rows, seed=0):
+    """orders 테이블과 같은 스키마(schema.py)의 합성 주문을 만듭니다. (2019~2023년, 사용자당 평균 4건)"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2019-01-01", tz="UTC").value
+    end = pd.Timestamp("2024-01-01", tz="UTC").value
+    return pd.DataFrame({
+        "order_id": np.arange(rows, dtype=np.int32),
+        "user_id": rng.integers(1, max(rows // 4, 2), rows, dtype=np.int32),
+        "status": pd.Categorical.from_codes(rng.choice(4, rows, p=[0.25, 0.5, 0.15, 0.1]),
+                                            ["Cancelled", "Complete", "Processing", "Returned"]),
+        "created_at": pd.to_datetime(rng.integers(start, end, rows), utc=True),
+    })
+
+
+def legacy_monthly_counts(orders, max_age):
+    """기존 차트 함수의 월별 코호트 계산 (문자열 정규화 -> groupby-min -> merge -> grid -> pivot)"""
+    src = orders[["user_id", "created_at", "status"]].copy()
+    src["status"] = src["status"].astype(str).str.strip().str.lower()
+    src = src[src["status"] == "complete"].drop(columns=["status"])
+    src["created_at"] = pd.to_datetime(src["created_at"], utc=True, errors="coerce")
+    last_i = src["created_at"].dt.to_period("M").max().ordinal
+
+    first = src.groupby("user_id", as_index=False)["created_at"].min()
+    first["cohort_month"] = first["created_at"].dt.to_period("M")
+    lab = src.merge(first[["user_id", "cohort_month"]], on="user_id")
+    lab["age"] = lab["created_at"].dt.to_period("M").astype("int64") - lab["cohort_month"].astype("int64")
+    lab = lab[lab["age"] <= max_age]
+
+    grid = pd.MultiIndex.from_product([np.sort(first["cohort_month"].unique()), np.arange(max_age + 1)],
+                                      names=["cohort_month", "age"]).to_frame(index=False)
+    grid = grid[grid["cohort_month"].astype("int64") + grid["age"] <= last_i]
+    counts = lab.groupby(["cohort_month", "age"])["user_id"].nunique().rename("active").reset_index()
+    counts = grid.merge(counts, on=["cohort_month", "age"], how="left").fillna({"active": 0})
+    return counts.pivot(index="cohort_month", columns="age", values="active")
+
+
+def edit_old_orders(orders, split, seed=1):
+    """이미 반영된 주문(앞 split행)을 행 수 / 완료 주문 수는 그대로 두고 고칩니다.
+
+    완료 주문 하나와 다른 상태 주문 하나의 상태를 맞바꾸고, 다른 완료 주문 하나의 user_id를 바꿉니다.
+    """
+    rng = np.random.default_rng(seed)
+    edited = orders.copy()
+    complete = np.flatnonzero(edited["is_complete"].to_numpy()[:split])
+    other = np.flatnonzero(~edited["is_complete"].to_numpy()[:split])
+    a, c = rng.choice(complete, 2, replace=False)
+    b = rng.choice(other)
+    status = edited["status"].to_numpy().copy()
+    status[[a, b]] = status[[b, a]]
+    edited["status"] = pd.Categorical(status, categories=orders["status"].cat.categories)
+    edited["is_complete"] = edited["status"] == "Complete"
+    edited.loc[c, "user_id"] = edited["user_id"].max() + 1
+    return edited
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20_000_000)
+    parser.add_argument("--legacy", action="store_true", help="기존 pandas 방식도 실행해 결과와 시간을 비교")
+    parser.add_argument("--incremental", type=float, metavar="FRACTION",
+                        help="마지막 FRACTION 비율의 주문을 새로 추가된 주문으로 보고 증분 갱신 시간을 측정")
+    args = parser.parse_args()
+
+    orders, seconds = timed(lambda: build_orders_fact(make_orders(args.rows)))
+    print(f"orders {len(orders):,} rows (생성 + 분석 모델 키 계산 {seconds:.2f}s)")
+
+    for granularity, max_age in MAX_AGES.items():
+        (user_ids, periods), prep = timed(lambda: complete_order_periods(orders, granularity))
+        (counts, _), engine = timed(lambda: cohort_matrix(user_ids, periods, max_age))
+        print(f"  {granularity:<5} 엔진 {prep + engine:7.2f}s  ({counts.shape[0]:,} 코호트 x {max_age + 1} age)")
+
+    if args.legacy:
+        legacy, seconds = timed(lambda: legacy_monthly_counts(orders, MAX_AGES["month"]))
+        print(f"  month 기존 {seconds:7.2f}s")
+        counts, _ = cohort_matrix(*complete_order_periods(orders, "month"), MAX_AGES["month"])
+        same = np.allclose(legacy.to_numpy(), counts.loc[:, legacy.columns].to_numpy(), equal_nan=True)
+        print(f"  결과 일치: {same}")
+
+    if args.incremental:
+        # 기존 주문으로 상태를 만든 뒤(order_id 순 추가), 새 주문만 반영하는 시간을 측정
+        split = int(len(orders) * (1 - args.incremental))
+        with tempfile.TemporaryDirectory() as state_dir:
+            for granularity, max_age in MAX_AGES.items():
+                incremental_cohort_matrix(orders.iloc[:split], granularity, max_age, state_dir=state_dir)
+                (counts, _), seconds = timed(
+                    lambda: incremental_cohort_matrix(orders, granularity, max_age, state_dir=state_dir))
+                full, _ = cohort_matrix(*complete_order_periods(orders, granularity), max_age)
+                same = full.equals(counts.astype(full.dtypes.iloc[0]))
+                print(f"  {granularity:<5} 증분 {seconds:7.2f}s  (새 주문 {len(orders) - split:,}건, 전체 재계산과 일치: {same})")
+
+                # 이미 반영한 주문의 상태를 맞바꾸고 user_id를 고친 경우: 지문이 달라져 처음부터 다시 계산해야 함
+                edited = edit_old_orders(orders, split)
+                counts, _ = incremental_cohort_matrix(edited, granularity, max_age, state_dir=state_dir)
+                full, _ = cohort_matrix(*complete_order_periods(edited, granularity), max_age)
+                same = full.equals(counts.astype(full.dtypes.iloc[0]))
+                print(f"  {granularity:<5} 기존 주문 상태 교환 / user_id 수정 후 전체 재계산과 일치: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""차트 렌더링 벤치마크: Figure 캐시(@st.cache_data + st.pyplot) vs 렌더링된 바이트 캐시(figure_cache)
+
+    python bench/bench_figure_cache.py --reruns 50
+
+rerun마다 기존 방식은 캐시된 Figure를 pickle 사본으로 꺼내 PNG로 다시 그리고(st.pyplot과 같은 savefig) Figure가 닫히지 않습니다.
+바이트 캐시는 처음 한 번만 그린 PNG 바이트를 돌려줍니다. rerun당 시간과 열린 Figure 수를 비교하고, 메모리 예산(LRU 삭제)이 지켜지는지 확인합니다.
+"""
+import argparse
+import io
+import pickle
+import resource
+import sys
+import time
+from pathlib import Path
+
+import matplotlib
+
+matplotlib.use("Agg")
+import koreanize_matplotlib  # noqa: F401,E402
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from figure_cache import SAVEFIG_OPTIONS, FigureCache, cache_figure  # noqa: E402
+
+
+def make_chart(cache_key, points=2_000):
+    """Revenue 페이지 차트와 비슷한 크기의 막대 + 선 그래프"""
+    rng = np.random.default_rng(0)
+    fig, ax = plt.subplots(figsize=(12, 6))
+    ax.bar(np.arange(24), rng.random(24) * 1e5)
+    ax.twinx().plot(np.linspace(0, 23, points), rng.random(points).cumsum())
+    ax.set_title("월별 매출")
+    return fig
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reruns", type=int, default=50)
+    args = parser.parse_args()
+
+    # 기존 방식: 캐시에는 pickle된 Figure, rerun마다 사본을 만들어 savefig (닫지 않음)
+    pickled = pickle.dumps(make_chart("v1"))
+    started = time.perf_counter()
+    for _ in range(args.reruns):
+        fig = pickle.loads(pickled)
+        fig.savefig(io.BytesIO(), format="png", **SAVEFIG_OPTIONS)
+    before = (time.perf_counter() - started) / args.reruns * 1000
+    print(f"Figure 캐시   rerun당 {before:7.1f} ms   열린 Figure {len(plt.get_fignums()):3d}   최대 RSS {max_rss_mb():7.1f} MB")
+    plt.close("all")
+
+    cache = FigureCache(max_bytes=4 * 1024**2)
+    chart = cache_figure(make_chart, cache=cache)
+    started = time.perf_counter()
+    for _ in range(args.reruns):
+        rendered = chart("v1")
+    after = (time.perf_counter() - started) / args.reruns * 1000
+    print(f"바이트 캐시   rerun당 {after:7.1f} ms   열린 Figure {len(plt.get_fignums()):3d}   "
+          f"PNG {rendered.nbytes / 1024:.0f} KB, 적중 {cache.hits} / 누락 {cache.misses}")
+
+    # 예산을 넘으면 오래된 항목부터 삭제되어 캐시 크기가 max_bytes 안에 머묾
+    for version in range(200):
+        chart(f"v{version}")
+    print(f"서로 다른 키 200개 후 캐시 {len(cache.entries)}개, {cache.nbytes / 1024**2:.1f} / {cache.max_bytes / 1024**2:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
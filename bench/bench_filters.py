@@ -0,0 +1,82 @@
+"""사이드바 필터 벤치마크: isin 연쇄 필터링 vs 필터 엔진(transformer.filters)
+
+    python bench/bench_filters.py --items 5000000
+
+bench_revenue_cube.py와 같은 합성 테이블에서 Revenue 페이지의 order_items 필터(주문 / 상품 / 사용자 조건)를
+기존 방식과 필터 엔진으로 만들어 시간과 결과 행을 비교합니다. (필터 인덱스 생성은 로딩 시 한 번)
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from bench_revenue_cube import SOURCES, make_tables  # noqa: E402
+from transformer.filters import FilterIndex, key_positions, take  # noqa: E402
+from transformer.model import AGE_LABELS, month_key  # noqa: E402
+
+
+def legacy_filter(orders, order_items, users, products, f):
+    """기존 pages/2 Revenue.py 방식 (users.copy() + isin 마스크 + order_items 3번 필터)"""
+    orders_f = orders[orders["month_key"].isin(f["month_key"]) & orders["status"].isin(f["status"])]
+    users_f = users.copy()
+    users_f = users_f[users_f["gender"] == f["gender"]]
+    users_f = users_f[users_f["age_group"].isin(f["age_group"]) & users_f["traffic_source"].isin(f["traffic_source"])]
+    products_f = products[products["category"].isin(f["category"]) & products["brand"].isin(f["brand"])]
+    items = order_items[order_items["order_id"].isin(orders_f["order_id"])]
+    items = items[items["product_id"].isin(products_f["id"])]
+    return items[items["user_id"].isin(users_f["id"])]
+
+
+def engine_filter(index, order_items, f):
+    orders_mask = index["orders"].mask(month_key=f["month_key"], status=f["status"])
+    users_mask = index["users"].mask(gender=f["gender"], age_group=f["age_group"], traffic_source=f["traffic_source"])
+    products_mask = index["products"].mask(category=f["category"], brand=f["brand"])
+    return take(order_items, index["order_items"].rows(
+        where={"orders": orders_mask, "products": products_mask, "users": users_mask}))
+
+
+def timed(fn, repeat=3):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, np.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    orders, order_items, users, products = make_tables(args.items)
+    started = time.perf_counter()
+    index = {
+        "users": FilterIndex(users, ["gender", "age_group", "traffic_source"]),
+        "orders": FilterIndex(orders, ["month_key", "status"]),
+        "products": FilterIndex(products, ["category", "brand"]),
+        "order_items": FilterIndex(order_items, foreign_keys={
+            "orders": key_positions(order_items["order_id"], orders["order_id"]),
+            "users": key_positions(order_items["user_id"], users["id"]),
+            "products": key_positions(order_items["product_id"], products["id"]),
+        }),
+    }
+    print(f"order_items {len(order_items):,} rows -> 필터 인덱스 생성 {time.perf_counter() - started:.2f}s")
+
+    f = {
+        "month_key": [month_key(2023, m) for m in range(1, 13)], "status": ["Complete"], "gender": "F",
+        "age_group": AGE_LABELS[1:], "traffic_source": SOURCES,
+        "category": products["category"].cat.categories.tolist()[:20],
+        "brand": products["brand"].cat.categories.tolist(),
+    }
+    expected, before = timed(lambda: legacy_filter(orders, order_items, users, products, f))
+    result, after = timed(lambda: engine_filter(index, order_items, f))
+    print(f"  isin 연쇄 {before:9.1f} ms   필터 엔진 {after:8.1f} ms   "
+          f"결과 {len(result):,}행 (일치: {expected.index.equals(result.index)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""퍼널 벤치마크: pandas 단계별 첫 발생 시각 계산 vs 퍼널 엔진(transformer.funnel)
+
+    python bench/bench_funnel.py --rows 2400000 --sessions 500000
+
+같은 합성 events로 단계 목록을 바꿔 가며 closed 퍼널(순서대로, 첫 발생 시각 기준)을 계산하는 시간과 결과를 비교합니다.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from bench_sankey_paths import make_events  # noqa: E402
+from transformer.funnel import FunnelIndex  # noqa: E402
+
+STAGE_LISTS = [
+    [["department", "product"], "cart", "purchase"],
+    ["home", "product", "cart", "purchase"],
+    ["product", "purchase"],
+]
+
+
+def pandas_funnel(events, stages):
+    """세션별 단계 첫 발생 시각을 groupby-min으로 구해 순서대로 비교 (closed 퍼널)"""
+    reached, previous = None, None
+    counts = []
+    for stage in stages:
+        stage = [stage] if isinstance(stage, str) else stage
+        first = events[events["event_type"].isin(stage)].groupby("session_id")["created_at"].min()
+        if reached is None:
+            reached = first
+        else:
+            first = first.reindex(reached.index)
+            reached = first[first >= previous]
+        previous = reached
+        counts.append(len(reached))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_400_000)
+    parser.add_argument("--sessions", type=int, default=500_000)
+    args = parser.parse_args()
+
+    events = make_events(args.rows, args.sessions)
+    events["traffic_source"] = pd.Categorical.from_codes(np.arange(len(events)) % 3, ["Email", "Facebook", "Search"])
+    started = time.perf_counter()
+    index = FunnelIndex.build(events)
+    print(f"events {len(events):,} rows -> 퍼널 인덱스 생성 {time.perf_counter() - started:.2f}s (한 번만)")
+
+    for stages in STAGE_LISTS:
+        started = time.perf_counter()
+        expected = pandas_funnel(events, stages)
+        before = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        result = index.counts(stages, "closed")["total"].tolist()
+        after = (time.perf_counter() - started) * 1000
+        print(f"  {len(stages)}단계  pandas {before:8.1f} ms   퍼널 엔진 {after:6.1f} ms   일치: {expected == result}")
+
+    started = time.perf_counter()
+    index.counts(STAGE_LISTS[0], by="traffic_source")
+    index.counts(STAGE_LISTS[0], by="month")
+    print(f"  유입 경로별 + 월별 {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""차트 집계 벤치마크: pandas vs SQL 백엔드(transformer.backend, DuckDB 또는 sqlite3)
+
+    python bench/bench_query_backend.py --items 1000000                   # DuckDB (pip install -r requirements-sql.txt)
+    python bench/bench_query_backend.py --items 1000000 --engine sqlite   # 정확성 확인용 sqlite 경로
+
+bench_revenue_cube.py와 같은 합성 테이블을 등록한 뒤 Revenue 차트의 집계(월별 매출, 사용자별 주문 수 / 매출,
+카테고리별 매출 / 주문 수)와 Retention 코호트 행렬(일 / 주 / 월)을 두 경로로 실행해 시간과 결과를 비교합니다.
+DuckDB는 orders를 앱처럼 Parquet 파일 뷰(파생 키 컬럼은 SQL 식)로 등록합니다.
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from bench_revenue_cube import make_tables  # noqa: E402
+from transformer.backend import PandasRelation, SqlBackend  # noqa: E402
+from transformer.cohort import cohort_matrix, complete_order_periods  # noqa: E402
+
+AGGREGATIONS = [
+    ("월별 매출", "group_sum", "month_key", "sale_price"),
+    ("사용자별 주문 수", "group_nunique", "user_id", "order_id"),
+    ("사용자별 매출", "group_sum", "user_id", "sale_price"),
+    ("카테고리별 매출", "group_sum", "category", "sale_price"),
+    ("카테고리별 주문 수", "group_nunique", "category", "order_id"),
+]
+
+COHORT_MAX_AGES = {"day": 31, "week": 12, "month": 12}
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def same(a, b):
+    a, b = a.sort_index(), b.sort_index()
+    return (len(a) == len(b) and (a.index.astype(str) == b.index.astype(str)).all()
+            and np.allclose(a.to_numpy(dtype=float), b.to_numpy(dtype=float), rtol=1e-5))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=1_000_000)
+    parser.add_argument("--engine", choices=["duckdb", "sqlite"], default="duckdb")
+    args = parser.parse_args()
+
+    orders, order_items, users, products = make_tables(args.items)
+    order_items["month_key"] = orders["month_key"].to_numpy()[order_items["order_id"].to_numpy() - 1]
+    merged = order_items.assign(category=products["category"].to_numpy()[order_items["product_id"].to_numpy() - 1])
+
+    backend = SqlBackend.connect(engine=args.engine)
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        started = time.perf_counter()
+        tables = {"orders": orders, "order_items": order_items, "users": users, "products": products}
+        if backend.engine == "duckdb":
+            # 스냅샷처럼 원본 컬럼만 Parquet으로 저장하고 뷰로 등록 (day / week / month_key, is_complete는 뷰에서 계산)
+            path = Path(snapshot_dir) / "orders.parquet"
+            orders[["order_id", "user_id", "status", "created_at"]].to_parquet(path)
+            backend.register_parquet("orders", [path])
+            del tables["orders"]
+        for name, df in tables.items():
+            backend.register(name, df)
+        print(f"order_items {len(order_items):,} rows, 엔진 {backend.engine} (등록 {time.perf_counter() - started:.2f}s)")
+        run(backend, orders, merged)
+
+
+def run(backend, orders, merged):
+
+    sql_rel = backend.relation("order_items", where={"orders": {"status": ["Complete"]}}, product_columns=["category"])
+    pandas_rel = PandasRelation(merged[merged["order_id"].isin(orders.loc[orders["status"] == "Complete", "order_id"])])
+    for label, method, by, column in AGGREGATIONS:
+        expected, before = timed(lambda: getattr(pandas_rel, method)(by, column))
+        result, after = timed(lambda: getattr(sql_rel, method)(by, column))
+        print(f"  {label:<10} pandas {before:8.1f} ms   SQL {after:8.1f} ms   일치: {same(expected, result)}")
+
+    orders_rel = backend.relation("orders")
+    for granularity, max_age in COHORT_MAX_AGES.items():
+        (expected, _), before = timed(lambda: cohort_matrix(*complete_order_periods(orders, granularity), max_age))
+        (result, _), after = timed(lambda: orders_rel.cohort_counts(granularity, max_age))
+        print(f"  {granularity + ' 코호트':<10} NumPy  {before:8.1f} ms   SQL {after:8.1f} ms   일치: {expected.equals(result)}")
+
+
+if __name__ == "__main__":
+    main()
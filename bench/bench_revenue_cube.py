@@ -0,0 +1,110 @@
+"""Revenue KPI 벤치마크: 페이지의 isin 필터링 vs 매출 큐브(transformer.cube) roll-up
+
+    python bench/bench_revenue_cube.py --items 5000000
+
+orders / order_items / users / products와 같은 스키마의 합성 데이터로 KPI(매출, 주문 수, 구매자 수, 전체 사용자 수)를
+기본 필터(2023년 전체, Complete)와 좁은 필터(3개월, 여성, 카테고리 3개)에서 계산하는 시간과 결과를 비교합니다.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from transformer.cube import RevenueCube  # noqa: E402
+from transformer.model import AGE_LABELS, build_orders_fact, month_key  # noqa: E402
+
+STATUSES = ["Cancelled", "Complete", "Processing", "Returned", "Shipped"]
+SOURCES = ["Display", "Email", "Facebook", "Organic", "Search"]
+
+
+def make_tables(items, seed=0):
+    """사용자 수 = 상품 수 / 10, 주문 수 = 상품 수 / 1.5 인 합성 테이블 (2023년, 카테고리 26개 / 브랜드 2,000개)"""
+    rng = np.random.default_rng(seed)
+    n_orders, n_users, n_products = int(items / 1.5), max(items // 10, 1), 20_000
+    start = pd.Timestamp("2023-01-01", tz="UTC").value
+    users = pd.DataFrame({
+        "id": np.arange(1, n_users + 1, dtype=np.int32),
+        "gender": pd.Categorical.from_codes(rng.integers(0, 2, n_users), ["F", "M"]),
+        "age_group": pd.Categorical.from_codes(rng.integers(0, len(AGE_LABELS), n_users), AGE_LABELS),
+        "traffic_source": pd.Categorical.from_codes(rng.integers(0, len(SOURCES), n_users), SOURCES),
+    })
+    products = pd.DataFrame({
+        "id": np.arange(1, n_products + 1, dtype=np.int32),
+        "category": pd.Categorical.from_codes(rng.integers(0, 26, n_products), [f"cat{i:02d}" for i in range(26)]),
+        "brand": pd.Categorical.from_codes(rng.integers(0, 2_000, n_products), [f"brand{i:04d}" for i in range(2_000)]),
+    })
+    orders = build_orders_fact(pd.DataFrame({
+        "order_id": np.arange(1, n_orders + 1, dtype=np.int32),
+        "user_id": rng.integers(1, n_users + 1, n_orders, dtype=np.int32),
+        "status": pd.Categorical.from_codes(rng.integers(0, len(STATUSES), n_orders), STATUSES),
+        "created_at": pd.to_datetime(rng.integers(start, start + 365 * 86_400 * 10**9, n_orders), utc=True),
+    }))
+    order_id = rng.integers(1, n_orders + 1, items, dtype=np.int32)
+    # 큐브와 KPI에 필요한 컬럼만 (월 / 상태는 주문 기준)
+    order_items = pd.DataFrame({
+        "order_id": order_id,
+        "user_id": orders["user_id"].to_numpy()[order_id - 1],
+        "product_id": rng.integers(1, n_products + 1, items, dtype=np.int32),
+        "sale_price": rng.gamma(2.0, 30.0, items).astype(np.float32),
+    })
+    return orders, order_items, users, products
+
+
+def page_kpis(orders, order_items, users, products, f):
+    """pages/2 Revenue.py의 기존 KPI 계산 (isin 마스크 연쇄)"""
+    orders_f = orders[orders["month_key"].isin(f["month_key"]) & orders["status"].isin(f["status"])]
+    users_f = users if f["gender"] is None else users[users["gender"].isin(f["gender"])]
+    users_f = users_f[users_f["age_group"].isin(f["age_group"]) & users_f["traffic_source"].isin(f["traffic_source"])]
+    products_f = products[products["category"].isin(f["category"]) & products["brand"].isin(f["brand"])]
+    items = order_items[order_items["order_id"].isin(orders_f["order_id"])]
+    items = items[items["product_id"].isin(products_f["id"])]
+    items = items[items["user_id"].isin(users_f["id"])]
+    return (round(float(items["sale_price"].astype(np.float64).sum()), 2), items["order_id"].nunique(),
+            items["user_id"].nunique(), users_f["id"].nunique())
+
+
+def cube_kpis(cube, f):
+    kpi = cube.rollup(**f)
+    users = cube.user_count(gender=f["gender"], age_group=f["age_group"], traffic_source=f["traffic_source"])
+    return round(kpi["revenue"], 2), kpi["orders"], kpi["users"], users
+
+
+def timed(fn, repeat=3):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, np.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    tables = make_tables(args.items)
+    started = time.perf_counter()
+    cube = RevenueCube.build(*tables)
+    print(f"order_items {args.items:,} rows -> 큐브 셀 {len(cube.cells):,}개 (생성 {time.perf_counter() - started:.2f}s)")
+
+    orders, _, users, products = tables
+    everything = {
+        "month_key": [month_key(2023, m) for m in range(1, 13)], "status": ["Complete"], "gender": None,
+        "age_group": AGE_LABELS, "traffic_source": SOURCES,
+        "category": products["category"].cat.categories.tolist(), "brand": products["brand"].cat.categories.tolist(),
+    }
+    narrow = {**everything, "month_key": [month_key(2023, m) for m in (3, 4, 5)], "gender": ["F"],
+              "category": everything["category"][:3]}
+    for name, f in {"기본 필터": everything, "좁은 필터": narrow}.items():
+        expected, before = timed(lambda: page_kpis(*tables, f), repeat=1)
+        result, after = timed(lambda: cube_kpis(cube, f))
+        print(f"  {name}  isin 필터 {before:9.1f} ms   큐브 {after:8.1f} ms   일치: {expected == result}")
+
+
+if __name__ == "__main__":
+    main()
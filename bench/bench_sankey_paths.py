@@ -0,0 +1,89 @@
+"""Sankey 경로 벤치마크: pandas 정렬 + cumcount vs 세션 경로 엔진(transformer.paths)
+
+    python bench/bench_sankey_paths.py --rows 2400000 --sessions 500000
+
+같은 합성 events로 1년 / 한 달 기간의 단계별 노드 / 전이 수를 계산하는 시간과 결과를 비교합니다.
+(retentioneering step_sankey도 매번 전체 events를 정렬하고 경로를 만드는 pandas 경로와 같은 작업을 합니다)
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from transformer.model import day_key  # noqa: E402
+from transformer.paths import PATH_END, PathIndex, step_transitions  # noqa: E402
+
+EVENT_TYPES = ["home", "department", "product", "cart", "purchase", "cancel"]
+
+
+def make_events(rows, sessions, seed=0):
+    """events 테이블과 같은 스키마(schema.py)의 합성 데이터를 만듭니다. (세션은 하루 안의 이벤트 묶음)"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2023-01-01", tz="UTC").value
+    session = rng.integers(0, sessions, rows)
+    session_start = rng.integers(start, start + 365 * 86_400 * 10**9, sessions)
+    created_at = session_start[session] + rng.integers(0, 3_600 * 10**9, rows)
+    return pd.DataFrame({
+        "session_id": pd.Series(session).map("s{}".format),
+        "event_type": pd.Categorical.from_codes(rng.integers(0, len(EVENT_TYPES), rows), EVENT_TYPES),
+        "created_at": pd.to_datetime(created_at, utc=True),
+    })
+
+
+def pandas_steps(events, start_date, end_date, max_steps):
+    """페이지의 기존 방식: 기간 필터 -> (세션, 시간) 정렬 -> 세션별 단계 번호 -> 단계별 이벤트 수"""
+    start = pd.Timestamp(start_date, tz="UTC")
+    end = pd.Timestamp(end_date, tz="UTC") + pd.Timedelta(days=1)
+    filtered = events[(events["created_at"] >= start) & (events["created_at"] < end)]
+    filtered = filtered.sort_values(["session_id", "created_at"], kind="stable")
+    step = filtered.groupby("session_id").cumcount() + 2       # 1단계는 path_start
+    counts = filtered[step <= max_steps].groupby([step[step <= max_steps], "event_type"], observed=True).size()
+    return counts
+
+
+def timed(fn, repeat=3):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, np.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_400_000)
+    parser.add_argument("--sessions", type=int, default=500_000)
+    parser.add_argument("--steps", type=int, default=10)
+    args = parser.parse_args()
+
+    events = make_events(args.rows, args.sessions)
+    started = time.perf_counter()
+    index = PathIndex.build(events)
+    print(f"events {len(events):,} rows -> 경로 인덱스 생성 {time.perf_counter() - started:.2f}s (한 번만)")
+
+    for label, (start_date, end_date) in {"1년": ("2023-01-01", "2023-12-31"), "한 달": ("2023-06-01", "2023-06-30")}.items():
+        expected, before = timed(lambda: pandas_steps(events, start_date, end_date, args.steps))
+
+        def native():
+            paths = index.paths(day_key(start_date), day_key(end_date), args.steps)
+            return step_transitions(paths, index.names, thresh=0)
+
+        (nodes, _), after = timed(native)
+        result = nodes[(nodes["step"] > 1) & (nodes["event"] != PATH_END)].set_index(["step", "event"])["sessions"]
+        expected.index = pd.MultiIndex.from_arrays([expected.index.get_level_values(0),
+                                                    expected.index.get_level_values(1).astype(str)])
+        same = np.array_equal(expected.sort_index().to_numpy(), result.sort_index().to_numpy())
+        print(f"  {label:<4} pandas {before:8.1f} ms   경로 엔진 {after:8.1f} ms   일치: {same}")
+
+        _, sampled = timed(lambda: step_transitions(
+            index.paths(day_key(start_date), day_key(end_date), args.steps, sample=0.1), index.names, top_k=8))
+        print(f"       세션 10% 표본 + 상위 8개 노드 {sampled:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+"""규모별 벤치마크: 합성 데이터셋(bench/synth.py)으로 스냅샷 / 로더 / 모든 페이지의 차트 함수 시간과 최대 메모리를 측정
+
+    python bench/bench_suite.py --scales 100k,1m --out bench/results/baseline.json
+    python bench/bench_suite.py --scales 100k,1m --out bench/results/new.json --baseline bench/results/baseline.json
+
+규모마다 --data-dir 아래에 합성 데이터셋을 만들고(이미 있으면 재사용), 새 프로세스에서 ZB_DATA_DIR로 그 폴더를 지정해
+1) 테이블별 Parquet 스냅샷 생성, 2) data.py의 로더(@st.cache_data, 첫 호출), 3) 모든 페이지 실행을 측정합니다.
+페이지는 Streamlit AppTest로 실행하고, 차트 모듈의 공개 함수는 캐시를 거치지 않는 원래 함수를 호출하도록 바꿔
+호출마다 시간과 최대 RSS(VmHWM, Linux)를 기록합니다. 결과는 JSON으로 저장되며 --baseline과 비교해 느려진 단계를 표시합니다.
+"""
+import argparse
+import functools
+import inspect
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+CHART_MODULES = ["charts.acquisition_charts", "charts.activation_charts",
+                 "charts.retention_charts", "charts.revenue_charts"]
+PAGES = ["pages/Acquisition.py", "pages/2 Revenue.py", "pages/4 Activation.py", "pages/Retention.py"]
+LOADERS = ["load_all_data", "load_analytics_model", "load_filter_index", "load_revenue_cube",
+           "load_user_index", "load_path_index", "load_funnel_index", "load_demographic_crosstab",
+           "load_distribution_sketches", "load_query_backend"]
+CHART_PREFIXES = ("create_", "calculate_", "analyze_")
+SUFFIXES = {"k": 10**3, "m": 10**6, "b": 10**9}
+
+
+def parse_scale(text):
+    """'100k', '1m', '2500000' -> 행 수"""
+    text = text.strip().lower().replace("_", "")
+    if text[-1] in SUFFIXES:
+        return int(float(text[:-1]) * SUFFIXES[text[-1]])
+    return int(text)
+
+
+# ---------------- 메모리 ----------------
+def _status(field):
+    """/proc/self/status 값(MB). Linux가 아니면 None"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak():
+    """최대 RSS(VmHWM)를 현재 RSS로 되돌립니다. (Linux 4.0+)"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def measure(fn):
+    """fn() 실행 시간(초), 최대 RSS(MB), 실행 전 대비 최대 RSS 증가량(MB)"""
+    _reset_peak()
+    before = _status("VmRSS")
+    started = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - started
+    peak = _status("VmHWM")
+    record = {"seconds": round(seconds, 4), "peak_rss_mb": peak,
+              "peak_delta_mb": None if peak is None or before is None else round(peak - before, 1)}
+    return result, record
+
+
+# ---------------- 워커 (규모 하나) ----------------
+def _instrument_charts(steps):
+    """차트 모듈의 공개 함수를 캐시 없는 원래 함수 + 측정으로 바꿉니다. 페이지는 실행마다 모듈에서 다시 import합니다."""
+    import importlib
+
+    import matplotlib.pyplot as plt
+
+    for module_name in CHART_MODULES:
+        module = importlib.import_module(module_name)
+        for name, func in list(vars(module).items()):
+            if not name.startswith(CHART_PREFIXES) or getattr(func, "__module__", None) != module_name:
+                continue
+            original = inspect.unwrap(func)
+
+            @functools.wraps(original)
+            def timed(*args, _original=original, _label=f"chart:{module_name.split('.')[-1]}.{name}", **kwargs):
+                result, record = measure(lambda: _original(*args, **kwargs))
+                steps.setdefault(_label, record)   # 같은 인자로 여러 번 불리면 첫 호출만 기록
+                return result
+
+            setattr(module, name, timed)
+    return plt
+
+
+def run_worker(data_dir):
+    """ZB_DATA_DIR가 설정된 프로세스에서 실행됩니다. 단계별 측정 결과를 JSON으로 stdout에 출력합니다."""
+    import logging
+    import warnings
+
+    warnings.filterwarnings("ignore")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    os.chdir(ROOT)
+
+    import data
+    from streamlit.testing.v1 import AppTest
+
+    steps = {}
+    for name in [*data.LOCAL_TABLES, *data.DRIVE_TABLES]:
+        rows, steps[f"snapshot:{name}"] = measure(lambda: data._write_snapshot(name))
+        steps[f"snapshot:{name}"]["rows"] = rows
+
+    for name in LOADERS:
+        _, steps[f"loader:{name}"] = measure(getattr(data, name))
+
+    plt = _instrument_charts(steps)
+    for page in PAGES:
+        app, record = measure(lambda: AppTest.from_file(str(ROOT / page), default_timeout=3600).run())
+        record["exceptions"] = [str(e.value) for e in app.exception]
+        steps[f"page:{page}"] = record
+        plt.close("all")
+
+    # 현재 페이지에서 주석 처리되어 호출되지 않는 차트는 페이지와 같은 입력으로 직접 호출
+    from charts import acquisition_charts, retention_charts
+    from transformer.versioning import cache_key
+
+    tables, orders = data.load_all_data(), data.load_analytics_model()["orders"]
+    acquisition_charts.analyze_conversion_rate_by_source_2023(
+        tables["users"], tables["orders"], cache_key(tables["users"], tables["orders"]))
+    retention_charts.create_daily_cohort_heatmap(orders, cache_key(orders), "2023-06", "All", 31)
+    plt.close("all")
+    json.dump(steps, sys.stdout)
+
+
+# ---------------- 부모 프로세스 ----------------
+def prepare(rows, data_dir, seed):
+    """합성 데이터셋 폴더. 같은 행 수 / seed의 manifest가 있으면 다시 만들지 않습니다."""
+    from synth import GENERATOR_VERSION, generate
+
+    manifest = data_dir / "manifest.json"
+    if manifest.exists():
+        meta = json.loads(manifest.read_text())
+        if (meta.get("rows"), meta.get("seed"), meta.get("generator_version")) == (rows, seed, GENERATOR_VERSION):
+            return meta
+    generate(rows, data_dir, seed)
+    return json.loads(manifest.read_text())
+
+
+def run_scale(rows, data_dir):
+    env = dict(os.environ, ZB_DATA_DIR=str(data_dir), ZB_DATA_SOURCE=str(data_dir),
+               ZB_CACHE_DIR=str(data_dir / "cache"), ZB_COHORT_STATE_DIR="", ZB_RESULT_DIR="")
+    # 이전 실행의 스냅샷 / 증분 상태 / 미리 계산된 집계를 쓰지 않도록 새 프로세스에서 측정
+    done = subprocess.run([sys.executable, __file__, "--worker", str(data_dir)], env=env,
+                          capture_output=True, text=True, cwd=ROOT)
+    if done.returncode != 0:
+        raise RuntimeError(f"{rows:,} rows 벤치마크 실패:\n{done.stderr[-4000:]}")
+    return json.loads(done.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold):
+    """기준 결과 대비 threshold배 이상 느려진 단계 목록"""
+    regressions = []
+    for scale, run in results["scales"].items():
+        base = baseline.get("scales", {}).get(scale)
+        if base is None:
+            continue
+        for step, record in run["steps"].items():
+            before = base["steps"].get(step)
+            # 아주 짧은 단계는 측정 오차가 커서 비교하지 않음
+            if before is None or before["seconds"] < 0.05:
+                continue
+            ratio = record["seconds"] / before["seconds"]
+            if ratio >= threshold:
+                regressions.append((scale, step, before["seconds"], record["seconds"], ratio))
+    return regressions
+
+
+def report(scale, run):
+    print(f"\n=== {scale} ({run['rows']:,} rows) ===")
+    for step, record in run["steps"].items():
+        peak = "" if record["peak_rss_mb"] is None else f"{record['peak_rss_mb']:9.0f}MB (+{record['peak_delta_mb']:.0f})"
+        errors = f"  예외 {len(record['exceptions'])}건" if record.get("exceptions") else ""
+        print(f"{step:<64} {record['seconds']:9.3f}s {peak}{errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="100k,1m", help="쉼표로 구분한 행 수 (예: 100k,1m,10m,100m)")
+    parser.add_argument("--data-dir", default=str(ROOT / "bench" / "data"), help="합성 데이터셋 폴더")
+    parser.add_argument("--out", help="결과 JSON 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=1.25, help="이 배수 이상 느려지면 회귀로 표시")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(Path(args.worker))
+        return
+
+    results = {
+        "meta": {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                 "machine": platform.machine(), "cpus": os.cpu_count(), "seed": args.seed},
+        "scales": {},
+    }
+    for scale in args.scales.split(","):
+        rows = parse_scale(scale)
+        data_dir = Path(args.data_dir) / f"{scale.strip().lower()}-seed{args.seed}"
+        manifest, generated = measure(lambda: prepare(rows, data_dir, args.seed))
+        run = {"rows": sum(manifest["tables"].values()), "tables": manifest["tables"]}
+        run["steps"] = {"generate": generated, **run_scale(rows, data_dir)}
+        results["scales"][scale.strip().lower()] = run
+        report(scale, run)
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"\n결과 저장: {args.out}")
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        print(f"\n기준 대비 {args.threshold}배 이상 느려진 단계: {len(regressions)}개")
+        for scale, step, before, after, ratio in regressions:
+            print(f"  {scale:<6} {step:<58} {before:8.3f}s -> {after:8.3f}s ({ratio:.2f}x)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
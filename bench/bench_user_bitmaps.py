@@ -0,0 +1,105 @@
+"""사용자 집계 벤치마크: groupby-nunique vs 사용자 비트맵(transformer.bitmap) vs HLL 스케치(transformer.hll)
+
+    python bench/bench_user_bitmaps.py --rows 2400000 --users 100000
+
+같은 합성 events/users로 DAU(한 달), MAU(1년), 기간 내 순 사용자 수, 세그먼트 순 사용자 수를 계산하는 시간과 결과(HLL은 상대 오차)를 비교합니다.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from transformer.bitmap import UserBitmapIndex  # noqa: E402
+from transformer.hll import UserSketchIndex  # noqa: E402
+from transformer.model import day_key  # noqa: E402
+
+
+def make_tables(rows, users, seed=0):
+    """events/users 테이블과 같은 스키마(schema.py)의 합성 데이터를 만듭니다. (비회원 이벤트 약 10%)"""
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2023-01-01", tz="UTC").value
+    user_id = pd.array(rng.integers(1, users + 1, rows), dtype="Int32")
+    user_id[rng.random(rows) < 0.1] = pd.NA
+    events = pd.DataFrame({
+        "user_id": user_id,
+        "created_at": pd.to_datetime(rng.integers(start, start + 365 * 86_400 * 10**9, rows), utc=True),
+    })
+    users_df = pd.DataFrame({
+        "id": np.arange(1, users + 1, dtype=np.int32),
+        "traffic_source": pd.Categorical.from_codes(rng.integers(0, 5, users),
+                                                    ["Display", "Email", "Facebook", "Organic", "Search"]),
+        "gender": pd.Categorical.from_codes(rng.integers(0, 2, users), ["F", "M"]),
+        "age_group": pd.Categorical.from_codes(rng.integers(0, 6, users), ["10대", "20대", "30대", "40대", "50대", "60대 이상"]),
+        "country": pd.Categorical.from_codes(rng.integers(0, 4, users), ["Brasil", "China", "South Korea", "United States"]),
+    })
+    return events, users_df
+
+
+def timed(fn, repeat=3):
+    timings, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return result, np.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_400_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    args = parser.parse_args()
+
+    events, users = make_tables(args.rows, args.users)
+    started = time.perf_counter()
+    index = UserBitmapIndex.build(events, users)
+    print(f"events {len(events):,} rows, users {len(users):,} -> 인덱스 생성 {time.perf_counter() - started:.2f}s "
+          f"(일별 비트맵 {index.days.nbytes / 2**20:.1f} MB)")
+    started = time.perf_counter()
+    sketches = UserSketchIndex.build(events, users)
+    print(f"{'':>38} HLL 스케치 생성 {time.perf_counter() - started:.2f}s "
+          f"(일별 스케치 {sketches.days.nbytes / 2**20:.1f} MB, 상대 표준오차 {sketches.relative_error:.2%})")
+
+    march = events[events["created_at"].dt.month == 3]
+    segment_ids = users.loc[users["traffic_source"].isin(["Email", "Search"]) & (users["gender"] == "F"), "id"]
+    union_ids = users.loc[users["traffic_source"].isin(["Email", "Search"]), "id"]
+    first, last = day_key("2023-01-01"), day_key("2023-12-31")
+    cases = {
+        "DAU (3월)": (
+            lambda: march.groupby(march["created_at"].dt.date)["user_id"].nunique().to_numpy(),
+            lambda: index.daily_active(day_key("2023-03-01"), day_key("2023-03-31")).to_numpy(),
+            lambda: sketches.daily_active(day_key("2023-03-01"), day_key("2023-03-31")).to_numpy()),
+        "MAU (1년)": (
+            lambda: events.groupby(events["created_at"].dt.to_period("M"))["user_id"].nunique().to_numpy(),
+            lambda: index.period_active(first, last, "month").to_numpy(),
+            lambda: sketches.period_active(first, last, "month").to_numpy()),
+        "순 사용자 (1년)": (
+            lambda: events["user_id"].nunique(),
+            lambda: index.unique_users(first, last),
+            lambda: sketches.unique_users(first, last)),
+        "세그먼트 순 사용자": (
+            lambda: events.loc[events["user_id"].isin(segment_ids), "user_id"].nunique(),
+            lambda: index.unique_users(first, last, index.segment(traffic_source=["Email", "Search"], gender="F")),
+            None),  # HLL은 세그먼트 교집합을 지원하지 않음
+        "세그먼트 합집합": (
+            lambda: events.loc[events["user_id"].isin(union_ids), "user_id"].nunique(),
+            lambda: index.unique_users(first, last, index.segment(traffic_source=["Email", "Search"])),
+            lambda: sketches.unique_users(first, last, sketches.segment(traffic_source=["Email", "Search"]))),
+    }
+    for name, (legacy, bitmap, sketch) in cases.items():
+        expected, before = timed(legacy)
+        result, after = timed(bitmap)
+        line = f"  {name:<12} nunique {before:9.2f} ms   비트맵 {after:8.2f} ms (일치: {np.array_equal(expected, result)})"
+        if sketch is not None:
+            approx, seconds = timed(sketch)
+            error = np.max(np.abs(np.asarray(approx) / np.asarray(expected) - 1))
+            line += f"   HLL {seconds:8.2f} ms (최대 오차 {error:.2%})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
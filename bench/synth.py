@@ -0,0 +1,244 @@
+"""합성 데이터셋 생성기: users / orders / order_items / events / products / inventory_items CSV
+
+    python bench/synth.py --rows 1000000 --out bench/data/1m
+
+schema.py의 TABLE_SCHEMAS와 같은 컬럼으로, 원본(thelook) 데이터와 비슷한 분포의 CSV를 만듭니다.
+  - 사용자 가입은 2019~2023년에 점점 늘어나고, 약 60%가 한 번 이상 주문 (주문 수는 기하분포)
+  - 주문 상품은 주문당 1~4개, 상품 인기도는 멱법칙, 판매가는 상품 정가
+  - events는 주문 세션(home -> department -> product -> cart -> purchase, 취소 주문은 cancel 추가),
+    회원 탐색 세션과 비회원 세션(user_id 없음)으로 구성
+같은 (rows, seed)이면 항상 같은 파일이 만들어지며, 사용자 청크 단위로 생성 / 추가 기록하므로
+1억 행 규모에서도 메모리 사용량은 청크 크기만큼입니다. 폴더의 manifest.json에 테이블별 행 수가 기록됩니다.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from schema import TABLE_SCHEMAS  # noqa: E402
+
+GENERATOR_VERSION = 1
+
+START = pd.Timestamp("2019-01-01", tz="UTC").value
+END = pd.Timestamp("2024-01-01", tz="UTC").value
+DAY_NS = 86_400 * 10**9
+
+# 사용자 한 명당 평균 행 수 (사용자 1 + 주문 0.95 + 주문 상품 1.6 + events 15.4 + inventory_items 4.2 + 상품 0.29)
+ROWS_PER_USER = 23.5
+CHUNK_USERS = 100_000
+MAX_PRODUCTS = 29_120
+
+CATEGORIES = [
+    "Accessories", "Active", "Blazers & Jackets", "Clothing Sets", "Dresses", "Fashion Hoodies & Sweatshirts",
+    "Intimates", "Jeans", "Jumpsuits & Rompers", "Leggings", "Maternity", "Outerwear & Coats", "Pants",
+    "Pants & Capris", "Plus", "Shorts", "Skirts", "Sleep & Lounge", "Socks", "Socks & Hosiery", "Suits",
+    "Suits & Sport Coats", "Sweaters", "Swim", "Tops & Tees", "Underwear",
+]
+COUNTRIES = {
+    "China": 0.34, "United States": 0.22, "Brasil": 0.145, "South Korea": 0.053, "France": 0.047,
+    "United Kingdom": 0.046, "Germany": 0.042, "Spain": 0.04, "Japan": 0.025, "Australia": 0.022,
+    "Belgium": 0.012, "Poland": 0.005, "Colombia": 0.003,
+}
+USER_SOURCES = {"Search": 0.70, "Organic": 0.15, "Facebook": 0.06, "Email": 0.05, "Display": 0.04}
+EVENT_SOURCES = {"Email": 0.45, "Adwords": 0.30, "Facebook": 0.10, "YouTube": 0.10, "Organic": 0.05}
+STATUSES = {"Shipped": 0.30, "Complete": 0.25, "Processing": 0.20, "Cancelled": 0.15, "Returned": 0.10}
+# 세션 안 이벤트 순서 (탐색 세션은 cart까지, 주문 세션은 purchase까지, 취소 주문은 cancel까지)
+FLOW = np.array(["home", "department", "product", "cart", "purchase", "cancel"], dtype=object)
+
+
+def _choice(rng, weights, size):
+    """{값: 비율}에서 size개를 뽑아 Categorical로 반환합니다."""
+    values = list(weights)
+    p = np.array(list(weights.values()), dtype=float)
+    return pd.Categorical.from_codes(rng.choice(len(values), size, p=p / p.sum()), values)
+
+
+def _timestamps(ns):
+    """나노초 배열을 원본 CSV와 같은 초 단위 UTC 시각으로"""
+    return pd.to_datetime(np.asarray(ns, dtype=np.int64) // 10**9 * 10**9, utc=True)
+
+
+def _write(df, path, first):
+    df.to_csv(path, mode="w" if first else "a", header=first, index=False)
+
+
+def _sequence(lengths):
+    """길이 배열 [2, 3] -> 구간 안 위치 [0, 1, 0, 1, 2]"""
+    return np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+
+def _segment_cumsum(values, lengths):
+    """구간(길이 배열)마다 따로 누적합"""
+    total = np.cumsum(values)
+    lengths = lengths[lengths > 0]
+    heads = np.cumsum(lengths) - lengths
+    return total - np.repeat(total[heads] - values[heads], lengths)
+
+
+def make_products(n_products, rng):
+    retail = np.round(np.exp(rng.normal(3.5, 0.8, n_products)), 2).clip(1.5, 999)
+    category = pd.Categorical.from_codes(rng.integers(0, len(CATEGORIES), n_products), CATEGORIES)
+    brand_codes = rng.zipf(1.6, n_products) % max(n_products // 10, 1)
+    return pd.DataFrame({
+        "id": np.arange(1, n_products + 1, dtype=np.int32),
+        "name": [f"Brand{b:04d} {c} {i}" for i, (b, c) in enumerate(zip(brand_codes, category), start=1)],
+        "category": category,
+        "brand": pd.Series(brand_codes).map("Brand{:04d}".format),
+        "department": pd.Categorical.from_codes(rng.integers(0, 2, n_products), ["Men", "Women"]),
+        "cost": np.round(retail * rng.uniform(0.4, 0.6, n_products), 2).astype(np.float32),
+        "retail_price": retail.astype(np.float32),
+    })
+
+
+def make_chunk(first_user, n_users, products, popularity, counters, rng):
+    """사용자 n_users명과 그 사용자들의 주문 / 주문 상품 / events / 재고 행을 만듭니다."""
+    user_ids = np.arange(first_user, first_user + n_users, dtype=np.int64)
+    signup = START + ((END - START) * np.sqrt(rng.random(n_users))).astype(np.int64)   # 가입 수가 점점 증가
+    user_sources = _choice(rng, USER_SOURCES, n_users)
+    users = pd.DataFrame({
+        "id": user_ids,
+        "age": rng.integers(12, 71, n_users),
+        "gender": pd.Categorical.from_codes(rng.integers(0, 2, n_users), ["F", "M"]),
+        "country": _choice(rng, COUNTRIES, n_users),
+        "traffic_source": user_sources,
+        "created_at": _timestamps(signup),
+    })
+
+    # 주문: 약 60%가 주문, 주문 수는 기하분포. 첫 주문은 가입 후 평균 20일, 이후 평균 150일 간격
+    order_counts = np.where(rng.random(n_users) < 0.6, rng.geometric(0.55, n_users), 0)
+    order_users = np.repeat(np.arange(n_users), order_counts)
+    position = _sequence(order_counts)
+    gaps = rng.exponential(np.where(position == 0, 20, 150) * DAY_NS).astype(np.int64)
+    order_time = signup[order_users] + _segment_cumsum(gaps, order_counts)
+    keep = order_time < END
+    order_users, order_time = order_users[keep], order_time[keep]
+    n_orders = len(order_users)
+    order_ids = counters["orders"] + np.arange(n_orders)
+    counters["orders"] += n_orders
+    status = _choice(rng, STATUSES, n_orders)
+    orders = pd.DataFrame({
+        "order_id": order_ids,
+        "user_id": user_ids[order_users],
+        "status": status,
+        "created_at": _timestamps(order_time),
+    })
+
+    # 주문 상품: 주문당 1~4개, 인기 상품 위주
+    item_counts = rng.choice([1, 2, 3, 4], n_orders, p=[0.55, 0.25, 0.12, 0.08])
+    item_orders = np.repeat(np.arange(n_orders), item_counts)
+    item_products = rng.choice(len(products), len(item_orders), p=popularity)
+    order_items = pd.DataFrame({
+        "order_id": order_ids[item_orders],
+        "user_id": user_ids[order_users][item_orders],
+        "product_id": products["id"].to_numpy()[item_products],
+        "status": status[item_orders],
+        "sale_price": products["retail_price"].to_numpy()[item_products],
+        "created_at": orders["created_at"].to_numpy()[item_orders],
+    })
+
+    # events: 주문 세션 + 회원 탐색 세션 + 비회원 세션
+    browse_counts = rng.poisson(3.5, n_users)
+    browse_users = np.repeat(np.arange(n_users), browse_counts)
+    n_browse, n_guest = len(browse_users), int(rng.poisson(2.0 * n_users))
+    cancelled = np.asarray(status == "Cancelled")
+    browse_offset = rng.choice([0, 1, 2], n_browse, p=[0.6, 0.25, 0.15])       # 탐색 세션 시작 단계
+    guest_offset = rng.choice([0, 1, 2], n_guest, p=[0.6, 0.25, 0.15])
+    sessions = pd.DataFrame({
+        "user": np.concatenate([order_users, browse_users, np.full(n_guest, -1)]),
+        "offset": np.concatenate([np.zeros(n_orders, dtype=np.int64), browse_offset, guest_offset]),
+        "length": np.concatenate([
+            5 + cancelled,
+            np.minimum(rng.geometric(0.45, n_browse), 4 - browse_offset),
+            np.minimum(rng.geometric(0.45, n_guest), 4 - guest_offset),
+        ]),
+        "start": np.concatenate([
+            order_time - rng.integers(60, 1_800, n_orders) * 10**9,
+            signup[browse_users] + ((END - signup[browse_users]) * rng.random(n_browse)).astype(np.int64),
+            START + ((END - START) * rng.random(n_guest)).astype(np.int64),
+        ]),
+    })
+    n_sessions = len(sessions)
+    session_ids = counters["sessions"] + np.arange(n_sessions)
+    counters["sessions"] += n_sessions
+    lengths = sessions["length"].to_numpy()
+    event_session = np.repeat(np.arange(n_sessions), lengths)
+    step = _sequence(lengths)
+    gaps = rng.exponential(90 * 10**9, len(step)).astype(np.int64) * (step > 0)     # 이벤트 간격 평균 90초
+    elapsed = _segment_cumsum(gaps, lengths)
+    member = sessions["user"].to_numpy()
+    event_users = pd.array(np.where(member >= 0, user_ids[np.maximum(member, 0)], 0), dtype="Int64")[event_session]
+    event_users[member[event_session] < 0] = pd.NA
+    events = pd.DataFrame({
+        "user_id": event_users,
+        "session_id": session_ids[event_session],
+        "traffic_source": _choice(rng, EVENT_SOURCES, n_sessions)[event_session],
+        "event_type": FLOW[sessions["offset"].to_numpy()[event_session] + step],
+        "created_at": _timestamps(sessions["start"].to_numpy()[event_session] + elapsed),
+    })
+    events = events[events["created_at"] < pd.Timestamp(END, tz="UTC")]
+    events.insert(0, "id", counters["events"] + np.arange(len(events)))
+    counters["events"] += len(events)
+
+    # 재고: 판매된 상품 수의 약 2.6배, 상품 인기도를 따라 입고
+    n_inventory = int(round(len(order_items) * 2.6))
+    inventory_products = rng.choice(len(products), n_inventory, p=popularity)
+    inventory_items = pd.DataFrame({
+        "id": counters["inventory_items"] + np.arange(n_inventory),
+        "product_id": products["id"].to_numpy()[inventory_products],
+        "product_category": products["category"].to_numpy()[inventory_products],
+        "cost": products["cost"].to_numpy()[inventory_products],
+        "created_at": _timestamps(START + ((END - START) * rng.random(n_inventory)).astype(np.int64)),
+    })
+    counters["inventory_items"] += n_inventory
+    return {"users": users, "orders": orders, "order_items": order_items,
+            "events": events, "inventory_items": inventory_items}
+
+
+def generate(rows, out, seed=0):
+    """약 rows행(모든 테이블 합계)의 데이터셋을 out 폴더에 CSV로 만들고 테이블별 행 수를 반환합니다."""
+    out = Path(out)
+    out.mkdir(parents=True, exist_ok=True)
+    n_users = max(int(rows / ROWS_PER_USER), 100)
+    rng = np.random.default_rng(seed)
+    products = make_products(int(np.clip(n_users * 0.29, 500, MAX_PRODUCTS)), rng)
+    popularity = 1.0 / (np.arange(len(products)) + 10) ** 0.8
+    popularity = rng.permutation(popularity / popularity.sum())
+    _write(products[list(TABLE_SCHEMAS["products"])], out / "products.csv", True)
+
+    counts = {"products": len(products)}
+    counters = {"orders": 1, "sessions": 1, "events": 1, "inventory_items": 1}
+    for i, first_user in enumerate(range(1, n_users + 1, CHUNK_USERS)):
+        # 청크마다 (seed, 청크 번호)로 난수를 나눠 같은 rows / seed이면 항상 같은 결과
+        chunk_rng = np.random.default_rng([seed, i])
+        tables = make_chunk(first_user, min(CHUNK_USERS, n_users + 1 - first_user), products, popularity, counters, chunk_rng)
+        for name, df in tables.items():
+            columns = ["id", *TABLE_SCHEMAS[name]] if name == "events" else list(TABLE_SCHEMAS[name])
+            _write(df[columns], out / f"{name}.csv", i == 0)
+            counts[name] = counts.get(name, 0) + len(df)
+
+    manifest = {"generator_version": GENERATOR_VERSION, "rows": rows, "seed": seed, "tables": counts}
+    (out / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="모든 테이블 행 수 합계 (근사)")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    counts = generate(args.rows, args.out, args.seed)
+    for name, count in counts.items():
+        print(f"{name:<16} {count:>14,} rows")
+    print(f"{'total':<16} {sum(counts.values()):>14,} rows  ({time.perf_counter() - started:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,33 @@
 import streamlit as st
 import pandas as pd
-from retentioneering.eventstream import Eventstream
 import matplotlib.pyplot as plt
 import matplotlib.ticker as mticker
 import seaborn as sns
 import koreanize_matplotlib
 import calendar
 from style_config import apply_common_style, PRIMARY_COLOR, SECONDARY_COLOR, CATEGORICAL_PALETTE, DIVERGING_PALETTE, ACCENT_COLOR_1
+from figure_cache import cache_figure, show_error
 import plotly.express as px
+import plotly.graph_objects as go
+import numpy as np
+from data import RESULT_STORE
+from metrics import NoData, acquisition
 
-raw_data_schema={
-        'user_id': 'session_id', 'event_name': 'event_type', 'event_timestamp': 'created_at'
-    }
+# 집계는 metrics.acquisition에서 하고, 여기서는 결과를 그리기만 합니다.
 
 # --- 🎨 차트 생성 함수들 (기능별로 분리 및 캐싱) ---
 
-@st.cache_data
+@cache_figure
 # ✨ 수정: start_date, end_date를 인자로 추가
-def create_mau_revenue_chart(order_items_df, events_df, start_date, end_date):
-    """월별 매출 및 MAU 이중 축 그래프를 생성합니다."""
-    # ✨ 수정: 함수 내부에서 날짜 필터링 수행
-    order_items_filtered = order_items_df
-    events_filtered = events_df
-
-    # (이하 로직은 필터링된 데이터를 사용하도록 수정)
-    valid_status = ['Complete', 'Returned', 'Cancelled']
-    sales_df = order_items_filtered[order_items_filtered['status'].isin(valid_status)].copy()
-    sales_df['month'] = sales_df['created_at'].dt.to_period('M')
-    monthly_revenue = sales_df.groupby('month')['sale_price'].sum()
-    
-    events_filtered['month'] = events_filtered['created_at'].dt.to_period('M')
-    mau = events_filtered.groupby('month')['user_id'].nunique()
+def create_mau_revenue_chart(_order_items_df, _user_index, cache_key, start_date, end_date):
+    """월별 매출 및 MAU 이중 축 그래프를 생성합니다. (MAU는 사용자 비트맵 인덱스로 계산)"""
+    try:
+        # 🧊 MAU는 events를 다시 집계하지 않고 일별 사용자 비트맵을 월 단위로 OR 한 뒤 popcount
+        combined_df = RESULT_STORE.fetch(
+            acquisition.monthly_revenue_mau, (cache_key, start_date, end_date), _order_items_df, _user_index, start_date, end_date)
+    except NoData:
+        return plt.figure(), pd.DataFrame()
 
-    combined_df = pd.DataFrame({'Revenue': monthly_revenue, 'MAU': mau}).fillna(0)
-    if combined_df.empty: return plt.figure(), pd.DataFrame()
-    combined_df.index = combined_df.index.strftime('%Y-%m')
-    
     # (그래프 그리는 부분은 이전과 동일)
     fig, ax1 = plt.subplots(figsize=(12, 6))
     ax1.bar(combined_df.index, combined_df['Revenue'], color=PRIMARY_COLOR, alpha=0.7, label='매출')
@@ -58,40 +50,92 @@ def create_mau_revenue_chart(order_items_df, events_df, start_date, end_date):
 
 @st.cache_data
 # ✨ 수정: start_date, end_date를 인자로 추가
-def create_sankey_chart(events_df,start_date, end_date):
-    """retentioneering으로 생키 차트를 생성합니다."""
-    # ✨ 수정: 함수 내부에서 날짜 필터링 수행
-    events_filtered = events_df
-    event_stream = Eventstream(events_filtered, raw_data_schema=raw_data_schema)
-    fig = event_stream.step_sankey().plot()
+def create_sankey_chart(_path_index, cache_key, start_date, end_date, max_steps=10, thresh=0.05, top_k=None, sample=None):
+    """세션 경로 엔진(transformer.paths)으로 단계별 생키 차트를 생성합니다.
+
+    retentioneering step_sankey와 같이 세션마다 path_start부터 max_steps 단계까지 그리고,
+    단계별 비율이 thresh 미만이거나 상위 top_k개 밖인 이벤트는 '기타'로 묶습니다. sample로 세션 표본만 쓸 수 있습니다.
+    """
+    try:
+        nodes, links, n_sessions = RESULT_STORE.fetch(
+            acquisition.session_paths, (cache_key, start_date, end_date, max_steps, thresh, top_k, sample),
+            _path_index, start_date, end_date, max_steps, thresh=thresh, top_k=top_k, sample=sample)
+    except NoData:
+        return None
+
+    # 노드 위치: x는 단계, y는 단계 안에서 세션 수가 많은 순서로 위에서부터 쌓음
+    n_steps = nodes["step"].max()
+    share = nodes["sessions"] / n_sessions
+    order = nodes.assign(share=share).sort_values(["step", "share"], ascending=[True, False])
+    center = order.groupby("step")["share"].cumsum() - order["share"] / 2
+    x = (nodes["step"] - 1) / max(n_steps - 1, 1) * 0.98 + 0.01
+    y = center.reindex(nodes.index).clip(0.01, 0.99)
+
+    events = list(dict.fromkeys(nodes["event"]))
+    colors = px.colors.qualitative.Plotly
+    color_of = {event: colors[i % len(colors)] for i, event in enumerate(events)}
+    fig = go.Figure(go.Sankey(
+        arrangement="snap",
+        node=dict(
+            label=nodes["event"].tolist(),
+            x=x.tolist(), y=y.tolist(),
+            color=[color_of[event] for event in nodes["event"]],
+            customdata=np.column_stack([nodes["step"], share * 100]),
+            hovertemplate="%{label}<br>단계 %{customdata[0]}<br>세션 %{value:,} (%{customdata[1]:.1f}%)<extra></extra>",
+            pad=10,
+        ),
+        link=dict(
+            source=links["source"].tolist(),
+            target=links["target"].tolist(),
+            value=links["sessions"].tolist(),
+            hovertemplate="%{source.label} → %{target.label}<br>세션 %{value:,}<extra></extra>",
+        ),
+    ))
+    fig.update_layout(height=600, margin=dict(l=10, r=10, t=30, b=10))
     fig.update_traces(textfont=dict(color='black', family='Arial, sans-serif'))
     return fig
 
 @st.cache_data
-def create_funnel_chart(events_df, stages,start_date, end_date):
-    """retentioneering으로 퍼널 차트를 생성합니다."""
-    events_filtered = events_df
-    event_stream = Eventstream(events_filtered, raw_data_schema=raw_data_schema)
-    
+def create_funnel_chart(_funnel_index, cache_key, stages, start_date, end_date, funnel_type="open", window=None):
+    """퍼널 엔진(transformer.funnel)으로 퍼널 차트를 생성합니다. (세션별 이벤트 첫 발생 시각 비교)"""
+    try:
+        counts = RESULT_STORE.fetch(
+            acquisition.funnel_counts, (cache_key, stages, start_date, end_date, funnel_type, window),
+            _funnel_index, stages, start_date, end_date, funnel_type, window)
+    except NoData:
+        return None
+
     # --- ✨ 수정: 퍼널 차트 생성 및 색상 적용 ---
-    fig = event_stream.funnel(stages = stages).plot()
-    
+    fig = go.Figure(go.Funnel(y=counts.index.tolist(), x=counts.tolist(), textinfo="value+percent initial+percent previous"))
+
     # Plotly Figure의 marker 속성을 업데이트하여 색상 리스트를 직접 지정
     # style_config에 정의된 색상들을 활용
-    fig.update_traces(marker=dict(color=[PRIMARY_COLOR, ACCENT_COLOR_1, SECONDARY_COLOR]))
+    palette = [PRIMARY_COLOR, ACCENT_COLOR_1, SECONDARY_COLOR]
+    fig.update_traces(marker=dict(color=[palette[i % len(palette)] for i in range(len(counts))]))
     fig.update_traces(textfont=dict(color='black', family='Arial, sans-serif'))
     return fig
 
+@st.cache_data
+def calculate_funnel_breakdown(_funnel_index, cache_key, stages, start_date, end_date, funnel_type="open", window=None, by="traffic_source"):
+    """퍼널 단계별 도달 세션 수를 유입 경로(또는 'day' / 'week' / 'month')별로 나누고 첫 단계 대비 전환율(%)을 함께 반환합니다."""
+    try:
+        return RESULT_STORE.fetch(
+            acquisition.funnel_breakdown, (cache_key, stages, start_date, end_date, funnel_type, window, by),
+            _funnel_index, stages, start_date, end_date, funnel_type, window, by)
+    except NoData:
+        return None, None
+
 
 # --- ✨ [함수 추가] 유입 경로 분석 함수들 ---
-@st.cache_data
-def create_traffic_distribution_chart(users_df, start_date, end_date):
-    """선택된 기간의 전체 유입 경로 분포 막대그래프를 생성합니다."""
+@cache_figure
+def create_traffic_distribution_chart(_demographics, cache_key, start_date, end_date):
+    """선택된 기간의 전체 유입 경로 분포 막대그래프를 생성합니다. (인구통계 교차표)"""
+    try:
+        traffic_counts = RESULT_STORE.fetch(
+            acquisition.traffic_distribution, (cache_key, start_date, end_date), _demographics, start_date, end_date)
+    except NoData:
+        return None, None
 
-    users_filtered = users_df
-    if users_filtered.empty: return None, None
-    traffic_counts = users_filtered['traffic_source'].value_counts()
-    
     fig, ax = plt.subplots(figsize=(10, 6))
 
     # --- ✨ 수정: 상위 3개와 나머지를 구분하는 색상 팔레트 생성 ---
@@ -105,15 +149,15 @@ def create_traffic_distribution_chart(users_df, start_date, end_date):
     fig.tight_layout()
     return fig, traffic_counts
 
-@st.cache_data
-def create_monthly_traffic_trends_chart(users_df, start_date, end_date):
-    """선택된 기간의 월별 유입 경로 추이 꺾은선 그래프를 생성합니다."""
+@cache_figure
+def create_monthly_traffic_trends_chart(_demographics, cache_key, start_date, end_date):
+    """선택된 기간의 월별 유입 경로 추이 꺾은선 그래프를 생성합니다. (인구통계 교차표)"""
+    try:
+        traffic_over_time = RESULT_STORE.fetch(
+            acquisition.monthly_traffic_trends, (cache_key, start_date, end_date), _demographics, start_date, end_date)
+    except NoData:
+        return None, None
 
-    users_filtered = users_df
-    if users_filtered.empty: return None, None
-    users_filtered['month'] = users_filtered['created_at'].dt.month
-    traffic_over_time = users_filtered.groupby(['month', 'traffic_source']).size().unstack(fill_value=0)
-    
     fig, ax = plt.subplots(figsize=(12, 7))
     traffic_over_time.plot(kind='line', marker='o', ax=ax)
     month_names = [calendar.month_abbr[i] for i in traffic_over_time.index]
@@ -127,17 +171,15 @@ def create_monthly_traffic_trends_chart(users_df, start_date, end_date):
     return fig, traffic_over_time
 
 @st.cache_data
-def create_country_chart(users_df, start_date, end_date, traffic_source):
+def create_country_chart(_demographics, cache_key, start_date, end_date, traffic_source):
     """국가별 분포 지도 차트(Choropleth) 생성"""
-    filtered_users = users_df[users_df['traffic_source'] == traffic_source]
-
-    user_count = len(filtered_users)
-    if user_count == 0:
+    try:
+        user_count, country_counts = RESULT_STORE.fetch(
+            acquisition.country_distribution, (cache_key, start_date, end_date, traffic_source),
+            _demographics, start_date, end_date, traffic_source)
+    except NoData:
         return None, 0, None
 
-    country_counts = filtered_users['country'].value_counts().reset_index()
-    country_counts.columns = ['country', 'user_count']
-
     fig = px.choropleth(
         country_counts,
         locations="country",
@@ -151,35 +193,31 @@ def create_country_chart(users_df, start_date, end_date, traffic_source):
 
     return fig, user_count, country_counts
 
-@st.cache_data
-def create_gender_chart(users_df, start_date, end_date, traffic_source):
+@cache_figure
+def create_gender_chart(_demographics, cache_key, start_date, end_date, traffic_source):
     """성별 분포 파이 차트 생성"""
+    try:
+        gender_counts = RESULT_STORE.fetch(
+            acquisition.gender_distribution, (cache_key, start_date, end_date, traffic_source),
+            _demographics, start_date, end_date, traffic_source)
+    except NoData:
+        return None
 
-    # ✨ 수정: 날짜와 traffic_source로 필터링하는 코드 추가
-    filtered_users = users_df[(users_df['traffic_source'] == traffic_source)]
-
-    if filtered_users.empty: return None
-    
-    gender_counts = filtered_users['gender'].value_counts()
     fig, ax = plt.subplots(figsize=(5, 3))
     ax.pie(gender_counts, labels=gender_counts.index, autopct='%1.1f%%', startangle=90, colors=[PRIMARY_COLOR, SECONDARY_COLOR])
     apply_common_style(fig, ax, title='성별 분포')
     return fig
 
-@st.cache_data
-def create_age_chart(users_df, start_date, end_date, traffic_source):
+@cache_figure
+def create_age_chart(_demographics, cache_key, start_date, end_date, traffic_source):
     """연령대별 분포 막대그래프 생성"""
+    try:
+        age_counts = RESULT_STORE.fetch(
+            acquisition.age_distribution, (cache_key, start_date, end_date, traffic_source),
+            _demographics, start_date, end_date, traffic_source)
+    except NoData:
+        return None
 
-    # ✨ 수정: 날짜와 traffic_source로 필터링하는 코드 추가
-    filtered_users = users_df[users_df['traffic_source'] == traffic_source]
-
-    if filtered_users.empty: return None
-
-    age_bins = [10, 20, 30, 40, 50, 60, 70]
-    age_labels = ['10-19', '20-29', '30-39', '40-49', '50-59', '60-69']
-    filtered_users['age_group'] = pd.cut(filtered_users['age'], bins=age_bins, labels=age_labels, right=False, include_lowest=True)
-    age_counts = filtered_users['age_group'].value_counts().sort_index()
-    
     fig, ax = plt.subplots(figsize=(5, 3))
     sns.barplot(x=age_counts.index, y=age_counts.values, ax=ax, palette=CATEGORICAL_PALETTE)
     ax.set_xlabel('연령대', fontsize=12)
@@ -188,32 +226,14 @@ def create_age_chart(users_df, start_date, end_date, traffic_source):
     fig.tight_layout()
     return fig, age_counts.reset_index()
 
-@st.cache_data
+@cache_figure
 # ==============================================================================
 # 분석 함수 1: 유입 경로별 구매 전환율 분석
 # ==============================================================================
-def analyze_conversion_rate_by_source_2023(users_df, orders_df):
+def analyze_conversion_rate_by_source_2023(_users_df, _orders_df, cache_key):
     """유입 경로별 구매 전환율을 분석하고, 결과 데이터프레임과 차트 Figure를 반환합니다."""
     try:
-        users_copy = users_df.copy()
-        orders_copy = orders_df.copy()
-
-        users_2023 = users_copy
-        orders_2023 = orders_copy
-
-        total_users_by_source = users_2023['traffic_source'].value_counts().reset_index()
-        total_users_by_source.columns = ['traffic_source', 'total_users']
-
-        purchaser_ids_2023 = orders_2023['user_id'].unique()
-        users_2023['is_purchaser'] = users_2023['id'].isin(purchaser_ids_2023)
-        
-        purchasing_users_by_source = users_2023[users_2023['is_purchaser'] == True]['traffic_source'].value_counts().reset_index()
-        purchasing_users_by_source.columns = ['traffic_source', 'purchasing_users']
-
-        conversion_df = pd.merge(total_users_by_source, purchasing_users_by_source, on='traffic_source', how='left')
-        conversion_df['purchasing_users'] = conversion_df['purchasing_users'].fillna(0).astype(int)
-        conversion_df['conversion_rate (%)'] = (conversion_df['purchasing_users'] / conversion_df['total_users']) * 100
-        conversion_df = conversion_df.sort_values(by='conversion_rate (%)', ascending=False).reset_index(drop=True)
+        conversion_df = RESULT_STORE.fetch(acquisition.conversion_by_source, cache_key, _users_df, _orders_df)
 
         # --- ✨ 수정: 상위 3개와 나머지를 구분하는 색상 팔레트 생성 ---
         # 상위 3개는 PRIMARY_COLOR, 나머지는 SECONDARY_COLOR로 설정
@@ -232,25 +252,14 @@ def analyze_conversion_rate_by_source_2023(users_df, orders_df):
         return conversion_df, fig
 
     except Exception as e:
-        st.error(f"구매 전환율 분석 중 오류: {e}")
+        show_error(f"구매 전환율 분석 중 오류: {e}")
         return None, None
     
 @st.cache_data
 # ✨ 수정: start_date, end_date 대신 selected_month를 인자로 받도록 변경
-def calculate_dau_by_month(events_df, selected_month):
-    """선택된 월의 DAU 데이터를 계산하여 반환합니다."""
-    
-    if selected_month == '전체 기간':
-        filtered_events = events_df
-    else:
-        # ✨ 수정: 선택된 'YYYY-MM' 문자열과 일치하는 데이터만 필터링
-        filtered_events = events_df[
-            events_df['created_at'].dt.to_period('M').astype(str) == selected_month
-        ]
-    
-    if filtered_events.empty:
-        return None
-
-    dau = filtered_events.groupby(filtered_events['created_at'].dt.date)['user_id'].nunique()
-    dau.index.name = "날짜"
-    return dau
\ No newline at end of file
+def calculate_dau_by_month(_user_index, cache_key, selected_month):
+    """선택된 월의 DAU 데이터를 계산하여 반환합니다. (사용자 비트맵 인덱스의 일별 popcount)"""
+    try:
+        return RESULT_STORE.fetch(acquisition.dau_by_month, (cache_key, selected_month), _user_index, selected_month)
+    except NoData:
+        return None
\ No newline at end of file
@@ -3,18 +3,14 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import koreanize_matplotlib
 from style_config import apply_common_style, PRIMARY_COLOR, HIGHLIGHT_COLOR, ACCENT_COLOR_1
+from figure_cache import cache_figure
+from data import RESULT_STORE
+from metrics import NoData, activation
 
-@st.cache_data
-def create_monthly_activation_chart(users_filtered, first_orders):
-    """월별 활성화율 꺾은선 그래프를 생성합니다."""
-    users_filtered["signup_month"] = users_filtered["created_at"].dt.to_period("M")
-    merged = users_filtered.merge(first_orders, left_on="id", right_on="user_id", how="left")
-
-    monthly_df = (
-        merged.groupby("signup_month")
-        .agg(total_users=("id","nunique"),
-             activated_users=("first_order_month", lambda x: x.notna().sum())))
-    monthly_df["activation_rate"] = monthly_df["activated_users"] / monthly_df["total_users"] * 100
+@cache_figure
+def create_monthly_activation_chart(_user_segments, cache_key):
+    """월별 활성화율 꺾은선 그래프를 생성합니다. (세그먼트별 사용자 수 / 활성화 수 표 사용)"""
+    monthly_df = RESULT_STORE.fetch(activation.activation_rates, (cache_key, "signup_month"), _user_segments, "signup_month")
 
     fig, ax = plt.subplots(figsize=(10,5))
     monthly_df["activation_rate"].plot(marker="o", ax=ax, color=PRIMARY_COLOR)
@@ -24,15 +20,10 @@ def create_monthly_activation_chart(users_filtered, first_orders):
     apply_common_style(fig, ax, title="월별 활성화율 (%)")
     return monthly_df, fig
 
-@st.cache_data
-def create_activation_by_gender_chart(users_filtered):
+@cache_figure
+def create_activation_by_gender_chart(_user_segments, cache_key):
     """성별 활성화율 막대그래프를 생성합니다."""
-    gender_df = (
-        users_filtered.groupby("gender")
-        .agg(total_users=("id", "nunique"),
-             activated_users=("activated", "sum"))
-        .reset_index())
-    gender_df["activation_rate"] = (gender_df["activated_users"] / gender_df["total_users"] * 100)
+    gender_df = RESULT_STORE.fetch(activation.activation_rates, (cache_key, "gender"), _user_segments, "gender").reset_index()
 
     fig, ax = plt.subplots(figsize=(5,4))
     bars = ax.bar(gender_df["gender"], gender_df["activation_rate"], color=HIGHLIGHT_COLOR)
@@ -43,15 +34,10 @@ def create_activation_by_gender_chart(users_filtered):
     apply_common_style(fig, ax, title="성별 활성화율")
     return gender_df, fig
 
-@st.cache_data
-def create_activation_by_traffic_source_chart(users_filtered):
+@cache_figure
+def create_activation_by_traffic_source_chart(_user_segments, cache_key):
     """유입 경로별 활성화율 막대그래프를 생성합니다."""
-    channel_df = (
-        users_filtered.groupby("traffic_source")
-        .agg(total_users=("id", "nunique"),
-             activated_users=("activated", "sum"))
-        .reset_index())
-    channel_df["activation_rate"] = (channel_df["activated_users"] / channel_df["total_users"] * 100)
+    channel_df = RESULT_STORE.fetch(activation.activation_rates, (cache_key, "traffic_source"), _user_segments, "traffic_source").reset_index()
 
     fig, ax = plt.subplots(figsize=(5,4))
     bars = ax.bar(channel_df["traffic_source"], channel_df["activation_rate"], color=PRIMARY_COLOR)
@@ -63,20 +49,10 @@ def create_activation_by_traffic_source_chart(users_filtered):
     apply_common_style(fig, ax, title="유입 경로별 활성화율")
     return channel_df, fig
 
-@st.cache_data
-def create_activation_by_age_chart(users_filtered):
-    """연령대별 활성화율 꺾은선 그래프를 생성합니다."""
-    bins = [0, 20, 30, 40, 50, 60, 100]
-    labels = ["<20", "20s", "30s", "40s", "50s", "60+"]
-    users_filtered["age_group"] = pd.cut(users_filtered["age"], bins=bins, labels=labels, right=False)
-
-    age_df = (
-        users_filtered.groupby("age_group")
-        .agg(total_users=("id", "nunique"),
-             activated_users=("activated", "sum"))
-        .reset_index()
-    )
-    age_df["activation_rate"] = (age_df["activated_users"] / age_df["total_users"] * 100)
+@cache_figure
+def create_activation_by_age_chart(_user_segments, cache_key):
+    """연령대별 활성화율 꺾은선 그래프를 생성합니다. (세그먼트 표의 age_group 사용)"""
+    age_df = RESULT_STORE.fetch(activation.activation_rates, (cache_key, "age_group", True), _user_segments, "age_group", all_groups=True).reset_index()
 
     fig, ax = plt.subplots(figsize=(5,4))
     ax.plot(age_df["age_group"], age_df["activation_rate"], 
@@ -87,13 +63,14 @@ def create_activation_by_age_chart(users_filtered):
     apply_common_style(fig, ax, title="연령대별 활성화율")
     return age_df, fig
 
-@st.cache_data
-def create_first_purchase_category_chart(first_order_items):
-    """첫 구매 카테고리 Top 5 막대그래프를 생성합니다."""
-    if first_order_items.empty:
+@cache_figure
+def create_first_purchase_category_chart(_category_segments, cache_key):
+    """첫 구매 카테고리 Top 5 막대그래프를 생성합니다. (세그먼트 x 카테고리별 상품 수 표 사용)"""
+    try:
+        category_counts = RESULT_STORE.fetch(activation.first_purchase_categories, cache_key, _category_segments)
+    except NoData:
         return None, None
-    
-    category_counts = first_order_items["category"].value_counts().head(5)
+
     fig, ax = plt.subplots(figsize=(4,4))
     category_counts.plot(kind="bar", ax=ax, color=HIGHLIGHT_COLOR)
     ax.set_ylabel("Users")
@@ -103,17 +80,18 @@ def create_first_purchase_category_chart(first_order_items):
     apply_common_style(fig, ax, title="첫 구매 카테고리 Top 5")
     return category_counts, fig
 
-@st.cache_data
-def create_ttfp_histogram(users_first_purchase):
-    """첫 구매까지 걸린 시간(TTFP) 히스토그램을 생성합니다."""
-    if users_first_purchase.empty:
+@cache_figure
+def create_ttfp_histogram(_ttfp_sketch, cache_key):
+    """첫 구매까지 걸린 시간(TTFP) 히스토그램을 생성합니다. (필터에 맞게 합친 TTFP 스케치 사용)"""
+    try:
+        user_counts, edges = RESULT_STORE.fetch(activation.ttfp_histogram, cache_key, _ttfp_sketch)
+    except NoData:
         return None, None
-        
+
     fig, ax = plt.subplots(figsize=(4,4))
-    users_first_purchase["ttfp_days"].plot(
-        kind="hist", bins=20, ax=ax, color=ACCENT_COLOR_1, alpha=0.7
-    )
+    # 일 단위 구간의 사용자 수를 그대로 그림 (사용자별 일 수로 그린 히스토그램과 같음)
+    ax.hist(edges[:-1], bins=edges, weights=user_counts, color=ACCENT_COLOR_1, alpha=0.7)
     ax.set_xlabel("Days")
     ax.set_ylabel("Users")
     apply_common_style(fig, ax, title="첫 구매까지 걸린 시간(일)")
-    return users_first_purchase, fig
\ No newline at end of file
+    return user_counts, fig
\ No newline at end of file
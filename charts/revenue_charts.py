@@ -1,21 +1,22 @@
 import streamlit as st
 import matplotlib.pyplot as plt
-import math
 import textwrap
 import koreanize_matplotlib
 from style_config import apply_common_style, PRIMARY_COLOR, SECONDARY_COLOR, ACCENT_COLOR_1, HIGHLIGHT_COLOR
+from figure_cache import cache_figure
+from data import RESULT_STORE
+from metrics import NoData, revenue
 
-@st.cache_data
-def create_monthly_revenue_chart(order_items_filtered):
+# 집계는 metrics.revenue에서 as_relation()으로 감싸 실행하므로 DataFrame 대신 SQL 백엔드의 SqlRelation(transformer.backend)을 넘겨도 됩니다.
+
+@cache_figure
+def create_monthly_revenue_chart(_order_items_filtered, cache_key):
     """월별 매출 추이 꺾은선 그래프를 생성합니다."""
-    if order_items_filtered.empty:
+    try:
+        monthly_revenue = RESULT_STORE.fetch(revenue.monthly_revenue, cache_key, _order_items_filtered)
+    except NoData:
         return None
 
-    monthly_revenue = (
-        order_items_filtered
-        .groupby(order_items_filtered["created_at"].dt.to_period("M"))["sale_price"].sum().reset_index())
-    monthly_revenue["created_at"] = monthly_revenue["created_at"].dt.to_timestamp()
-
     fig, ax = plt.subplots(figsize=(8,4), dpi=80)
     ax.plot(monthly_revenue["created_at"], monthly_revenue["sale_price"], marker="o", linestyle="-", color=PRIMARY_COLOR)
     ax.set_xlabel("Month")
@@ -25,15 +26,13 @@ def create_monthly_revenue_chart(order_items_filtered):
     apply_common_style(fig, ax, title="월별 매출 추이")
     return fig
 
-@st.cache_data
-def create_purchase_frequency_chart(order_items_filtered):
+@cache_figure
+def create_purchase_frequency_chart(_order_items_filtered, cache_key):
     """구매 횟수별 사용자 분포 막대그래프를 생성합니다."""
-    if order_items_filtered.empty:
+    try:
+        purchase_freq = RESULT_STORE.fetch(revenue.purchase_frequency, cache_key, _order_items_filtered)
+    except NoData:
         return None
-    
-    user_order_counts = order_items_filtered.groupby("user_id")["order_id"].nunique().reset_index()
-    user_order_counts.rename(columns={"order_id": "num_orders"}, inplace=True)
-    purchase_freq = user_order_counts["num_orders"].value_counts().sort_index()
 
     fig, ax = plt.subplots(figsize=(5,4))
     if not purchase_freq.empty:
@@ -49,38 +48,41 @@ def create_purchase_frequency_chart(order_items_filtered):
         ax.axis("off")
     return fig
 
-@st.cache_data
-def create_revenue_contribution_chart(order_items_filtered):
+@cache_figure
+def create_revenue_contribution_chart(_order_items_filtered, cache_key):
     """상위 10% 고객의 매출 기여도 파이 차트를 생성합니다."""
-    if order_items_filtered.empty:
+    try:
+        contribution = RESULT_STORE.fetch(revenue.revenue_contribution, cache_key, _order_items_filtered)
+    except NoData:
         return None
 
-    user_revenue = order_items_filtered.groupby("user_id")["sale_price"].sum().reset_index().sort_values("sale_price", ascending=False).reset_index(drop=True)
-    total_rev_users = user_revenue["sale_price"].sum()
-    top_10pct_count = max(1, math.ceil(len(user_revenue) * 0.10)) if len(user_revenue) > 0 else 0
-    top_10pct_revenue = user_revenue.head(top_10pct_count)["sale_price"].sum()
-
     fig, ax = plt.subplots(figsize=(5,4))
-    if top_10pct_count > 0 and total_rev_users > 0:
-        labels = ["Top 10%", "Others"]
-        values = [top_10pct_revenue, total_rev_users - top_10pct_revenue]
-        ax.pie(values, labels=labels, autopct='%1.1f%%', startangle=90, colors=[SECONDARY_COLOR,"lightgrey"])
+    if not contribution.empty:
+        ax.pie(contribution.to_numpy(), labels=contribution.index.tolist(), autopct='%1.1f%%', startangle=90, colors=[SECONDARY_COLOR,"lightgrey"])
         apply_common_style(fig, ax, title="매출 기여도 (상위 10% vs 기타)")
     else:
         ax.text(0.5, 0.5, "No data", ha="center", va="center")
         ax.axis("off")
     return fig
 
-@st.cache_data
-def create_revenue_distribution_chart(order_items_filtered):
-    """사용자별 매출 분포 히스토그램을 생성합니다."""
-    if order_items_filtered.empty:
+@cache_figure
+def create_revenue_distribution_chart(_order_items_filtered, cache_key, _revenue_sketch=None):
+    """사용자별 매출 분포 히스토그램을 생성합니다.
+
+    _revenue_sketch : 필터에 맞게 합친 사용자별 매출 스케치. 있으면 주문 상품 행 대신 스케치로 계산
+    """
+    try:
+        if _revenue_sketch is not None:
+            user_counts, edges = RESULT_STORE.fetch(revenue.sketch_distribution, cache_key, _revenue_sketch)
+        else:
+            user_counts, edges = RESULT_STORE.fetch(revenue.revenue_distribution, cache_key, _order_items_filtered)
+    except NoData:
         return None
-    
-    user_revenue = order_items_filtered.groupby("user_id")["sale_price"].sum().reset_index()
+
     fig, ax = plt.subplots(figsize=(5,4))
-    if not user_revenue.empty:
-        ax.hist(user_revenue["sale_price"], bins=20, color=ACCENT_COLOR_1, alpha=0.7)
+    if user_counts.sum() > 0:
+        # 저장된 구간별 사용자 수를 그대로 그림 (사용자별 매출로 그린 히스토그램과 같음)
+        ax.hist(edges[:-1], bins=edges, weights=user_counts, color=ACCENT_COLOR_1, alpha=0.7)
         ax.set_xlabel("Revenue per User ($)")
         ax.set_ylabel("Number of Users")
         apply_common_style(fig, ax, title="사용자별 매출 분포")
@@ -89,17 +91,17 @@ def create_revenue_distribution_chart(order_items_filtered):
         ax.axis("off")
     return fig
 
-@st.cache_data
-def create_top_revenue_chart(order_items_merged, by='category'):
+@cache_figure
+def create_top_revenue_chart(_order_items_merged, cache_key, by='category'):
     """카테고리 또는 상품별 상위 10개 매출 막대그래프를 생성합니다."""
-    if order_items_merged.empty:
+    try:
+        rev_plot = RESULT_STORE.fetch(revenue.top_revenue, (cache_key, by), _order_items_merged, by).copy()
+    except NoData:
         return None
 
-    group_col = 'category' if by == 'category' else 'name'
     color = PRIMARY_COLOR if by == 'category' else SECONDARY_COLOR
     title = "카테고리별 매출 Top 10" if by == 'category' else "상품별 매출 Top 10"
 
-    rev_plot = order_items_merged.groupby(group_col)["sale_price"].sum().sort_values(ascending=False).head(10).copy()
     rev_plot.index = [textwrap.shorten(str(c), width=25, placeholder="...") for c in rev_plot.index]
 
     fig, ax = plt.subplots(figsize=(5,4))
@@ -115,16 +117,13 @@ def create_top_revenue_chart(order_items_merged, by='category'):
         ax.text(0.5, 0.5, "No data", ha="center", va="center"); ax.axis("off")
     return fig
 
-@st.cache_data
-def create_category_aov_chart(order_items_merged):
+@cache_figure
+def create_category_aov_chart(_order_items_merged, cache_key):
     """카테고리별 객단가(AOV) 막대그래프를 생성합니다."""
-    if order_items_merged.empty:
+    try:
+        cat_aov_plot = RESULT_STORE.fetch(revenue.category_aov, cache_key, _order_items_merged).copy()
+    except NoData:
         return None
-    
-    cat_rev_full = order_items_merged.groupby("category")["sale_price"].sum()
-    cat_ord_full = order_items_merged.groupby("category")["order_id"].nunique()
-    cat_aov_full = (cat_rev_full / cat_ord_full).dropna()
-    cat_aov_plot = cat_aov_full.sort_values(ascending=False).head(10).copy()
     cat_aov_plot.index = [textwrap.shorten(str(c), width=25, placeholder="...") for c in cat_aov_plot.index]
 
     fig, ax = plt.subplots(figsize=(5,4))
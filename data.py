@@ -1,92 +1,577 @@
 import streamlit as st
 import pandas as pd
 from pathlib import Path  # 1. pathlib 임포트
-import gdown  # 1. gdown 라이브러리 임포트
-import os     # 2. 파일 삭제를 위해 임포트
+import itertools
+import os
+import time
+import logging
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from artifact_cache import ArtifactCache, fetcher_from_source
+from result_store import ResultStore
+from partitions import PartitionedTable, arrow_schema
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pandas.api.types import union_categoricals
+from schema import read_csv_kwargs, datetime_columns, schema_version
+from transformer.model import AGE_BUCKET_LABELS, AGE_BUCKETS, build_analytics_model
+from transformer.backend import SqlBackend
+from transformer.bitmap import UserBitmapIndex
+from transformer.cube import RevenueCube
+from transformer.demographics import DemographicCrosstab
+from transformer.filters import FilterIndex, key_positions
+from transformer.funnel import FunnelIndex
+from transformer.hll import UserSketchIndex
+from transformer.paths import PathIndex
+from transformer.sketch import DistributionSketches
+from transformer.timeindex import sort_by_time
+from transformer.versioning import dataset_version, stamp_source, stamp_version
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+# 로컬 CSV / 스냅샷 폴더 (ZB_DATA_DIR로 합성 데이터셋 폴더 등을 지정 가능)
+BASE_PATH = Path(os.environ.get("ZB_DATA_DIR", SCRIPT_DIR / "data"))
+# 파싱이 끝난 테이블을 저장해 두는 Parquet 스냅샷 폴더
+SNAPSHOT_PATH = BASE_PATH / "snapshots"
+# 코호트 히트맵 증분 상태 (비워 두면 매번 전체 주문으로 다시 계산)
+COHORT_STATE_PATH = os.environ.get("ZB_COHORT_STATE_DIR", SNAPSHOT_PATH / "cohorts") or None
+# 배치 작업(precompute.py)이 미리 계산한 기본 필터 집계 결과 저장소 (비워 두면 사용하지 않음)
+RESULT_STORE = ResultStore(os.environ.get("ZB_RESULT_DIR", SNAPSHOT_PATH / "results") or None)
+
+# Google Drive 다운로드 캐시 (ZB_DATA_SOURCE에 로컬 폴더나 file:// URL을 주면 오프라인으로 동작)
+ARTIFACT_CACHE = ArtifactCache(
+    os.environ.get("ZB_CACHE_DIR", BASE_PATH / "cache"),
+    max_bytes=int(os.environ.get("ZB_CACHE_MAX_BYTES", 5 * 1024**3)),
+    fetcher=fetcher_from_source(os.environ.get("ZB_DATA_SOURCE")),
+    ttl=float(os.environ["ZB_CACHE_TTL"]) if os.environ.get("ZB_CACHE_TTL") else None,
+)
+
+# 로컬 CSV로 제공되는 테이블
+LOCAL_TABLES = {
+    "users": "users.csv",
+    "orders": "orders.csv",
+    "order_items": "order_items.csv",
+    "products": "products.csv",
+}
+
+# Google Drive에서 내려받는 대용량 테이블 (파일 ID)
+DRIVE_TABLES = {
+    "events": "1dHISvZevK5lviDZr49ujrg1Ej9z9_81m",           # events.csv (375M)
+    "inventory_items": "1zMuGoJAMR5gQDJUwTdVGnRIGW5bpQ2pb",  # inventory_items.csv
+}
+# Drive 파일별 기대 SHA-256 (ZB_DRIVE_CHECKSUMS="파일ID=sha256,..."). 지정한 파일은 그 내용의 캐시만 쓰고, 받은 파일도 검증
+DRIVE_CHECKSUMS = dict(
+    (key.strip(), value.strip()) for key, _, value in (
+        item.partition("=") for item in os.environ.get("ZB_DRIVE_CHECKSUMS", "").split(",") if item.strip()))
+
+# 분석 기간 [start, end) : created_at 기준으로 이 기간의 행만 읽는 테이블
+ANALYSIS_WINDOW = (
+    pd.Timestamp(os.environ.get("ZB_ANALYSIS_START", "2023-01-01"), tz="UTC"),
+    pd.Timestamp(os.environ.get("ZB_ANALYSIS_END", "2024-01-01"), tz="UTC"),
+)
+
+# CSV를 한 번에 읽지 않고 나눠 읽을 행 수 (로딩 중 최대 메모리 사용량을 제한)
+CSV_CHUNK_ROWS = 1_000_000
+
+# 분석 기간 필터를 적용하는 테이블
+WINDOWED_TABLES = ["users", "order_items", "events", "inventory_items"]
+
+# 스냅샷을 created_at 연 / 월 폴더로 나눠 저장하는 팩트 테이블 (기간과 겹치는 월만 읽음, partitions.py)
+PARTITIONED_TABLES = ["events", "orders", "order_items"]
+
+# created_at 순으로 정렬해 두는 팩트 테이블 (날짜 / 월 범위를 searchsorted 슬라이스로 자름, transformer.timeindex)
+TIME_SORTED_TABLES = ["events", "orders", "order_items"]
+
+# 테이블을 동시에 불러올 스레드 수 (다운로드와 파싱/Parquet 읽기가 겹치도록 테이블 수만큼)
+LOAD_WORKERS = int(os.environ.get("ZB_LOAD_WORKERS", len(LOCAL_TABLES) + len(DRIVE_TABLES)))
+
+# DAU/MAU/순 사용자 수 계산 방식: "exact"(사용자 비트맵) 또는 "approx"(HyperLogLog 스케치, 상대 오차 약 0.8%)
+DISTINCT_COUNT_MODE = os.environ.get("ZB_DISTINCT_COUNT", "exact")
+# 근사 모드 스케치 정밀도 (레지스터 2^p개, 일별 / 세그먼트별)
+HLL_PRECISION = int(os.environ.get("ZB_HLL_PRECISION", 14))
+HLL_SEGMENT_PRECISION = int(os.environ.get("ZB_HLL_SEGMENT_PRECISION", 11))
+
+# 차트 집계 실행 방식: "pandas"(기본), "sql"(DuckDB, requirements-sql.txt) 또는 "sqlite"(정확성 확인용, 느림)
+QUERY_BACKEND = os.environ.get("ZB_QUERY_BACKEND", "pandas")
+# ZB_QUERY_BACKEND 값 -> transformer.backend 엔진 ("sql"은 DuckDB가 없어도 sqlite로 바꾸지 않음)
+SQL_ENGINES = {"sql": "duckdb", "sqlite": "sqlite"}
+if QUERY_BACKEND != "pandas" and QUERY_BACKEND not in SQL_ENGINES:
+    raise ValueError(f"ZB_QUERY_BACKEND는 pandas, {', '.join(SQL_ENGINES)} 중 하나여야 합니다: {QUERY_BACKEND!r}")
+
+logger = logging.getLogger(__name__)
+
+
+def _window_mask(created_at, window):
+    start, end = window
+    return (created_at >= start) & (created_at < end)
+
+
+def _iter_csv_chunks(name, path, window=None):
+    """스키마에 맞춰 CSV를 청크 단위로 읽습니다.
+
+    window가 주어지면 created_at 문자열(ISO 형식)을 하루 여유를 두고 먼저 비교해서,
+    분석 기간 밖의 행은 datetime 파싱 전에 버립니다.
+    """
+    if window is not None:
+        lo = (window[0] - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        hi = (window[1] + pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+
+    with pd.read_csv(path, chunksize=CSV_CHUNK_ROWS, **read_csv_kwargs(name)) as reader:
+        first = next(reader, None)
+        # 헤더만 있는 CSV는 청크가 나오지 않으므로 스키마만 같은 빈 청크 하나로 대신함
+        chunks = itertools.chain([first], reader) if first is not None else [
+            pd.read_csv(path, nrows=0, **read_csv_kwargs(name))]
+        for chunk in chunks:
+            if window is not None:
+                raw = chunk["created_at"].fillna("")
+                chunk = chunk[(raw >= lo) & (raw < hi)]
+            for col in datetime_columns(name):
+                # 오프셋이 없는 값도 UTC로 읽어 분석 기간(UTC)과 비교할 수 있게 함
+                chunk = chunk.assign(**{col: pd.to_datetime(chunk[col], utc=True)})
+            if window is not None:
+                chunk = chunk[_window_mask(chunk["created_at"], window)]
+            yield chunk
+
+
+def _concat_chunks(chunks):
+    """청크를 합칩니다. 청크마다 달라지는 category 목록은 합집합으로 맞춥니다. (_iter_csv_chunks는 빈 CSV에도 청크 하나를 냄)"""
+    chunks = list(chunks)
+    df = pd.concat(chunks, ignore_index=True)
+    for col, dtype in chunks[0].dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype) and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = union_categoricals([c[col] for c in chunks])
+    return df
+
+
+def _source_path(name):
+    """원본 CSV 경로를 반환합니다. Drive 테이블은 다운로드 캐시에 없으면(체크섬이 다르거나 ZB_CACHE_TTL이 지남) None."""
+    if name in LOCAL_TABLES:
+        return BASE_PATH / LOCAL_TABLES[name]
+    file_id = DRIVE_TABLES[name]
+    return ARTIFACT_CACHE.lookup(file_id, DRIVE_CHECKSUMS.get(file_id))
+
+
+def _fetch_source(name):
+    """원본 CSV 경로를 반환합니다. Drive 테이블은 다운로드 캐시를 거쳐 받아옵니다."""
+    path = _source_path(name)
+    if path is None:
+        st.info(f"대용량 파일 '{name}.csv'를 다운로드 중입니다...")
+        file_id = DRIVE_TABLES[name]
+        path = ARTIFACT_CACHE.get(file_id, f"{name}.csv", DRIVE_CHECKSUMS.get(file_id))
+        st.info(f"'{name}.csv' 다운로드 완료.")
+    return path
+
+
+def _read_source(name, window=None, columns=None):
+    """원본 CSV를 청크 단위로 읽어 (window가 있으면 분석 기간만 남기고) 하나로 합칩니다."""
+    df = _concat_chunks(_iter_csv_chunks(name, _fetch_source(name), window))
+    return df[list(columns)] if columns is not None else df
+
+
+def _snapshot_file(name):
+    # 스키마 해시를 파일명에 붙여, 스키마가 바뀌면 이전 스냅샷은 자동으로 무시
+    # 파티션 테이블은 매니페스트 파일 (마지막에 쓰므로 수정 시각이 곧 스냅샷 갱신 시각)
+    if name in PARTITIONED_TABLES:
+        return _partitioned(name).manifest
+    return SNAPSHOT_PATH / f"{name}.{schema_version(name)}.parquet"
+
+
+def _partitioned(name):
+    return PartitionedTable(SNAPSHOT_PATH / f"{name}.{schema_version(name)}")
+
+
+def _snapshot_parts(name, window=None):
+    """스냅샷 Parquet 파일 목록 (파티션 테이블은 window와 겹치는 월 파일만). 스냅샷이 없으면 빈 목록"""
+    if name in PARTITIONED_TABLES:
+        return list(_partitioned(name).files(window))
+    path = _snapshot_file(name)
+    return [path] if path.exists() else []
+
+
+def _snapshot_is_fresh(name):
+    """스냅샷이 있고 원본 CSV보다 최신이면 True를 반환합니다."""
+    snapshot = _snapshot_file(name)
+    if not snapshot.exists():
+        return False
+    source = _source_path(name)
+    if source is None and name in DRIVE_TABLES and ARTIFACT_CACHE.stale(
+            DRIVE_TABLES[name], DRIVE_CHECKSUMS.get(DRIVE_TABLES[name])):
+        # 받아 둔 파일이 ZB_DRIVE_CHECKSUMS와 다르거나 ZB_CACHE_TTL이 지났으면 다시 받아 확인
+        # (내용이 같으면 캐시 파일의 수정 시각이 그대로라 스냅샷도 그대로 사용)
+        source = _fetch_source(name)
+    # Drive 테이블이 캐시에 없으면 비교할 원본이 없으므로 스냅샷을 그대로 사용
+    return source is None or not source.exists() or snapshot.stat().st_mtime >= source.stat().st_mtime
+
+
+def _write_snapshot(name):
+    """원본 CSV를 청크 단위로 Parquet 스냅샷에 기록합니다. (전체 테이블을 메모리에 올리지 않음)
+
+    임시 파일에 쓴 뒤 교체하여, 쓰는 도중의 스냅샷을 다른 워커가 읽지 않도록 합니다.
+    """
+    SNAPSHOT_PATH.mkdir(parents=True, exist_ok=True)
+    if name in PARTITIONED_TABLES:
+        return _partitioned(name).write(_iter_csv_chunks(name, _fetch_source(name)))
+    snapshot = _snapshot_file(name)
+    tmp_path = snapshot.with_suffix(f".{os.getpid()}.tmp")
+    writer = None
+    rows = 0
+    try:
+        for chunk in _iter_csv_chunks(name, _fetch_source(name)):
+            if writer is None:
+                schema = arrow_schema(chunk)
+                writer = pq.ParquetWriter(tmp_path, schema, compression="zstd")
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(tmp_path, snapshot)
+    return rows
+
+
+def _read_snapshot(name, window=None, columns=None):
+    """스냅샷을 메모리 매핑으로 읽습니다. window가 있으면 Parquet 필터로 분석 기간만, columns가 있으면 그 컬럼만 읽습니다.
+
+    파티션 테이블은 분석 기간과 겹치는 월 폴더의 파일만 엽니다.
+    """
+    if name in PARTITIONED_TABLES:
+        return _partitioned(name).read(window, columns)
+    filters = None
+    if window is not None:
+        filters = [("created_at", ">=", window[0]), ("created_at", "<", window[1])]
+    return pd.read_parquet(_snapshot_file(name), memory_map=True, filters=filters,
+                           columns=list(columns) if columns is not None else None)
+
+
+def load_table(name, window=None, columns=None):
+    """테이블을 불러옵니다. window=(start, end)가 주어지면 created_at이 그 기간인 행만 읽습니다.
+
+    columns가 주어지면 그 컬럼만 읽습니다. (Parquet 스냅샷은 컬럼 단위로 저장되므로 나머지 컬럼은 디스크에서 읽지 않음)
+    스냅샷이 없거나 원본 CSV보다 오래되었으면 먼저 스냅샷을 다시 만든 뒤 읽습니다.
+    """
+    if not _snapshot_is_fresh(name):
+        try:
+            _write_snapshot(name)
+        except OSError:
+            # 읽기 전용 배포 환경 등에서는 스냅샷 없이 CSV에서 바로 읽음
+            df = _read_source(name, window, columns)
+            return _stamp_table(df, name, window, _source_path(name), columns)
+    return _stamp_table(_read_snapshot(name, window, columns), name, window, _snapshot_file(name), columns)
+
+
+def _stamp_table(df, name, window, path, columns=None):
+    if name in TIME_SORTED_TABLES and "created_at" in df.columns:
+        df = sort_by_time(df)
+    # 차트 캐시 키에 쓰이는 버전 ID: 테이블/스키마/분석 기간/읽은 파일의 수정 시각과 크기 (일부 컬럼만 읽었으면 컬럼 목록도)
+    stat = path.stat()
+    parts = (name, schema_version(name), window, stat.st_mtime_ns, stat.st_size)
+    column_parts = [tuple(columns)] if columns is not None else []
+    # 파일이 갱신되어도 바뀌지 않는 원본 식별자: 데이터 폴더 / 테이블 / 스키마 / 분석 기간 (코호트 증분 상태 파일 구분용)
+    stamp_source(df, BASE_PATH.resolve(), name, schema_version(name), window, *column_parts)
+    return stamp_version(df, *parts, *column_parts)
+
+
+def load_tables(names, window=None, max_workers=LOAD_WORKERS, loader=None):
+    """여러 테이블을 스레드 풀에서 동시에 불러오고, (테이블 dict, 테이블별 소요 시간 dict)를 반환합니다.
+
+    Drive 다운로드, CSV 파싱, Parquet 읽기는 대부분 GIL 밖에서 실행되므로
+    전체 로딩 시간이 합계가 아니라 가장 오래 걸리는 테이블 수준으로 줄어듭니다.
+    loader(name)를 주면 load_table 대신 그 함수로 불러옵니다. (Dataset.preload: 테이블별 캐시 로더)
+    """
+    # 작업 스레드에서도 st.info 등이 현재 세션에 표시되도록 스크립트 컨텍스트를 넘겨줌
+    ctx = get_script_run_ctx()
+    if loader is None:
+        def loader(name):
+            return load_table(name, window if name in WINDOWED_TABLES else None)
+
+    def timed_load(name):
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        started = time.perf_counter()
+        df = loader(name)
+        return df, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {name: pool.submit(timed_load, name) for name in names}
+        results = {name: future.result() for name, future in futures.items()}
+
+    tables = {name: df for name, (df, _) in results.items()}
+    timings = {name: seconds for name, (_, seconds) in results.items()}
+    logger.info("테이블 로딩 시간\n%s", format_timings(tables, timings))
+    return tables, timings
+
+
+def format_timings(tables, timings):
+    """테이블별 로딩 시간 리포트 문자열을 만듭니다. (오래 걸린 순)"""
+    lines = []
+    for name, seconds in sorted(timings.items(), key=lambda kv: -kv[1]):
+        lines.append(f"{name:<16} {seconds:8.2f}s {len(tables[name]):>12,} rows")
+    return "\n".join(lines)
+
+
+def append_rows(name, path):
+    """CSV(원본과 같은 컬럼)의 행을 파티션 스냅샷에 추가합니다. 행이 속한 월 폴더에 새 파일만 쓰고 기존 파일은 그대로 둡니다.
+
+    원본 CSV가 스냅샷보다 새로우면 다음 로딩 때 원본으로 다시 만들어지므로, 추가한 행은 원본에도 반영해 두어야 합니다.
+    """
+    if name not in PARTITIONED_TABLES:
+        raise ValueError(f"'{name}'은 파티션 테이블이 아닙니다. ({', '.join(PARTITIONED_TABLES)})")
+    table = _partitioned(name)
+    if not table.exists():
+        _write_snapshot(name)
+    rows = _concat_chunks(_iter_csv_chunks(name, path))
+    return table.append(rows)
+
+
+def build_snapshots(names=None):
+    """모든 테이블을 원본에서 다시 읽어 Parquet 스냅샷을 생성합니다."""
+    for name in names or [*LOCAL_TABLES, *DRIVE_TABLES]:
+        rows = _write_snapshot(name)
+        print(f"{name}: {rows:,} rows -> {_snapshot_file(name)}")
+
 
 # @st.cache_data : 데이터 로딩을 한 번만 실행하여 앱 속도를 향상시킵니다.
-# 여러 페이지에서 이 함수를 호출해도 데이터는 한 번만 읽어옵니다.
+# 테이블(과 컬럼 목록)마다 따로 캐시하므로, 여러 페이지에서 호출해도 각 테이블은 처음 필요할 때 한 번만 읽어옵니다.
 @st.cache_data
-def load_all_data(base_path="./data/"):
-    """모든 CSV 파일을 불러오고 2023년 데이터로 필터링합니다."""
+def load_dataset_table(name, window=ANALYSIS_WINDOW, columns=None):
+    """테이블 하나를 불러옵니다. (스냅샷 우선, 없거나 오래되면 CSV/Google Drive)
+
+    users/order_items/events/inventory_items는 분석 기간만 읽고, columns(튜플)가 있으면 그 컬럼만 읽습니다.
+    """
+    return load_table(name, window if name in WINDOWED_TABLES else None, columns)
+
+
+class Dataset(Mapping):
+    """테이블별 지연 로딩 핸들. dataset["events"]처럼 처음 접근할 때 그 테이블만 불러옵니다. (dict처럼 사용)
+
+    Revenue / Activation 페이지처럼 users / orders / order_items / products만 쓰면 events.csv(375M) 다운로드와
+    파싱은 일어나지 않습니다. 불러온 테이블은 핸들 안에도 보관하여 같은 핸들에서는 캐시 복사를 한 번만 합니다.
+    """
+
+    def __init__(self, names, window=ANALYSIS_WINDOW):
+        self.names = tuple(names)
+        self.window = window
+        self._tables = {}
+
+    def __getitem__(self, name):
+        if name not in self.names:
+            raise KeyError(name)
+        if name not in self._tables:
+            self._tables[name] = self.table(name)
+        return self._tables[name]
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def table(self, name, columns=None):
+        """테이블을 불러옵니다. columns를 주면 그 컬럼만 읽어 따로 캐시합니다. (예: 날짜 범위만 필요한 events)"""
+        try:
+            return load_dataset_table(name, self.window, tuple(columns) if columns is not None else None)
+        except FileNotFoundError as e:
+            st.error(f"데이터 파일 로딩 중 오류 발생: {e}")
+            raise
+
+    def preload(self, *names):
+        """아직 불러오지 않은 테이블을 스레드 풀에서 동시에 불러옵니다. (load_tables와 같은 방식)"""
+        missing = [name for name in names if name not in self._tables]
+        if missing:
+            tables, _ = load_tables(missing, self.window, loader=self.table)
+            self._tables.update(tables)
+        return self
+
+
+def _missing_tables(names):
+    """스냅샷도 원본 CSV도 없는 로컬 테이블 이름 목록 (Drive 테이블은 처음 읽을 때 내려받으므로 확인하지 않음)"""
+    return [name for name in names
+            if name in LOCAL_TABLES and not _snapshot_file(name).exists() and not _source_path(name).exists()]
+
+
+def load_all_data(base_path="./data/", window=ANALYSIS_WINDOW):
+    """모든 테이블의 지연 로딩 핸들(Dataset)을 반환합니다. 테이블은 처음 접근할 때 불러옵니다.
+
+    users/order_items/events/inventory_items는 분석 기간(기본 2023년)만 읽습니다.
+    필요 없는 테이블은 목록에서 빼면 됩니다. (distribution_centers는 사용하지 않음)
+    로컬 테이블 파일이 없으면 오류 메시지를 표시하고 None을 반환합니다. (Drive 테이블은 처음 읽을 때 같은 메시지 표시)
+    """
+    names = ["users", "orders", "order_items", "events", "inventory_items", "products"]
+    missing = _missing_tables(names)
+    if missing:
+        st.error(f"데이터 파일 로딩 중 오류 발생: {', '.join(LOCAL_TABLES[name] for name in missing)} 파일이 없습니다. ({BASE_PATH})")
+        return None
+    return Dataset(names, window)
+
+
+@st.cache_data
+def load_analytics_model(window=ANALYSIS_WINDOW):
+    """load_all_data 결과로 만든 분석 모델(사용자 차원, 주문/주문상품 팩트, 상품 차원)을 반환합니다.
+
+    연령대, 첫 구매일, 활성화 여부, 월/주/일 키 등은 여기서 한 번만 계산되고 모든 페이지가 공유합니다.
+    """
+    all_data = load_all_data(window=window)
+    if all_data is None:
+        return None
+    # 분석 모델에 필요한 네 테이블만 동시에 불러옴 (events / inventory_items는 읽지 않음)
+    return build_analytics_model(all_data.preload("users", "orders", "order_items", "products"))
+
+
+# 연결 객체는 직렬화할 수 없으므로 cache_data 대신 cache_resource로 워커 안에서 하나만 공유
+@st.cache_resource
+def load_query_backend(window=ANALYSIS_WINDOW):
+    """분석 모델 테이블(users, orders, products, order_items)을 등록한 SQL 백엔드(transformer.backend)를 반환합니다.
+
+    ZB_QUERY_BACKEND=sql  : DuckDB에 Parquet 스냅샷을 뷰로 등록 (DataFrame 복사 없음, 스냅샷이 없으면 분석 모델 DataFrame을 그대로 조회)
+    ZB_QUERY_BACKEND=sqlite : 분석 모델 DataFrame을 sqlite 테이블로 복사 (정확성 확인용)
+    """
+    model = load_analytics_model(window=window)  # 스냅샷 생성 / 갱신과 데이터셋 버전 확인
+    if model is None:
+        return None
+    backend = SqlBackend.connect(engine=SQL_ENGINES[QUERY_BACKEND])
+    for name in ("users", "orders", "products", "order_items"):
+        table_window = window if name in WINDOWED_TABLES else None
+        parts = _snapshot_parts(name, table_window) if backend.engine == "duckdb" else []
+        if parts:
+            backend.register_parquet(name, parts, table_window)
+        else:
+            backend.register(name, model[name])
+    return stamp_version(backend, "query_backend", backend.engine,
+                         dataset_version(*(model[name] for name in ("users", "orders", "products", "order_items"))))
+
+
+# 아래 인덱스 / 큐브 / 스케치 로더는 읽기 전용 객체를 cache_resource로 워커 안에서 하나만 공유합니다.
+# cache_data는 호출(rerun)마다 결과를 pickle로 복사하므로 큰 배열 복사 비용이 들고, 객체 안의 메모(예: 인구통계 교차표의
+# 기간별 breakdown)도 매번 사라집니다. 페이지는 이 객체들을 수정하지 않습니다.
+@st.cache_resource
+def load_filter_index(window=ANALYSIS_WINDOW):
+    """분석 모델 테이블별 사이드바 필터 인덱스(transformer.filters)를 반환합니다.
 
-    SCRIPT_DIR = Path(__file__).resolve().parent
-    BASE_PATH = SCRIPT_DIR / "data"
+    order_items는 orders / users / products 행 위치(외래 키 위치)를 가지고 있어 차원 마스크를 조인 없이 옮깁니다.
+    """
+    model = load_analytics_model(window=window)
+    if model is None:
+        return None
+    users, orders, products, order_items = (model[name] for name in ("users", "orders", "products", "order_items"))
+    return {
+        "users": FilterIndex(users, ["gender", "age_group", "traffic_source"]),
+        "orders": FilterIndex(orders, ["month_key", "status"]),
+        "products": FilterIndex(products, ["category", "brand"]),
+        "order_items": FilterIndex(order_items, foreign_keys={
+            "orders": key_positions(order_items["order_id"], orders["order_id"]),
+            "users": key_positions(order_items["user_id"], users["id"]),
+            "products": key_positions(order_items["product_id"], products["id"]),
+        }),
+    }
+
+
+@st.cache_resource
+def load_revenue_cube(window=ANALYSIS_WINDOW):
+    """분석 모델로 만든 Revenue KPI 큐브(transformer.cube)를 반환합니다. 필터 변경 시 원본 행 대신 큐브 셀만 합칩니다."""
+    model = load_analytics_model(window=window)
+    if model is None:
+        return None
+    tables = [model[name] for name in ("orders", "order_items", "users", "products")]
+    return stamp_version(RevenueCube.build(*tables), "revenue_cube", dataset_version(*tables))
 
-    # 1. Google Drive 파일 ID
-    file_id = "1dHISvZevK5lviDZr49ujrg1Ej9z9_81m"
-    item_id = '1zMuGoJAMR5gQDJUwTdVGnRIGW5bpQ2pb'
 
-    # 2. 직접 다운로드 URL로 변환
-    url = f'https://drive.google.com/uc?id={file_id}&export=download'
-    item_url = f'https://drive.google.com/uc?id={item_id}&export=download'
-    
+@st.cache_resource
+def load_user_index(window=ANALYSIS_WINDOW, mode=DISTINCT_COUNT_MODE):
+    """events/사용자 차원으로 만든 사용자 인덱스를 반환합니다.
+
+    mode="exact"이면 사용자 비트맵(transformer.bitmap), "approx"이면 HLL 스케치(transformer.hll)이고 두 인덱스의 지표 메서드는 같습니다.
+    DAU/MAU/기간 내 순 사용자 수를 events 재집계 없이 계산할 때 씁니다. cache_key(index)로 차트 캐시 키를 만들 수 있습니다.
+    """
+    model = load_analytics_model(window=window)
+    if model is None:
+        return None
     try:
-        # 1. 모든 CSV 파일 불러오기
-        users = pd.read_csv(BASE_PATH /"users.csv")
-        orders = pd.read_csv(BASE_PATH / "orders.csv")
-        order_items = pd.read_csv(BASE_PATH / "order_items.csv")
-       # --- 2. Google Drive 대용량 파일 불러오기 ---
-        
-        # (A) events.csv (375M)
-        event_file_id = "1dHISvZevK5lviDZr49ujrg1Ej9z9_81m"
-        event_output_path = "temp_events.csv"  # 임시 파일명
-        
-        # gdown으로 파일 다운로드 (대용량 파일 경고 무시)
-        st.info("대용량 파일 'events.csv'를 다운로드 중입니다...")
-        gdown.download(id=event_file_id, output=event_output_path, quiet=False)
-        events = pd.read_csv(event_output_path)
-        os.remove(event_output_path) # 다운로드 후 임시 파일 삭제
-        st.info("'events.csv' 로드 완료.")
-
-        # (B) inventory_items.csv
-        item_file_id = '1zMuGoJAMR5gQDJUwTdVGnRIGW5bpQ2pb'
-        item_output_path = "temp_items.csv" # 임시 파일명
-        
-        st.info("대용량 파일 'inventory_items.csv'를 다운로드 중입니다...")
-        gdown.download(id=item_file_id, output=item_output_path, quiet=False)
-        inventory_items = pd.read_csv(item_output_path)
-        os.remove(item_output_path) # 다운로드 후 임시 파일 삭제
-        st.info("'inventory_items.csv' 로드 완료.")
-  
-
-        # 필요 없는 데이터프레임은 여기서 주석 처리하거나 삭제해도 됩니다.
-        products = pd.read_csv(BASE_PATH / "products.csv")
-        # distribution_centers = pd.read_csv(base_path + "distribution_centers.csv")
-
-        # 2. 날짜 컬럼을 datetime 형식으로 변환 (안정적인 필터링을 위해)
-        for df in [users, orders, order_items, events, inventory_items]:
-            df['created_at'] = pd.to_datetime(df['created_at'])
-
-        # 3. 2023년 데이터로 필터링
-        users = users[users['created_at'].dt.year == 2023]
-        # orders = orders[orders['created_at'].dt.year == 2023]
-        order_items = order_items[order_items['created_at'].dt.year == 2023]
-        events = events[events['created_at'].dt.year == 2023]
-        inventory_items = inventory_items[inventory_items['created_at'].dt.year == 2023]
-        # products = products[products['created_at'].dt.year == 2023]
-        # distribution_centers = distribution_centers[distribution_centers['created_at'].dt.year == 2023]
-
-
-        # 4. 여러 데이터프레임을 딕셔너리 형태로 반환
-        return {
-            "users": users,
-            "orders": orders,
-            "order_items": order_items,
-            "events": events,
-            "inventory_items": inventory_items,
-            "products": products,
-            # "distribution_centers": distribution_centers
-        }
-    
-    except FileNotFoundError as e:
-        st.error(f"데이터 파일 로딩 중 오류 발생: {e}")
+        events = load_all_data(window=window)["events"]
+    except FileNotFoundError:
+        # Drive 테이블을 받을 수 없음 (Dataset.table이 오류 메시지를 표시함)
+        return None
+    if mode == "approx":
+        index = UserSketchIndex.build(events, model["users"], precision=HLL_PRECISION,
+                                      segment_precision=HLL_SEGMENT_PRECISION)
+    else:
+        index = UserBitmapIndex.build(events, model["users"])
+    return stamp_version(index, "user_index", mode, dataset_version(events, model["users"]))
 
+
+@st.cache_resource
+def load_demographic_crosstab(window=ANALYSIS_WINDOW):
+    """users로 만든 (가입일, 유입 경로, 국가, 성별, 연령대) 사용자 수 교차표(transformer.demographics)를 반환합니다.
+
+    Acquisition 페이지의 유입 경로 분포 / 인구통계 차트는 사용자 행 대신 이 교차표로 계산합니다.
+    """
+    data = load_all_data(window=window)
+    if data is None:
         return None
+    users = data["users"]
+    crosstab = DemographicCrosstab.build(users, AGE_BUCKETS, AGE_BUCKET_LABELS)
+    return stamp_version(crosstab, "demographic_crosstab", dataset_version(users))
 
 
+@st.cache_resource
+def load_distribution_sketches(window=ANALYSIS_WINDOW):
+    """TTFP / 활성화 / 첫 구매 / 사용자별 매출 세그먼트 집계(transformer.sketch)를 반환합니다.
+
+    Activation / Revenue 페이지의 KPI, 분위수, 히스토그램은 필터가 바뀌어도 사용자 행 대신 세그먼트 집계를 합쳐 계산합니다.
+    """
+    model = load_analytics_model(window=window)
+    if model is None:
+        return None
+    users, orders, products, order_items = (model[name] for name in ("users", "orders", "products", "order_items"))
+    foreign_keys = load_filter_index(window=window)["order_items"].foreign_keys
+    sketches = DistributionSketches.build(users, orders, products, order_items, foreign_keys)
+    return stamp_version(sketches, "distribution_sketches", dataset_version(users, orders, products, order_items))
 
 
+@st.cache_resource
+def load_path_index(window=ANALYSIS_WINDOW):
+    """events를 세션 / 시간순으로 한 번 정렬해 둔 세션 경로 인덱스(transformer.paths)를 반환합니다. (Sankey 차트용)"""
+    data = load_all_data(window=window)
+    if data is None:
+        return None
+    try:
+        events = data["events"]
+    except FileNotFoundError:
+        return None
+    return stamp_version(PathIndex.build(events), "path_index", dataset_version(events))
+
+
+@st.cache_resource
+def load_funnel_index(window=ANALYSIS_WINDOW):
+    """세션별 event_type 첫 발생 시각 인덱스(transformer.funnel)를 반환합니다. 퍼널 단계가 바뀌어도 events를 다시 읽지 않습니다."""
+    data = load_all_data(window=window)
+    if data is None:
+        return None
+    try:
+        events = data["events"]
+    except FileNotFoundError:
+        return None
+    return stamp_version(FunnelIndex.build(events), "funnel_index", dataset_version(events))
+
 
+if __name__ == "__main__":
+    import argparse
 
+    parser = argparse.ArgumentParser(description="데이터 스냅샷 생성 / 로딩 시간 측정")
+    parser.add_argument("--timings", action="store_true", help="스냅샷을 만들지 않고 테이블별 로딩 시간만 출력")
+    parser.add_argument("--append", nargs=2, metavar=("TABLE", "CSV"), help="새 행(CSV)을 파티션 스냅샷에 추가")
+    args = parser.parse_args()
 
+    if args.append:
+        # python data.py --append events data/events_2024-01-02.csv : 새 날짜의 행만 해당 월 폴더에 추가
+        for path in append_rows(*args.append):
+            print(path)
+    elif args.timings:
+        # python data.py --timings : 앱과 같은 방식으로 모든 테이블을 불러오고 테이블별 소요 시간을 출력
+        started = time.perf_counter()
+        tables, timings = load_tables([*LOCAL_TABLES, *DRIVE_TABLES], ANALYSIS_WINDOW)
+        print(format_timings(tables, timings))
+        print(f"{'total (wall)':<16} {time.perf_counter() - started:8.2f}s")
+    else:
+        # python data.py : 배포 전 스냅샷을 미리 만들어 두면 워커 재시작 시 CSV 파싱을 건너뜁니다.
+        build_snapshots()
@@ -0,0 +1,190 @@
+import copy
+import functools
+import hashlib
+import inspect
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import matplotlib.pyplot as plt
+import pandas as pd
+import streamlit as st
+from matplotlib.figure import Figure
+
+
+# --- 🖼️ 렌더링된 차트 캐시 ---
+# @st.cache_data로 matplotlib Figure를 캐시하면 rerun마다 Figure를 pickle / 복사하고, st.pyplot이 다시 PNG로 그리며,
+# 닫히지 않은 Figure가 pyplot에 계속 쌓입니다. 차트 함수를 @cache_figure로 감싸면 처음 한 번만 그림을 PNG(또는 SVG)
+# 바이트로 만들고 Figure를 닫은 뒤, (차트 함수, 인자 / 데이터셋 버전, 스타일) 키로 바이트를 메모리 예산 안에서 보관합니다.
+# 페이지는 st.pyplot 대신 show_figure()로 바이트를 그대로 보여 줍니다.
+# 차트 함수 안의 안내 메시지는 st.warning / st.error 대신 show_warning / show_error로 표시합니다. 처음 그릴 때 메시지를
+# 캐시 항목에 함께 기록해 두고, 캐시 적중 시 같은 순서로 다시 표시합니다. (st.cache_data의 요소 재생과 같은 동작)
+
+# st.pyplot과 같은 출력 옵션 (고해상도 화면용 dpi 200, 여백 자르기)
+SAVEFIG_OPTIONS = {"dpi": 200, "bbox_inches": "tight"}
+
+
+class RenderedFigure:
+    """PNG / SVG로 그려 둔 차트. 바이트만 가지고 있어 복사 / pickle 비용이 작습니다."""
+
+    def __init__(self, data, format="png"):
+        self.data = data
+        self.format = format
+
+    @property
+    def nbytes(self):
+        return len(self.data)
+
+
+def rasterize(fig, format="png"):
+    """Figure를 한 번 그려 RenderedFigure로 바꾸고 Figure를 닫습니다."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=format, **SAVEFIG_OPTIONS)
+    plt.close(fig)
+    data = buffer.getvalue()
+    return RenderedFigure(data.decode("utf-8") if format == "svg" else data, format)
+
+
+def _nbytes(value):
+    """캐시 항목 크기 추정 (그림 바이트 + DataFrame 메모리)"""
+    if isinstance(value, RenderedFigure):
+        return value.nbytes
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def _render(value, format):
+    """반환값 안의 Figure를 모두 RenderedFigure로 바꿉니다. (튜플 / 리스트 한 단계)"""
+    if isinstance(value, Figure):
+        return rasterize(value, format)
+    if isinstance(value, (tuple, list)):
+        return type(value)(_render(item, format) for item in value)
+    return value
+
+
+def _style_fingerprint(format):
+    """그림 모양을 바꾸는 설정(matplotlib rcParams, 출력 형식)의 해시"""
+    items = sorted((key, repr(value)) for key, value in plt.rcParams.items())
+    return hashlib.blake2b(repr((format, SAVEFIG_OPTIONS, items)).encode(), digest_size=8).hexdigest()
+
+
+class FigureCache:
+    """렌더링된 차트 바이트의 메모리 LRU 캐시.
+
+    - 키: (차트 함수 이름, `_`로 시작하지 않는 인자의 해시, 스타일 해시)
+    - 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제
+    - 여러 세션(스레드)이 함께 쓰므로 조회 / 삽입은 잠금 안에서 수행
+    """
+
+    def __init__(self, max_bytes=128 * 1024**2):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()       # 키 -> (반환값, 크기)
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, value, size):
+        """항목을 넣고 예산을 넘으면 LRU 항목을 삭제합니다. 예산보다 큰 항목은 저장하지 않습니다."""
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self.entries:
+                self.nbytes -= self.entries.pop(key)[1]
+            self.entries[key] = (value, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.nbytes -= evicted
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.nbytes = 0
+
+
+FIGURE_CACHE = FigureCache(max_bytes=int(os.environ.get("ZB_FIGURE_CACHE_MAX_BYTES", 128 * 1024**2)))
+
+# 실행 중인 cache_figure 함수가 표시한 메시지 목록 (세션마다 스크립트 스레드가 다르므로 스레드별)
+_recording = threading.local()
+
+
+def _show_message(kind, body):
+    getattr(st, kind)(body)
+    messages = getattr(_recording, "messages", None)
+    if messages is not None:
+        messages.append((kind, body))
+
+
+def show_warning(body):
+    """st.warning으로 표시합니다. cache_figure 함수 안에서 부르면 캐시 적중 시에도 다시 표시됩니다."""
+    _show_message("warning", body)
+
+
+def show_error(body):
+    """st.error로 표시합니다. cache_figure 함수 안에서 부르면 캐시 적중 시에도 다시 표시됩니다."""
+    _show_message("error", body)
+
+
+def cache_figure(func=None, *, format="png", cache=None):
+    """matplotlib 차트 함수용 캐시 데코레이터 (@st.cache_data 대신 사용).
+
+    st.cache_data와 같이 `_`로 시작하는 인자는 키에서 제외하므로 cache_key 인자로 데이터셋 버전을 구분합니다.
+    반환값 안의 Figure는 RenderedFigure로 바뀌어 반환됩니다. (show_figure로 표시)
+    함수 안에서 show_warning / show_error로 표시한 메시지는 반환값과 함께 저장해 캐시 적중 시 다시 표시합니다.
+    """
+    if func is None:
+        return functools.partial(cache_figure, format=format, cache=cache)
+    signature = inspect.signature(func)
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        target = cache or FIGURE_CACHE
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        params = [(key, value) for key, value in bound.arguments.items() if not key.startswith("_")]
+        key = (name, hashlib.blake2b(repr(params).encode(), digest_size=16).hexdigest(), _style_fingerprint(format))
+        entry = target.get(key)
+        if entry is None:
+            outer = getattr(_recording, "messages", None)
+            _recording.messages = messages = []
+            try:
+                value = _render(func(*args, **kwargs), format)
+            finally:
+                _recording.messages = outer
+            messages = tuple(messages)
+            target.put(key, (value, messages), _nbytes(value))
+            if outer is not None:
+                outer.extend(messages)
+        else:
+            value, messages = entry[0]
+            for kind, body in messages:
+                _show_message(kind, body)
+        # st.cache_data처럼 호출마다 사본을 반환 (그림 바이트는 불변이라 복사되지 않음)
+        return copy.deepcopy(value)
+
+    return wrapper
+
+
+def show_figure(fig, **kwargs):
+    """RenderedFigure는 저장된 바이트를 그대로, Figure는 st.pyplot으로 표시합니다."""
+    if isinstance(fig, RenderedFigure):
+        return st.image(fig.data, width="stretch", output_format="PNG" if fig.format == "png" else "auto")
+    return st.pyplot(fig, **kwargs)
@@ -0,0 +1,10 @@
+# --- 📐 차트 집계 API ---
+# charts/*_charts.py의 차트 함수에서 집계 부분만 분리한 순수 함수들입니다. (페이지별 모듈: acquisition / activation /
+# retention / revenue) Streamlit과 matplotlib을 import하지 않으므로 스크립트, 배치 작업, 벤치마크에서 그대로 호출할 수 있고,
+# 반환값은 차트가 그리는 작은 DataFrame / Series입니다. 차트 함수는 이 결과를 받아 그리기만 합니다.
+#
+# 집계할 데이터가 없으면 NoData를 발생시키며, 메시지는 차트 함수가 st.warning으로 보여 주는 문구입니다.
+
+
+class NoData(ValueError):
+    """집계할 데이터가 없음"""
@@ -0,0 +1,146 @@
+import pandas as pd
+
+from metrics import NoData
+from transformer.model import day_key, period_starts
+from transformer.paths import step_transitions
+
+# Acquisition 페이지 집계. 입력은 load_all_data의 테이블과 사용자 / 경로 / 퍼널 인덱스, 인구통계 교차표(data.py의 load_*)입니다.
+
+SALES_STATUSES = ['Complete', 'Returned', 'Cancelled']
+
+
+def period_kpis(order_items, user_index, start_date, end_date):
+    """기간의 (총 매출: Complete 주문 상품, 순 방문자 수: 기간 내 일별 비트맵 OR 후 popcount)"""
+    total_revenue = order_items['sale_price'][order_items['status'] == 'Complete'].sum()
+    return total_revenue, user_index.unique_users(day_key(start_date), day_key(end_date))
+
+
+def monthly_revenue_mau(order_items, user_index, start_date, end_date):
+    """월별 매출(완료 / 반품 / 취소 주문 상품)과 MAU DataFrame (인덱스: 'YYYY-MM', 컬럼: Revenue, MAU)"""
+    sales = order_items[order_items['status'].isin(SALES_STATUSES)]
+    monthly_revenue = sales.groupby(sales['created_at'].dt.to_period('M').rename('month'))['sale_price'].sum()
+
+    # events를 다시 집계하지 않고 일별 사용자 비트맵을 월 단위로 OR 한 뒤 popcount
+    mau = user_index.period_active(day_key(start_date), day_key(end_date), "month")
+    mau.index = period_starts(mau.index, "month").to_period('M')
+
+    combined = pd.DataFrame({'Revenue': monthly_revenue, 'MAU': mau}).fillna(0)
+    if combined.empty:
+        raise NoData("선택한 기간의 매출 / 활성 사용자 데이터가 없습니다.")
+    combined.index = combined.index.strftime('%Y-%m')
+    return combined
+
+
+def session_paths(path_index, start_date, end_date, max_steps=10, thresh=0.05, top_k=None, sample=None):
+    """세션 경로 Sankey의 (nodes, links, 세션 수). nodes / links는 transformer.paths.step_transitions 결과"""
+    paths = path_index.paths(day_key(start_date), day_key(end_date), max_steps, sample=sample)
+    if len(paths) == 0:
+        raise NoData("선택한 기간의 세션이 없습니다.")
+    nodes, links = step_transitions(paths, path_index.names, thresh=thresh, top_k=top_k)
+    return nodes, links, len(paths)
+
+
+def funnel_counts(funnel_index, stages, start_date, end_date, funnel_type="open", window=None, by=None):
+    """퍼널 단계별 도달 세션 수 (by가 없으면 Series, 있으면 단계 x 그룹 DataFrame)"""
+    counts = funnel_index.counts(stages, funnel_type, window, day_key(start_date), day_key(end_date), by=by)
+    if by is None:
+        counts = counts["total"]
+        if not len(counts) or counts.iloc[0] == 0:
+            raise NoData("첫 단계에 도달한 세션이 없습니다.")
+    elif counts.empty:
+        raise NoData("첫 단계에 도달한 세션이 없습니다.")
+    return counts
+
+
+def funnel_breakdown(funnel_index, stages, start_date, end_date, funnel_type="open", window=None, by="traffic_source"):
+    """(단계 x 그룹 도달 세션 수, 첫 단계 대비 전환율(%)). by가 기간이면 열 이름은 기간 시작일 문자열"""
+    counts = funnel_counts(funnel_index, stages, start_date, end_date, funnel_type, window, by=by)
+    if by in ("day", "week", "month"):
+        counts.columns = period_starts(counts.columns, by).strftime('%Y-%m-%d' if by != "month" else '%Y-%m')
+    conversion = counts.div(counts.iloc[0].where(counts.iloc[0] > 0), axis=1) * 100
+    return counts, conversion
+
+
+# 아래 유입 경로 / 인구통계 집계는 사용자 행 대신 인구통계 교차표(transformer.demographics, 가입일 x 차원 조합별 사용자 수)를 씁니다.
+# start_date / end_date는 가입일 기준 양 끝 포함 기간입니다.
+def _days(demographics, start_date, end_date):
+    start_day, end_day = day_key(start_date), day_key(end_date)
+    if demographics.users(start_day, end_day) == 0:
+        raise NoData("선택한 조건의 사용자가 없습니다.")
+    return start_day, end_day
+
+
+def traffic_distribution(demographics, start_date, end_date):
+    """유입 경로별 신규 사용자 수 Series (많은 순, 사용자가 있는 경로만)"""
+    counts = demographics.value_counts('traffic_source', *_days(demographics, start_date, end_date))
+    # category 형식은 등장하지 않은 값도 0으로 집계하므로 제외
+    counts = counts[counts > 0]
+    counts.index = counts.index.astype(str)
+    return counts
+
+
+def monthly_traffic_trends(demographics, start_date, end_date):
+    """가입 월(1~12) x 유입 경로별 신규 사용자 수 DataFrame"""
+    return demographics.monthly(*_days(demographics, start_date, end_date))
+
+
+def _source_counts(demographics, start_date, end_date, traffic_source, dim):
+    # 유입 경로별 값은 기간마다 한 번 만든 dict에서 조회
+    days = _days(demographics, start_date, end_date)
+    if traffic_source not in demographics.breakdown(*days):
+        raise NoData("선택한 조건의 사용자가 없습니다.")
+    return demographics.value_counts(dim, *days, traffic_source=traffic_source)
+
+
+def country_distribution(demographics, start_date, end_date, traffic_source):
+    """(traffic_source 사용자 수, 국가별 사용자 수 DataFrame: country, user_count)"""
+    counts = _source_counts(demographics, start_date, end_date, traffic_source, 'country')
+    counts = counts[counts > 0]
+    counts.index = counts.index.astype(str)
+    counts = counts.reset_index()
+    counts.columns = ['country', 'user_count']
+    user_count = demographics.breakdown(day_key(start_date), day_key(end_date))[traffic_source]['users']
+    return user_count, counts
+
+
+def gender_distribution(demographics, start_date, end_date, traffic_source):
+    """traffic_source 사용자의 성별 사용자 수 Series"""
+    counts = _source_counts(demographics, start_date, end_date, traffic_source, 'gender')
+    return counts[counts > 0]
+
+
+def age_distribution(demographics, start_date, end_date, traffic_source):
+    """traffic_source 사용자의 10세 단위 연령대(transformer.model.AGE_BUCKETS)별 사용자 수 Series (연령대 순)"""
+    return _source_counts(demographics, start_date, end_date, traffic_source, 'age_group').sort_index()
+
+
+def conversion_by_source(users, orders):
+    """유입 경로별 가입자 수, 구매자 수, 구매 전환율(%) DataFrame (전환율 높은 순)"""
+    total = users['traffic_source'].value_counts()
+    total = total[total > 0].reset_index()
+    total.columns = ['traffic_source', 'total_users']
+
+    is_purchaser = users['id'].isin(orders['user_id'].unique())
+    purchasing = users.loc[is_purchaser, 'traffic_source'].value_counts().reset_index()
+    purchasing.columns = ['traffic_source', 'purchasing_users']
+
+    conversion = pd.merge(total, purchasing, on='traffic_source', how='left')
+    conversion['purchasing_users'] = conversion['purchasing_users'].fillna(0).astype(int)
+    conversion['conversion_rate (%)'] = (conversion['purchasing_users'] / conversion['total_users']) * 100
+    return conversion.sort_values(by='conversion_rate (%)', ascending=False).reset_index(drop=True)
+
+
+def dau_by_month(user_index, selected_month):
+    """selected_month('YYYY-MM' 또는 '전체 기간')의 일별 활성 사용자 수 Series (인덱스: 날짜)"""
+    if selected_month == '전체 기간':
+        start_day, end_day = user_index.first_day, user_index.first_day + len(user_index.days) - 1
+    else:
+        month = pd.Period(selected_month, freq='M')
+        start_day, end_day = day_key(month.start_time.date()), day_key(month.end_time.date())
+
+    dau = user_index.daily_active(start_day, end_day)
+    if dau.empty:
+        raise NoData("선택한 월의 활성 사용자 데이터가 없습니다.")
+    dau.index = period_starts(dau.index, "day").date
+    dau.index.name = "날짜"
+    return dau.rename('user_id')
@@ -0,0 +1,57 @@
+from metrics import NoData
+
+# Activation 페이지 집계. 입력은 필터에 맞게 고른 세그먼트별 개수 표(transformer.sketch.SegmentCounts.select) 또는
+# 합친 스케치(transformer.sketch.Sketch)입니다. 사용자 / 주문 상품 행은 받지 않습니다.
+
+
+def activation_overview(user_segments):
+    """(전체 사용자 수, 활성화 사용자 수, 활성화율(%))
+
+    user_segments : 세그먼트별 total_users / activated_users 표 (DistributionSketches.activation)
+    """
+    total_users = int(user_segments["total_users"].sum())
+    activated_users = int(user_segments["activated_users"].sum())
+    return total_users, activated_users, activated_users / total_users * 100
+
+
+def ttfp_summary(ttfp_sketch):
+    """활성화 사용자의 첫 구매까지 걸린 일 수 요약 dict (mean / median / q25 / q75 / max)
+
+    ttfp_sketch : 필터에 맞게 합친 TTFP 스케치(transformer.sketch.Sketch). 일 단위 구간이라 값은 사용자 행으로 계산한 것과 같음
+    """
+    return {"mean": ttfp_sketch.mean(), "median": ttfp_sketch.quantile(0.5),
+            "q25": ttfp_sketch.quantile(0.25), "q75": ttfp_sketch.quantile(0.75), "max": ttfp_sketch.maximum}
+
+
+def first_purchase_price(price_sketch):
+    """첫 주문 상품의 (평균, 중앙값) 판매가. 평균은 정확한 값, 중앙값은 로그 구간 스케치의 상대 오차(alpha) 이내"""
+    return price_sketch.mean(), price_sketch.quantile(0.5)
+
+
+def activation_rates(user_segments, by, all_groups=False):
+    """by 차원 값별 사용자 수, 활성화 사용자 수, 활성화율(%) DataFrame (인덱스: by 값)
+
+    user_segments : 세그먼트별 total_users / activated_users 표 (DistributionSketches.activation)
+    all_groups    : 범주형 컬럼이면 사용자가 없는 값도 포함 (연령대 축을 고정할 때)
+    """
+    rates = user_segments.groupby(by, observed=not all_groups)[["total_users", "activated_users"]].sum()
+    rates["activation_rate"] = rates["activated_users"] / rates["total_users"] * 100
+    return rates
+
+
+def first_purchase_categories(category_segments, limit=5):
+    """첫 주문 상품의 카테고리별 상품 수 상위 limit개 Series
+
+    category_segments : 세그먼트 x 카테고리별 items 표 (DistributionSketches.first_purchase_categories)
+    """
+    if not category_segments["items"].sum():
+        raise NoData("첫 구매 데이터가 없습니다.")
+    counts = category_segments.groupby("category")["items"].sum().sort_values(ascending=False)
+    return counts[counts > 0].head(limit)
+
+
+def ttfp_histogram(ttfp_sketch, bins=20):
+    """첫 구매까지 걸린 일 수 히스토그램 (사용자 수 배열, 구간 경계 배열). TTFP 스케치에서 계산"""
+    if ttfp_sketch.count == 0:
+        raise NoData("첫 구매 데이터가 없습니다.")
+    return ttfp_sketch.histogram(bins)
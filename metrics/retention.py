@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+
+from metrics import NoData
+from transformer.backend import as_relation
+from transformer.cohort import cohort_cells, retention_matrix
+from transformer.model import day_keys, month_key, week_keys
+
+# Retention 페이지 집계. 입력은 분석 모델의 orders 팩트입니다.
+# 코호트 함수는 as_relation()으로 감싸 실행하므로 DataFrame 대신 SQL 백엔드의 SqlRelation(transformer.backend)을 넘겨도 됩니다.
+# 코호트 함수의 state_dir는 incremental_cohort_matrix의 증분 상태 폴더입니다. (None이면 매번 전체 주문으로 계산, SQL 경로는 사용 안 함)
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def purchase_distribution(order_items):
+    """완료 주문 기준 사용자당 구매 횟수별 사용자 수 Series (구매 횟수 오름차순)"""
+    completed_orders = order_items[order_items['status'] == 'Complete']
+    if completed_orders.empty:
+        raise NoData("분석할 완료된 주문 데이터가 없습니다.")
+    user_purchase_counts = completed_orders.groupby('user_id')['order_id'].nunique()
+    return user_purchase_counts.value_counts().sort_index()
+
+
+def week_of_month(dates):
+    """날짜가 속한 주(월요일 시작)의 시작일이 그 달의 몇 번째 주인지 반환합니다."""
+    week_start = dates - pd.to_timedelta(dates.dayofweek, unit='D')
+    return (week_start.day - 1) // 7 + 1
+
+
+def _retention(orders, granularity, max_age, cohorts, state_dir, min_age=1,
+               no_orders="유효한 주문 시간이 있는 데이터가 없습니다.",
+               no_cohorts="선택된 조건에 맞는 코호트 그룹이 없습니다."):
+    """(재구매율 행렬, 코호트 크기). 인덱스는 코호트 기간 키"""
+    relation = as_relation(orders)
+    if not relation.has_complete_orders():
+        raise NoData(no_orders)
+    counts, cohort_size = relation.cohort_counts(granularity, max_age, cohorts, state_dir=state_dir)
+    if counts.empty:
+        raise NoData(no_cohorts)
+    return retention_matrix(counts, cohort_size, min_age=min_age), cohort_size
+
+
+def monthly_cohort_retention(orders, max_age_m, year=2023, state_dir=None):
+    """year년 월별 코호트(첫 구매월)의 재구매율 행렬과 코호트 크기"""
+    cohorts = [month_key(year, m) for m in range(1, 13)]
+    return _retention(orders, "month", max_age_m, cohorts, state_dir, no_cohorts="코호트 그룹의 주문 내역이 없습니다.")
+
+
+def daily_cohort_retention(orders, selected_month, selected_week, max_age_d, state_dir=None):
+    """selected_month('YYYY-MM')의 selected_week('All' 또는 월의 n번째 주) 일별 코호트 재구매율 (Age 1..max_age_d)"""
+    month = pd.Period(selected_month, freq='M')
+    days = pd.date_range(month.start_time, month.end_time.normalize(), freq='D')
+    if selected_week != 'All':
+        days = days[week_of_month(days) == selected_week]
+
+    heat, cohort_size = _retention(orders, "day", max_age_d, day_keys(days), state_dir,
+                                   no_orders="상태가 'Complete'인 주문이 없습니다.")
+    heat = heat.reindex(columns=range(1, max_age_d + 1))
+    if heat.empty:
+        raise NoData("선택된 조건의 재구매 데이터가 없습니다.")
+    return heat, cohort_size
+
+
+def weekly_cohort_retention(orders, selected_month, selected_week, max_age_w, year=2023, state_dir=None):
+    """selected_month에 시작하는 year년(ISO 연도) 주간 코호트의 재구매율 행렬과 코호트 크기"""
+    month = pd.Period(selected_month, freq='M')
+    mondays = pd.date_range(month.start_time, month.end_time, freq='W-MON')
+    mondays = mondays[(mondays.isocalendar()['year'] == year).to_numpy()]
+    if selected_week != 'All':
+        mondays = mondays[(mondays.day - 1) // 7 + 1 == selected_week]
+    return _retention(orders, "week", max_age_w, week_keys(day_keys(mondays)), state_dir)
+
+
+def repeat_purchasers(orders, year=2023):
+    """year년 주문월별 구매자 수, 재구매자(첫 구매월 이후 다시 구매) 수와 비율 DataFrame (인덱스: 'YYYY-MM')"""
+    use_cols = [c for c in ['user_id', 'created_at', 'status'] if c in orders.columns]
+    orders = orders.loc[:, use_cols].copy()
+    orders = orders[orders['user_id'].notna()].copy()
+    orders['created_at'] = pd.to_datetime(orders['created_at'], utc=True, errors='coerce')
+    orders = orders.dropna(subset=['created_at'])
+    if 'status' in orders.columns:
+        orders['status'] = orders['status'].astype(str).str.strip().str.lower()
+        orders = orders[orders['status'] == 'complete'].drop(columns=['status'])
+    if orders.empty:
+        raise NoData("상태가 'Complete'인 주문이 없습니다.")
+
+    first_time = orders.groupby('user_id', as_index=False)['created_at'].min().rename(columns={'created_at': 'first_time'})
+    first_time['cohort_month'] = first_time['first_time'].dt.to_period('M')
+    purch = orders[['user_id', 'created_at']].copy()
+    purch['order_month'] = purch['created_at'].dt.to_period('M')
+    purch = purch.drop_duplicates(['user_id', 'order_month'])
+    purch = purch.merge(first_time[['user_id', 'cohort_month']], on='user_id', how='left')
+    purch['is_returning'] = purch['cohort_month'] < purch['order_month']
+    by_month = purch.groupby('order_month')['is_returning'].agg(returning_users='sum', purchasers='count').sort_index()
+    by_month['rate_raw'] = by_month['returning_users'] / by_month['purchasers']
+    by_month['repeat_purchaser_rate'] = by_month['rate_raw'].round(3)
+
+    selected = by_month.loc[by_month.index.year == year].copy()
+    if selected.empty:
+        raise NoData(f"{year}년 데이터가 없습니다.")
+    selected.index = selected.index.astype(str)
+    return selected
+
+
+# ---------------- 요일별 재구매 ----------------
+def daily_repurchase_cells(orders, max_age_d=31, year=2023, state_dir=None):
+    """year년 일별 코호트의 관측 가능한 재구매 셀(Age 1..max_age_d)과 재구매일/첫 구매일 요일을 반환합니다."""
+    relation = as_relation(orders)
+    if not relation.has_complete_orders():
+        raise NoData("status == 'Complete' 조건을 만족하는 주문이 없습니다.")
+
+    days = day_keys(pd.date_range(f'{year}-01-01', f'{year}-12-31', freq='D'))
+    counts, cohort_size = relation.cohort_counts("day", max_age_d, days, state_dir=state_dir)
+    df = cohort_cells(counts, cohort_size, min_age=1)  # exclude same-day
+
+    # 일 키 0(1970-01-01)은 목요일이므로 +3 하면 월요일=0 요일 번호가 됨
+    df['order_wd'] = (df['cohort_key'] + df['age'] + 3) % 7   # 구매(재구매) 발생 요일
+    df['cohort_wd'] = (df['cohort_key'] + 3) % 7              # 첫 구매(코호트 시작) 요일
+    return df
+
+
+def agg_weekday(series_wd, df):
+    """요일 번호(0=월) Series별 재구매 수, 노출(코호트 크기) 합과 재구매율 DataFrame (요일 7개 모두 포함)"""
+    g = (df.groupby(series_wd, as_index=False).agg(Repeat_Orders=('active_users','sum'), Exposure=('cohort_size','sum')))
+    g = (g.set_index(series_wd.name).reindex(range(7)).fillna(0.0).reset_index().rename(columns={'index': series_wd.name}))
+    g['Repeat_Rate'] = np.where(g['Exposure'] > 0, g['Repeat_Orders'] / g['Exposure'], np.nan)
+    g['Weekday'] = g[series_wd.name].map(dict(enumerate(WEEKDAYS)))
+    return g.sort_values(series_wd.name).reset_index(drop=True)
+
+
+def weekday_repeat_rates(orders, max_age_d=31, year=2023, state_dir=None):
+    """(재구매일 요일별, 첫 구매일 요일별) 재구매율 DataFrame (daily_repurchase_cells 기준)"""
+    cells = daily_repurchase_cells(orders, max_age_d, year, state_dir)
+    return agg_weekday(cells['order_wd'], cells), agg_weekday(cells['cohort_wd'], cells)
+
+
+def weekday_weekend_rates(orders, max_age_d=31, year=2023, state_dir=None):
+    """주중 / 주말(재구매일 기준) 재구매자 수, 노출, 재구매율 DataFrame (daily_repurchase_cells 기준)"""
+    cells = daily_repurchase_cells(orders, max_age_d, year, state_dir)
+    if cells.empty:
+        raise NoData("재구매 데이터(Age≥1)가 없습니다.")
+    g = (cells.assign(is_weekend=cells['order_wd'].isin({5, 6}))
+              .groupby('is_weekend', as_index=False)
+              .agg(Repeaters=('active_users','sum'), Exposure=('cohort_size','sum')))
+    g['Rate'] = np.where(g['Exposure'] > 0, g['Repeaters'] / g['Exposure'], np.nan)
+    g['Group'] = np.where(g['is_weekend'], '주말 (토+일)', '주중 (월–금)')
+    return g.sort_values('is_weekend').reset_index(drop=True)
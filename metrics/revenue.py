@@ -0,0 +1,72 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from metrics import NoData
+from transformer.backend import as_relation
+from transformer.model import period_starts
+
+# Revenue 페이지 집계. 입력은 DataFrame 또는 SQL 백엔드의 SqlRelation(transformer.backend)입니다.
+
+
+def _relation(order_items):
+    relation = as_relation(order_items)
+    if relation.empty:
+        raise NoData("주문 상품 데이터가 없습니다.")
+    return relation
+
+
+def monthly_revenue(order_items):
+    """월별 매출 DataFrame (created_at: 월 시작일, sale_price)"""
+    revenue = _relation(order_items).group_sum("month_key", "sale_price")
+    return pd.DataFrame({
+        "created_at": period_starts(revenue.index, "month"),
+        "sale_price": revenue.to_numpy()})
+
+
+def purchase_frequency(order_items):
+    """구매 횟수(주문 수)별 사용자 수 Series (구매 횟수 오름차순)"""
+    user_order_counts = _relation(order_items).group_nunique("user_id", "order_id").rename("num_orders")
+    return user_order_counts.value_counts().sort_index()
+
+
+def revenue_per_user(order_items):
+    """사용자별 매출 Series"""
+    return _relation(order_items).group_sum("user_id", "sale_price")
+
+
+def revenue_distribution(order_items, bins=20):
+    """사용자별 매출 히스토그램 (사용자 수 배열, 구간 경계 배열). 사용자 행 대신 구간만 보관"""
+    return np.histogram(revenue_per_user(order_items).to_numpy(dtype=float), bins=bins)
+
+
+def sketch_distribution(revenue_sketch, bins=20):
+    """사용자별 매출 스케치(transformer.sketch.Sketch)로 만든 revenue_distribution과 같은 형식의 히스토그램"""
+    if revenue_sketch.count == 0:
+        raise NoData("주문 상품 데이터가 없습니다.")
+    return revenue_sketch.histogram(bins)
+
+
+def revenue_contribution(order_items, top_share=0.10):
+    """매출 상위 top_share 고객과 나머지 고객의 매출 Series (Top 10% / Others). 매출이 없으면 빈 Series"""
+    user_revenue = revenue_per_user(order_items).sort_values(ascending=False)
+    total = user_revenue.sum()
+    top_count = max(1, math.ceil(len(user_revenue) * top_share)) if len(user_revenue) > 0 else 0
+    if top_count == 0 or total <= 0:
+        return pd.Series(dtype=float)
+    top = user_revenue.head(top_count).sum()
+    return pd.Series([top, total - top], index=[f"Top {top_share:.0%}", "Others"])
+
+
+def top_revenue(order_items, by="category", limit=10):
+    """카테고리(by='category') 또는 상품 이름별 매출 상위 limit개 Series"""
+    column = "category" if by == "category" else "name"
+    return _relation(order_items).group_sum(column, "sale_price").sort_values(ascending=False).head(limit)
+
+
+def category_aov(order_items, limit=10):
+    """카테고리별 객단가(매출 / 주문 수) 상위 limit개 Series"""
+    relation = _relation(order_items)
+    aov = (relation.group_sum("category", "sale_price") / relation.group_nunique("category", "order_id")).dropna()
+    return aov.sort_values(ascending=False).head(limit)
@@ -2,7 +2,12 @@ import streamlit as st
 import pandas as pd
 import koreanize_matplotlib
 import matplotlib.pyplot as plt
-from data import load_all_data
+from data import (QUERY_BACKEND, SQL_ENGINES, load_analytics_model, load_distribution_sketches, load_filter_index, load_query_backend,
+                  load_revenue_cube)
+from transformer.model import AGE_LABELS, month_key
+from transformer.filters import take
+from transformer.versioning import cache_key
+from figure_cache import show_figure
 from charts.revenue_charts import (
     create_monthly_revenue_chart,
     create_purchase_frequency_chart,
@@ -21,11 +26,14 @@ st.set_page_config(
 st.title("💰 매출(Revenue) 분석")
 st.write("매출 관련 주요 지표(KPI) 및 트렌드를 분석합니다.")
 
-all_data = load_all_data()
-users = all_data["users"]
-products = all_data["products"]
-orders = all_data["orders"]
-order_items = all_data["order_items"]
+model = load_analytics_model()
+revenue_cube = load_revenue_cube()  # 🧮 KPI용 사전 집계 큐브
+filter_index = load_filter_index()  # 🔎 필터 차원 코드 / 외래 키 위치
+distribution_sketches = load_distribution_sketches()  # 📏 세그먼트별 사용자 매출 스케치
+users = model["users"]
+products = model["products"]
+orders = model["orders"]
+order_items = model["order_items"]
 
 # ---------------- 사이드바 ----------------
 st.sidebar.header("Filters")
@@ -47,15 +55,11 @@ status_filter = st.sidebar.multiselect(
 ## 3. 사용자 필터
 gender_filter = st.sidebar.selectbox("Gender", ["All", "M", "F"])
 
-# 연령대 구간 정의
-age_bins = [0, 20, 30, 40, 50, 60, 100]
-age_labels = ["<20", "20s", "30s", "40s", "50s", "60+"]
-users["age_group"] = pd.cut(users["age"], bins=age_bins, labels=age_labels, right=False)
-
+# 연령대(age_group)는 분석 모델에서 미리 계산됨
 age_filter = st.sidebar.multiselect(
     "Age Group",
-    options=age_labels,
-    default=age_labels)
+    options=AGE_LABELS,
+    default=AGE_LABELS)
 
 traffic_filter = st.sidebar.multiselect(
     "Traffic Source",
@@ -75,46 +79,68 @@ brand_filter = st.sidebar.multiselect(
 
 
 # ---------------- 필터 적용 ----------------
-# 1) 기간 필터 적용
-orders["year"] = pd.to_datetime(orders["created_at"]).dt.year
-orders["month"] = pd.to_datetime(orders["created_at"]).dt.month
-orders_filtered = orders[
-    (orders["year"] == selected_year) &
-    (orders["month"].isin(selected_months)) &
-    (orders["status"].isin(status_filter))]
+# 테이블마다 필터 차원 코드로 행 마스크를 만들고(isin 해시 없음), order_items에는 외래 키 위치로 옮겨 AND
+# 1) 기간 필터 적용 (분석 모델의 월 키 사용)
+selected_month_keys = [month_key(selected_year, m) for m in selected_months]
+orders_mask = filter_index["orders"].mask(month_key=selected_month_keys, status=status_filter)
 
 # 2) 사용자 필터 적용
-users_filtered = users.copy()
-if gender_filter != "All":
-    users_filtered = users_filtered[users_filtered["gender"] == gender_filter]
-users_filtered = users_filtered[
-    (users_filtered["age_group"].isin(age_filter)) &
-    (users_filtered["traffic_source"].isin(traffic_filter))]
+users_mask = filter_index["users"].mask(
+    gender=None if gender_filter == "All" else gender_filter,
+    age_group=age_filter,
+    traffic_source=traffic_filter)
 
 # 3) 상품 필터 적용
-products_filtered = products[
-    (products["category"].isin(category_filter)) &
-    (products["brand"].isin(brand_filter))]
-
-
+products_mask = filter_index["products"].mask(category=category_filter, brand=brand_filter)
+
+# 4) order_items 필터 적용 (주문 / 상품 / 사용자 조건을 한 번에)
+if QUERY_BACKEND in SQL_ENGINES:
+    # SQL 백엔드(ZB_QUERY_BACKEND=sql | sqlite): 같은 필터를 WHERE 조건으로 넘기고 차트 집계는 엔진에서 실행
+    query_backend = load_query_backend()
+    sql_where = {
+        "orders": {"month_key": selected_month_keys, "status": status_filter},
+        "users": {"gender": None if gender_filter == "All" else [gender_filter],
+                  "age_group": age_filter, "traffic_source": traffic_filter},
+        "products": {"category": category_filter, "brand": brand_filter}}
+    order_items_filtered = query_backend.relation("order_items", where=sql_where)
+else:
+    order_items_rows = filter_index["order_items"].rows(
+        where={"orders": orders_mask, "products": products_mask, "users": users_mask})
+    order_items_filtered = take(order_items, order_items_rows)
 
-# 4) order_items 필터 적용
-order_items_filtered = order_items[
-    order_items["order_id"].isin(orders_filtered["order_id"])]
-order_items_filtered = order_items_filtered[
-    order_items_filtered["product_id"].isin(products_filtered["id"])]
-order_items_filtered = order_items_filtered[
-    order_items_filtered["user_id"].isin(users_filtered["id"])]
+# 차트 캐시 키: 필터링된 DataFrame을 해시하는 대신 (원본 테이블 버전, 필터 값)으로 캐시를 찾음
+chart_key = cache_key(
+    orders, users, products, order_items,
+    year=selected_year, months=selected_months, status=status_filter,
+    gender=gender_filter, age=age_filter, traffic=traffic_filter,
+    category=category_filter, brand=brand_filter, backend=QUERY_BACKEND)
 
 
 # ---------------- KPI 계산 ----------------
-# 모든 KPI를 order_items_filtered 기준으로 (필터 일관성)
-total_revenue = order_items_filtered["sale_price"].sum()
-total_orders = order_items_filtered["order_id"].nunique()
-purchasing_users = order_items_filtered["user_id"].nunique()
+# 모든 KPI를 order_items_filtered와 같은 필터 기준으로 (필터 일관성)
+# 원본 행을 다시 필터링하지 않고 매출 큐브의 셀을 합쳐 계산
+user_filters = dict(
+    gender=None if gender_filter == "All" else [gender_filter],
+    age_group=age_filter,
+    traffic_source=traffic_filter)
+kpi = revenue_cube.rollup(
+    month_key=selected_month_keys, status=status_filter,
+    category=category_filter, brand=brand_filter, **user_filters)
+total_revenue = kpi["revenue"]
+total_orders = kpi["orders"]
+purchasing_users = kpi["users"]
 
 # 전체 유저 수 (필터 반영된 users 기준)
-total_users = users_filtered["id"].nunique()
+total_users = revenue_cube.user_count(**user_filters)
+
+# 사용자별 매출 분포: 상품 필터가 전체이고 기간이 전체 또는 한 달, 주문 상태가 전체 또는 하나이면 세그먼트 스케치를 합쳐 계산
+# (그 밖의 조합은 사용자별 합계를 스케치로 나눌 수 없어 필터된 주문 상품으로 정확히 계산)
+revenue_sketch = None
+if products_mask.all():
+    if filter_index["orders"].mask(status=status_filter).all():
+        revenue_sketch = distribution_sketches.revenue_sketch(selected_month_keys, None, **user_filters)
+    elif len(set(status_filter)) == 1:
+        revenue_sketch = distribution_sketches.revenue_sketch(selected_month_keys, status_filter[0], **user_filters)
 
 # ARPU / ARPPU / AOV
 arpu = total_revenue / total_users if total_users > 0 else 0
@@ -151,9 +177,9 @@ with col6:
 st.subheader("Monthly Revenue Trend (시간 흐름별 매출 추이)")
 st.write("선택한 기간 동안의 월별 총 매출 변화 추이를 보여줍니다. 계절적 요인이나 마케팅 활동에 따른 매출 변화를 파악할 수 있습니다.")
 
-monthly_revenue_fig = create_monthly_revenue_chart(order_items_filtered)
+monthly_revenue_fig = create_monthly_revenue_chart(order_items_filtered, chart_key)
 if monthly_revenue_fig:
-    st.pyplot(monthly_revenue_fig)
+    show_figure(monthly_revenue_fig)
 else:
     st.warning("매출 추이 데이터를 표시할 수 없습니다.")
 
@@ -167,19 +193,19 @@ st.write("고객들의 구매 패턴과 매출 기여도를 다각도로 분석
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    purchase_freq_fig = create_purchase_frequency_chart(order_items_filtered)
+    purchase_freq_fig = create_purchase_frequency_chart(order_items_filtered, chart_key)
     if purchase_freq_fig:
-        st.pyplot(purchase_freq_fig)
+        show_figure(purchase_freq_fig)
 
 with col2:
-    revenue_contrib_fig = create_revenue_contribution_chart(order_items_filtered)
+    revenue_contrib_fig = create_revenue_contribution_chart(order_items_filtered, chart_key)
     if revenue_contrib_fig:
-        st.pyplot(revenue_contrib_fig)
+        show_figure(revenue_contrib_fig)
 
 with col3:
-    revenue_dist_fig = create_revenue_distribution_chart(order_items_filtered)
+    revenue_dist_fig = create_revenue_distribution_chart(order_items_filtered, chart_key, revenue_sketch)
     if revenue_dist_fig:
-        st.pyplot(revenue_dist_fig)
+        show_figure(revenue_dist_fig)
 
 
 
@@ -187,26 +213,28 @@ with col3:
 st.subheader("Category & Product Revenue Analysis (카테고리 / 상품별 매출)")
 st.write("어떤 카테고리와 상품이 매출을 주도하는지, 카테고리별 평균 구매 금액(객단가)은 어떤지 분석합니다.")
 
-# order_items + products 조인
-order_items_merged = order_items_filtered.merge(
-    products_filtered[["id", "category", "name"]],
-    left_on="product_id", right_on="id", how="inner"
-)
+# order_items + products 조인 (외래 키 위치로 상품 컬럼을 바로 가져옴, merge의 inner join과 같은 결과)
+if QUERY_BACKEND in SQL_ENGINES:
+    order_items_merged = query_backend.relation("order_items", where=sql_where, product_columns=["category", "name"])
+else:
+    product_rows = filter_index["order_items"].foreign_keys["products"][order_items_rows]
+    order_items_merged = order_items_filtered.reset_index(drop=True).assign(**{
+        column: products[column].array.take(product_rows) for column in ["id", "category", "name"]})
 
 # ---------------- 레이아웃 (3열) ----------------
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    top_cat_rev_fig = create_top_revenue_chart(order_items_merged, by='category')
+    top_cat_rev_fig = create_top_revenue_chart(order_items_merged, chart_key, by='category')
     if top_cat_rev_fig:
-        st.pyplot(top_cat_rev_fig)
+        show_figure(top_cat_rev_fig)
 
 with col2:
-    top_prod_rev_fig = create_top_revenue_chart(order_items_merged, by='product')
+    top_prod_rev_fig = create_top_revenue_chart(order_items_merged, chart_key, by='product')
     if top_prod_rev_fig:
-        st.pyplot(top_prod_rev_fig)
+        show_figure(top_prod_rev_fig)
 
 with col3:
-    cat_aov_fig = create_category_aov_chart(order_items_merged)
+    cat_aov_fig = create_category_aov_chart(order_items_merged, chart_key)
     if cat_aov_fig:
-        st.pyplot(cat_aov_fig)
+        show_figure(cat_aov_fig)
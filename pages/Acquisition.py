@@ -4,12 +4,17 @@ import streamlit as st
 import pandas as pd
 
 # 데이터 로더는 별도 파일에서 관리 (좋은 방법입니다!)
-from data import load_all_data
+from data import (RESULT_STORE, load_all_data, load_user_index, load_path_index, load_funnel_index,
+                  load_demographic_crosstab)
+from metrics import acquisition
+from transformer.timeindex import months_present, time_range, time_slice
+from transformer.versioning import cache_key
+from figure_cache import show_figure
 from charts.acquisition_charts import (
     create_mau_revenue_chart, create_sankey_chart, create_funnel_chart,
     create_traffic_distribution_chart, analyze_conversion_rate_by_source_2023,
     create_country_chart, create_gender_chart, create_age_chart,
-    calculate_dau_by_month
+    calculate_dau_by_month, calculate_funnel_breakdown
 ) 
 from style_config import PRIMARY_COLOR, SECONDARY_COLOR
 
@@ -23,71 +28,71 @@ st.write("사용자 유입 및 전환 과정을 분석하여 비즈니스 성과
 
 # --- 데이터 로딩 ---
 all_data = load_all_data()
+user_index = load_user_index()  # 🧊 일별/세그먼트 사용자 비트맵 (DAU/MAU/순 사용자 수)
+path_index = load_path_index()  # 🔀 세션 / 시간순으로 정렬한 이벤트 코드 (Sankey)
+funnel_index = load_funnel_index()  # 🔻 세션별 이벤트 첫 발생 시각 (퍼널)
+demographics = load_demographic_crosstab()  # 👥 가입일 x 유입 경로 x 국가 x 성별 x 연령대 사용자 수
 
-if not all_data:
+if all_data is None or user_index is None or path_index is None or funnel_index is None:
     st.error("데이터를 불러오는데 실패했습니다. `data` 폴더를 확인해주세요.")
 else:
-    events = all_data["events"]
+    # 날짜 위젯 범위에는 created_at만 필요하므로 events는 그 컬럼만 읽음 (지표는 사용자 / 경로 / 퍼널 인덱스에서 계산)
+    events = all_data.table("events", columns=["created_at"])
     order_items = all_data["order_items"]
-    users = all_data["users"]
     orders = all_data["orders"]
 
-    events_master = events.copy()
-    order_items_master = order_items.copy()
-    users_master = users.copy()
-    orders_master = orders.copy()
+    # @st.cache_data 로더가 호출마다 새 복사본을 주므로 다시 복사하지 않음 (기간 슬라이스는 이 테이블의 뷰)
+    events_master = events
+    order_items_master = order_items
+    orders_master = orders
+
+    # 차트 캐시 키: DataFrame 내용을 해시하지 않고 원본 테이블의 버전 ID만 사용 (기간 등은 인자로 전달)
+    events_key = cache_key(events_master)
+    demographics_key = cache_key(demographics)
+    index_key = cache_key(user_index)
+    mau_key = cache_key(order_items_master, user_index)
+    path_key = cache_key(path_index)
+    funnel_key = cache_key(funnel_index)
 
     # --- 사이드바: 컨트롤 패널 ---
     st.sidebar.header("컨트롤 패널")
     
     # --- 1. 날짜 필터 위젯 추가 ---
     st.sidebar.subheader("날짜 필터")
+    # events는 created_at 순으로 정렬되어 있으므로 양 끝 행만 봄 (전체 컬럼 min / max 없음)
+    first_event, last_event = time_range(events_master)
     start_date = st.sidebar.date_input(
         "시작일",
-        events_master['created_at'].min(),
-        min_value=events_master['created_at'].min(),
-        max_value=events_master['created_at'].max()
+        first_event,
+        min_value=first_event,
+        max_value=last_event
     )
     end_date = st.sidebar.date_input(
         "종료일",
-        events_master['created_at'].max(),
-        min_value=events_master['created_at'].min(),
-        max_value=events_master['created_at'].max()
+        last_event,
+        min_value=first_event,
+        max_value=last_event
     )
 
     # --- 날짜 필터링 ---
     start_datetime = pd.to_datetime(start_date).tz_localize('UTC')
     end_datetime = pd.to_datetime(end_date).tz_localize('UTC') + pd.Timedelta(days=1)
 
-    events = events_master[
-        (events_master['created_at'] >= start_datetime) &
-        (events_master['created_at'] < end_datetime)
-    ]
-    order_items = order_items_master[
-        (order_items_master['created_at'] >= start_datetime) &
-        (order_items_master['created_at'] < end_datetime)
-    ]
-    users = users_master[
-        (users_master['created_at'] >= start_datetime) &
-        (users_master['created_at'] < end_datetime)
-    ]
-    orders = orders_master[
-        (orders_master['created_at'] >= start_datetime) &
-        (orders_master['created_at'] < end_datetime)
-    ]
+    # 팩트 테이블은 created_at 순으로 정렬되어 있어 searchsorted 슬라이스(복사 없음)
+    # (가입자 기준 차트는 인구통계 교차표에서 가입일 범위로 집계하므로 users는 자르지 않음)
+    events = time_slice(events_master, start_datetime, end_datetime)
+    order_items = time_slice(order_items_master, start_datetime, end_datetime)
+    orders = time_slice(orders_master, start_datetime, end_datetime)
 
 
     # --- 메인 콘텐츠 ---
 
     # 1. 선택된 '전체 기간'에 대한 KPI 계산
     
-    # 전체 기간 총 매출 계산
-    valid_status = ['Complete'] # 실제 매출은 'Complete' 상태만 집계
-    total_revenue = order_items['sale_price'][order_items['status'].isin(valid_status)].sum()
-
-    # 전체 기간 총 순 방문자 수(Unique Users) 계산
-    # MAU의 합계가 아닌, 전체 기간의 고유한 user_id 수를 계산해야 합니다.
-    total_unique_users = events['user_id'].nunique()
+    # 전체 기간 총 매출('Complete' 상태만)과 총 순 방문자 수(Unique Users)
+    # MAU의 합계가 아닌, 전체 기간의 고유한 user_id 수를 계산해야 합니다. (기간 내 일별 비트맵 OR 후 popcount)
+    total_revenue, total_unique_users = RESULT_STORE.fetch(
+        acquisition.period_kpis, (mau_key, start_date, end_date), order_items, user_index, start_date, end_date)
 
     # 2. KPI 지표 표시 (수정된 값 사용)
     st.header(f"{start_date.strftime('%Y-%m-%d')} ~ {end_date.strftime('%Y-%m-%d')} 핵심 성과 지표")
@@ -95,6 +100,9 @@ else:
     col1, col2 = st.columns(2)
     col1.metric("총 매출 (Total Revenue)", f"${total_revenue:,.2f}")
     col2.metric("총 순 방문자 수 (Unique Users)", f"{total_unique_users:,.0f} 명")
+    if user_index.relative_error:
+        # 근사 모드(ZB_DISTINCT_COUNT=approx): HLL 스케치 추정값의 상대 표준오차 표시
+        col2.caption(f"HyperLogLog 근사값 (상대 오차 약 ±{user_index.relative_error:.1%}, 95% 구간 ±{2 * user_index.relative_error:.1%})")
     
     st.divider()
 
@@ -108,17 +116,41 @@ else:
         st.subheader("주요 행동 전환 분석 (Funnel)")
         st.write("사용자가 제품 탐색부터 구매 완료까지 각 단계에서 얼마나 전환되는지를 시각적으로 보여줍니다. 각 단계 사이의 이탈률을 파악할 수 있습니다.")
         funnel_stages = [['department','product'],'cart','purchase']
-        funnel_fig = create_funnel_chart(events, funnel_stages, start_date, end_date)
+        funnel_fig = create_funnel_chart(funnel_index, funnel_key, funnel_stages, start_date, end_date)
         if funnel_fig:
             st.plotly_chart(funnel_fig, use_container_width=True)
         else:
             st.warning("퍼널 차트를 생성할 수 없습니다.")
 
+        # 🔻 단계를 바꿔도 세션별 첫 발생 시각 배열만 다시 비교하므로 바로 갱신됩니다.
+        with st.expander("퍼널 단계 직접 구성"):
+            custom_stages = st.multiselect("단계 (선택한 순서대로)", list(funnel_index.names), default=['product', 'cart', 'purchase'])
+            col1, col2, col3 = st.columns(3)
+            funnel_type = col1.selectbox(
+                "퍼널 유형", ["open", "closed", "hybrid"],
+                format_func={"open": "단계별 독립 (open)", "closed": "순서대로 (closed)", "hybrid": "순서 무관 (hybrid)"}.get)
+            window_hours = col2.number_input("전환 기간 제한 (시간, 0 = 제한 없음)", min_value=0, value=0, step=1)
+            breakdown = col3.selectbox(
+                "나누어 보기", ["traffic_source", "month", "week"],
+                format_func={"traffic_source": "유입 경로", "month": "월", "week": "주"}.get)
+            if custom_stages:
+                window = int(window_hours) * 3600 if window_hours else None
+                custom_fig = create_funnel_chart(funnel_index, funnel_key, custom_stages, start_date, end_date, funnel_type, window)
+                if custom_fig:
+                    st.plotly_chart(custom_fig, use_container_width=True)
+                    funnel_counts, funnel_rates = calculate_funnel_breakdown(
+                        funnel_index, funnel_key, custom_stages, start_date, end_date, funnel_type, window, breakdown)
+                    if funnel_counts is not None:
+                        st.write("#### 첫 단계 대비 전환율 (%)")
+                        st.dataframe(funnel_rates.style.format('{:.1f}'))
+                else:
+                    st.warning("선택한 단계로 퍼널을 만들 수 없습니다.")
+
         st.divider()
 
         st.subheader("사용자 행동 흐름 (Sankey)")
         st.write("사용자들이 웹사이트/앱 내에서 어떤 순서로 페이지를 이동하고 행동하는지 흐름을 시각화하여 보여줍니다. 주요 사용자 경로와 이탈 지점을 파악하는 데 유용합니다.")
-        sankey_fig = create_sankey_chart(events, start_date, end_date)
+        sankey_fig = create_sankey_chart(path_index, path_key, start_date, end_date)
         if sankey_fig:
             st.plotly_chart(sankey_fig, use_container_width=True)
         else:
@@ -139,11 +171,11 @@ else:
 
         st.subheader("전체 유입 경로 분포")
         st.write("어떤 채널(e.g., Facebook, Google, Email)을 통해 사용자들이 유입되었는지 분포를 보여줍니다. 가장 효과적인 유입 채널을 파악할 수 있습니다.")
-        dist_fig, dist_data = create_traffic_distribution_chart(users, start_date, end_date)
+        dist_fig, dist_data = create_traffic_distribution_chart(demographics, demographics_key, start_date, end_date)
         if dist_fig:
             col1, col2 = st.columns([2, 1])
             with col1:
-                st.pyplot(dist_fig)
+                show_figure(dist_fig)
             with col2:
                 st.write("#### 데이터 요약")
                 # --- 수정: 스타일을 적용하기 전에 reset_index()를 호출하여 숫자 인덱스를 갖도록 함 ---
@@ -158,7 +190,7 @@ else:
         # # --- 분석 1 섹션 ---
         # st.subheader("📊 분석 1: 유입 경로별 구매 전환율")
         # with st.spinner('구매 전환율을 분석 중입니다...'):
-        #     conv_df, conv_fig = analyze_conversion_rate_by_source_2023(users, orders)
+        #     conv_df, conv_fig = analyze_conversion_rate_by_source_2023(users, orders, cache_key(users_master, orders_master))
         #     if conv_df is not None and conv_fig is not None:
         #         st.write("유입 경로별 신규 가입자 수, 구매자 수, 구매 전환율을 나타냅니다.")
 
@@ -173,7 +205,7 @@ else:
         # 1. 메인 화면에 필터 배치
         filter_col, _ = st.columns([1, 2])
         with filter_col:
-            traffic_sources = ['All'] + sorted(users['traffic_source'].unique())
+            traffic_sources = ['All'] + sorted(dist_data.index if dist_data is not None else [])
             selected_source = st.selectbox(
                 "분석할 유입 경로 선택:", 
                 traffic_sources,
@@ -186,9 +218,9 @@ else:
         else:
             # --- 핵심 수정 부분 ---
             # 3. 각 차트 생성 함수에 selected_source를 인자로 '전달'
-            country_fig, user_count, country_data = create_country_chart(users, start_date, end_date, selected_source)
-            gender_fig = create_gender_chart(users, start_date, end_date, selected_source)
-            age_fig, age_data = create_age_chart(users, start_date, end_date, selected_source)
+            country_fig, user_count, country_data = create_country_chart(demographics, demographics_key, start_date, end_date, selected_source)
+            gender_fig = create_gender_chart(demographics, demographics_key, start_date, end_date, selected_source)
+            age_fig, age_data = create_age_chart(demographics, demographics_key, start_date, end_date, selected_source)
 
             if user_count > 0:
                 st.write(f"선택된 기간 동안 '{selected_source}'를 통해 유입된 사용자는 총 **{user_count}명**입니다.")
@@ -203,7 +235,7 @@ else:
 
                 
             if age_fig:
-                        st.pyplot(age_fig)
+                        show_figure(age_fig)
                         with st.expander("상세 데이터 보기"):
                             # age_data는 인덱스가 'age_group'으로 되어 있으므로 reset_index() 필요
                             st.dataframe(age_data.reset_index(drop=True).style.apply(highlight_top_rows, axis=1))
@@ -216,17 +248,17 @@ else:
     with tab3:
         st.subheader("월별 매출 및 활성 사용자 수 (MAU)")
         st.write("월별 총 매출과 해당 월에 한 번 이상 방문한 순수 사용자 수(MAU)의 추이를 함께 보여줍니다. 비즈니스의 성장성과 사용자 참여도를 동시에 파악할 수 있습니다.")
-        mau_revenue_fig, _ = create_mau_revenue_chart(order_items, events, start_date, end_date)
-        st.pyplot(mau_revenue_fig)
+        mau_revenue_fig, _ = create_mau_revenue_chart(order_items, user_index, mau_key, start_date, end_date)
+        show_figure(mau_revenue_fig)
+        if user_index.relative_error:
+            st.caption(f"MAU / DAU는 HyperLogLog 근사값입니다. (상대 오차 약 ±{user_index.relative_error:.1%})")
 
         st.divider()
         st.subheader("일일 활성 사용자 수 (DAU)")
         st.write("선택한 기간 동안 매일 방문한 순수 사용자 수(DAU)의 추이를 보여줍니다. 단기적인 사용자 활동성과 이벤트 효과 등을 파악하는 데 유용합니다.")
         # 데이터에서 선택 가능한 월 목록 생성 ('YYYY-MM' 형식)
-        available_months = ['전체 기간'] + sorted(
-            events_master['created_at'].dt.to_period('M').astype(str).unique(),
-            reverse=True
-        )
+        # (월마다 searchsorted로 행이 있는지만 확인, 타임스탬프 문자열 변환 없음)
+        available_months = ['전체 기간'] + sorted(months_present(events_master), reverse=True)
         
         # 컬럼을 사용해 필터의 너비를 조절
         filter_col, _ = st.columns([1, 3])
@@ -239,7 +271,7 @@ else:
         
 
         # DAU 데이터 계산 시 selected_month 전달
-        dau_data = calculate_dau_by_month(events_master, selected_month)
+        dau_data = calculate_dau_by_month(user_index, index_key, selected_month)
 
         if dau_data is not None and not dau_data.empty:
             st.line_chart(dau_data)
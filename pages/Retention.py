@@ -3,7 +3,11 @@ import pandas as pd
 import koreanize_matplotlib
 import matplotlib.pyplot as plt
 
-from data import load_all_data
+from data import QUERY_BACKEND, SQL_ENGINES, load_all_data, load_analytics_model, load_query_backend
+from transformer.model import month_key
+from transformer.timeindex import time_range
+from transformer.versioning import cache_key
+from figure_cache import show_figure
 from charts.retention_charts import (
     create_purchase_distribution_chart, 
      create_advanced_cohort_heatmap,
@@ -32,7 +36,6 @@ if not all_data :
     st.error("주문(order_items) 데이터를 불러오는데 실패했습니다.")
 else:
 
-    events = all_data["events"]
     order_items = all_data["order_items"]
     users = all_data["users"]
     orders = all_data["orders"]
@@ -40,10 +43,20 @@ else:
     products_master = products.copy()
 
 
-    events_master = events.copy()
     order_items_master = order_items.copy()
     users_master = users.copy()
-    orders_master = orders.copy()
+    # 코호트 엔진이 쓰는 is_complete / 일·주·월 키가 이미 계산된 분석 모델의 주문 팩트 사용
+    orders_master = load_analytics_model()["orders"]
+
+    # 차트 캐시 키: orders DataFrame 내용을 해시하지 않고 로딩 시 붙인 버전 ID만 사용
+    orders_key = cache_key(orders_master)
+
+    # 코호트 히트맵 / 요일별 재구매 집계 입력: SQL 백엔드(ZB_QUERY_BACKEND=sql | sqlite)면 코호트 행렬을 엔진에서 계산
+    if QUERY_BACKEND in SQL_ENGINES:
+        cohort_orders = load_query_backend().relation("orders")
+        cohort_key = cache_key(orders_master, backend=QUERY_BACKEND)
+    else:
+        cohort_orders, cohort_key = orders_master, orders_key
 
     raw_data_schema={
             'user_id': 'session_id', 'event_name': 'event_type', 'event_timestamp': 'created_at'
@@ -72,8 +85,9 @@ else:
             # --- 사이드바: 컨트롤 패널 ---
     st.sidebar.header("컨트롤 패널")
     st.sidebar.subheader("날짜 필터")
-    start_date = st.sidebar.date_input("시작일", orders_master['created_at'].min())
-    end_date = st.sidebar.date_input("종료일", orders_master['created_at'].max())
+    first_order, last_order = time_range(orders_master)
+    start_date = st.sidebar.date_input("시작일", first_order)
+    end_date = st.sidebar.date_input("종료일", last_order)
             
     st.sidebar.divider()
     st.sidebar.subheader("차트 옵션")
@@ -93,13 +107,13 @@ else:
             order_items = all_data["order_items"]
             
             # 차트 생성 함수 호출
-            dist_fig, dist_data = create_purchase_distribution_chart(orders_master)
+            dist_fig, dist_data = create_purchase_distribution_chart(orders_master, orders_key)
             
             if dist_fig:
                 # 컬럼을 사용해 차트와 데이터를 나란히 표시
                 col1, col2 = st.columns([2, 1])
                 with col1:
-                    st.pyplot(dist_fig)
+                    show_figure(dist_fig)
                 with col2:
                     st.write("#### 데이터 요약")
                     st.dataframe(dist_data)
@@ -168,10 +182,10 @@ else:
         st.subheader("월별 첫 구매 고객 재구매율 분석")
         st.write("각 월별로 발생한 총 구매 중, 기존 고객(재구매자)의 구매가 차지하는 비율을 보여줍니다. 이 비율이 높을수록 고객 충성도가 높다고 해석할 수 있습니다.")
 
-        repeat_fig, repeat_df = create_repeat_purchaser_chart(orders_master)
+        repeat_fig, repeat_df = create_repeat_purchaser_chart(orders_master, orders_key)
 
         if repeat_fig:
-            st.pyplot(repeat_fig)
+            show_figure(repeat_fig)
             with st.expander("상세 데이터 보기"):
                 st.dataframe(repeat_df[['returning_users','purchasers','repeat_purchaser_rate']])
         else:
@@ -193,13 +207,14 @@ else:
         
         # 고급 코호트 분석 함수 호출
         cohort_fig, cohort_df = create_advanced_cohort_heatmap(
-            orders_master, 
+            cohort_orders, 
+            cohort_key,
             12, 
             show_annotations
         )
 
         if cohort_fig:
-            st.pyplot(cohort_fig)
+            show_figure(cohort_fig)
             with st.expander("상세 데이터 보기"):
                 # .style.format()은 PeriodIndex에서 오류가 발생할 수 있으므로 안전하게 처리
                 try:
@@ -207,7 +222,7 @@ else:
                 except Exception:
                     st.dataframe(cohort_df)
         else:
-            # 함수 내부에서 st.warning으로 이미 메시지를 보여주므로 여기서는 pass
+            # 함수 내부에서 show_warning으로 이미 메시지를 보여주므로(캐시 적중 시에도 다시 표시) 여기서는 pass
             pass
 
                 # 수정: 함수 호출 시 year 인자 제거
@@ -219,12 +234,9 @@ else:
         st.write("월별 분석보다 더 세분화하여, 특정 주에 첫 구매를 한 고객 그룹이 매주 얼마나 재방문하여 구매하는지 추적합니다. 단기적인 변화나 특정 이벤트의 효과를 분석하는 데 유용합니다.")
 
         # --- 필터 위젯 ---
-        # 데이터에서 선택 가능한 월 목록 동적 생성
-        temp_df = orders_master.copy()
-        # 2023년 데이터만 필터링
-        temp_df = temp_df[pd.to_datetime(temp_df['created_at']).dt.year == 2023]
-        temp_df['cohort_month'] = pd.to_datetime(temp_df['created_at']).dt.to_period('M').astype(str)
-        available_months = sorted(temp_df['cohort_month'].unique(), reverse=True)
+        # 데이터에서 선택 가능한 월 목록 동적 생성 (분석 모델의 월 키 사용, 2023년만)
+        order_month_keys = set(orders_master["month_key"].unique())
+        available_months = [f"2023-{m:02d}" for m in range(12, 0, -1) if month_key(2023, m) in order_month_keys]
         
         col1, col2, col3 = st.columns([1, 1, 2])
         with col1:
@@ -243,7 +255,8 @@ else:
         # --- 차트 생성 및 표시 ---
         if selected_month:
             weekly_fig, weekly_df = create_weekly_cohort_heatmap(
-                orders_master, 
+                cohort_orders, 
+                cohort_key,
                 selected_month,
                 selected_week,
                 max_age_option, 
@@ -251,7 +264,7 @@ else:
             )
 
             if weekly_fig:
-                st.pyplot(weekly_fig)
+                show_figure(weekly_fig)
                 with st.expander("상세 데이터 보기"):
                     st.dataframe(weekly_df.style.format("{:.2%}"))
             else:
@@ -279,6 +292,7 @@ else:
         # if selected_month:
         #     daily_fig, daily_df = create_daily_cohort_heatmap(
         #         orders_master, 
+        #         orders_key,
         #         selected_month2,
         #         selected_week,
         #         max_age_option, 
@@ -299,10 +313,10 @@ else:
         st.write("사용자의 첫 구매 요일과 실제 재구매가 발생한 요일 간의 관계를 분석합니다. 특정 요일에 첫 구매를 유도하는 것이 재구매율에 영향을 미치는지 파악할 수 있습니다.")
 
         # 새로 만든 함수 호출
-        weekday_fig, order_data, cohort_data = create_weekday_repeat_purchase_charts(orders_master, start_date, end_date)
+        weekday_fig, order_data, cohort_data = create_weekday_repeat_purchase_charts(cohort_orders, cohort_key, start_date, end_date)
 
         if weekday_fig:
-            st.pyplot(weekday_fig)
+            show_figure(weekday_fig)
             
             with st.expander("상세 데이터 보기"):
                 col1, col2 = st.columns(2)
@@ -321,7 +335,7 @@ else:
         # --- ✨ [섹션 추가] 주중/주말 재구매율 비교 ---
         st.subheader("주중 vs 주말 재구매율 비교")
         st.write("전체 재구매 활동이 주중과 주말 중 어느 시기에 더 활발하게 일어나는지 비교 분석합니다.")
-        weekday_fig, weekday_tbl = create_weekday_weekend_chart(orders_master, start_date, end_date)
+        weekday_fig, weekday_tbl = create_weekday_weekend_chart(cohort_orders, cohort_key, start_date, end_date)
         
         if weekday_fig:
             col1, col2 = st.columns([1, 1.5])
@@ -329,7 +343,7 @@ else:
                 st.write("#### 분석 요약 테이블")
                 st.dataframe(weekday_tbl, hide_index=True)
             with col2:
-                st.pyplot(weekday_fig)
+                show_figure(weekday_fig)
         else:
             st.warning("주중/주말 분석을 위한 데이터가 부족합니다.")
 
@@ -0,0 +1,166 @@
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# --- 🗓️ 월 단위 파티션 저장소 ---
+# created_at의 연 / 월로 나눈 폴더에 Parquet 파일을 저장합니다.
+#   <root>/year=2023/month=07/part-00000.parquet
+#   <root>/_manifest.json          (쓰기가 끝났다는 표시. 행 수와 갱신 시각, 수정 시각이 테이블 버전이 됨)
+# 읽을 때는 요청한 기간과 겹치는 월 폴더의 파일만 열기 때문에, 기록이 여러 해로 늘어나도 로딩 시간과 메모리는
+# 분석 기간만큼만 듭니다. 새 행을 추가(append)하면 해당 월 폴더에 파일을 하나 더 쓰고, 기존 파일은 건드리지 않습니다.
+# created_at이 없는 행은 Hive 관례대로 NULL_PARTITION 폴더에 두고, 기간을 지정하지 않을 때만 읽습니다.
+
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+MANIFEST = "_manifest.json"
+
+
+def arrow_schema(df):
+    """df의 Arrow 스키마. 청크마다 category 개수가 달라도 같은 스키마가 되도록 사전 인덱스를 int32로 고정"""
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_dictionary(field.type):
+            schema = schema.set(i, field.with_type(pa.dictionary(pa.int32(), field.type.value_type)))
+    return schema
+
+
+def _partition_name(year, month):
+    if year is None:
+        return f"year={NULL_PARTITION}/month={NULL_PARTITION}"
+    return f"year={year:04d}/month={month:02d}"
+
+
+def _partition_month(directory):
+    """월 폴더 경로 -> (연, 월). NULL_PARTITION 폴더면 None"""
+    year = directory.parent.name.split("=", 1)[1]
+    if year == NULL_PARTITION:
+        return None
+    return int(year), int(directory.name.split("=", 1)[1])
+
+
+def _split_by_month(df, column):
+    """df를 created_at 연 / 월별로 나눠 ((연, 월) 또는 (None, None), 부분 DataFrame)을 내보냅니다."""
+    created_at = df[column]
+    keys = (created_at.dt.year * 100 + created_at.dt.month).fillna(-1).astype("int64")
+    for key, rows in df.groupby(keys.to_numpy(), sort=True).indices.items():
+        part = df.iloc[rows]
+        yield ((None, None) if key < 0 else divmod(int(key), 100)), part
+
+
+class PartitionedTable:
+    """created_at 연 / 월로 파티션한 Parquet 테이블 하나. (root 폴더 단위)"""
+
+    def __init__(self, root, column="created_at"):
+        self.root = Path(root)
+        self.column = column
+
+    @property
+    def manifest(self):
+        return self.root / MANIFEST
+
+    def exists(self):
+        return self.manifest.exists()
+
+    def write(self, chunks):
+        """청크(DataFrame)들로 테이블 전체를 다시 씁니다. 쓴 행 수를 반환합니다.
+
+        월마다 ParquetWriter를 열어 두고 청크를 나눠 기록하므로 전체 테이블을 메모리에 올리지 않습니다.
+        임시 폴더에 모두 쓴 뒤 교체하여, 쓰는 도중의 파티션을 다른 워커가 읽지 않도록 합니다.
+        """
+        tmp_root = self.root.with_name(f"{self.root.name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        writers, schema, rows = {}, None, 0
+        try:
+            for chunk in chunks:
+                schema = schema or arrow_schema(chunk)
+                for month, part in _split_by_month(chunk, self.column):
+                    if month not in writers:
+                        path = tmp_root / _partition_name(*month) / "part-00000.parquet"
+                        path.parent.mkdir(parents=True, exist_ok=True)
+                        writers[month] = pq.ParquetWriter(path, schema, compression="zstd")
+                    writers[month].write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False))
+                rows += len(chunk)
+            if not writers and schema is not None:
+                # 행이 없는 테이블(헤더만 있는 CSV)도 스키마를 읽을 수 있도록 빈 파일 하나를 NULL_PARTITION에 둠
+                path = tmp_root / _partition_name(None, None) / "part-00000.parquet"
+                path.parent.mkdir(parents=True, exist_ok=True)
+                pq.write_table(schema.empty_table(), path, compression="zstd")
+        finally:
+            for writer in writers.values():
+                writer.close()
+        tmp_root.mkdir(parents=True, exist_ok=True)
+        self._write_manifest(tmp_root, rows)
+
+        # 기존 폴더를 옆으로 옮긴 뒤 교체하고 삭제 (폴더는 os.replace로 덮어쓸 수 없음)
+        old_root = self.root.with_name(f"{self.root.name}.{os.getpid()}.old")
+        if self.root.exists():
+            os.replace(self.root, old_root)
+        os.replace(tmp_root, self.root)
+        shutil.rmtree(old_root, ignore_errors=True)
+        return rows
+
+    def append(self, df):
+        """df 행을 월별로 나눠 각 월 폴더에 새 파일로 추가하고, 쓴 파일 목록을 반환합니다. (기존 파일은 다시 쓰지 않음)"""
+        first = next(self.files(), None)
+        schema = pq.read_schema(first) if first is not None else arrow_schema(df)
+        stamp = time.time_ns()
+        written = []
+        for month, part in _split_by_month(df, self.column):
+            path = self.root / _partition_name(*month) / f"part-{stamp}.parquet"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            pq.write_table(pa.Table.from_pandas(part, schema=schema, preserve_index=False), tmp_path,
+                           compression="zstd")
+            os.replace(tmp_path, path)
+            written.append(path)
+        # 매니페스트를 마지막에 갱신하므로 테이블 버전(수정 시각)이 바뀌어 캐시가 새 행을 반영
+        self._write_manifest(self.root, self.rows() + len(df))
+        return written
+
+    def rows(self):
+        if not self.exists():
+            return 0
+        return json.loads(self.manifest.read_text())["rows"]
+
+    def _write_manifest(self, root, rows):
+        tmp_path = root / f"{MANIFEST}.{os.getpid()}.tmp"
+        tmp_path.write_text(json.dumps({"rows": rows, "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}))
+        os.replace(tmp_path, root / MANIFEST)
+
+    def files(self, window=None):
+        """window=(start, end)와 겹치는 월 폴더의 Parquet 파일 (window가 없으면 전체)"""
+        for directory in sorted(self.root.glob("year=*/month=*")):
+            month = _partition_month(directory)
+            if window is not None:
+                if month is None:
+                    continue
+                start = pd.Timestamp(year=month[0], month=month[1], day=1, tz="UTC")
+                if start >= window[1] or start + pd.offsets.MonthBegin(1) <= window[0]:
+                    continue
+            yield from sorted(directory.glob("*.parquet"))
+
+    def read(self, window=None, columns=None):
+        """겹치는 월 파일만 메모리 매핑으로 읽어 하나의 DataFrame으로 합칩니다. (window 경계 월은 행 필터 적용)
+
+        겹치는 월이 없으면 스키마만 같은 빈 DataFrame을, 파티션 파일이 하나도 없으면 FileNotFoundError를 냅니다.
+        """
+        first = next(self.files(), None)
+        if first is None:
+            raise FileNotFoundError(f"{self.root}에 파티션 파일이 없습니다.")
+        filters = None
+        if window is not None:
+            filters = [(self.column, ">=", window[0]), (self.column, "<", window[1])]
+        columns = list(columns) if columns is not None else None
+        tables = [pq.read_table(path, columns=columns, filters=filters, memory_map=True)
+                  for path in self.files(window)]
+        if not tables:
+            # 겹치는 월이 없으면 스키마만 같은 빈 테이블
+            schema = pq.read_schema(first)
+            tables = [schema.empty_table().select(columns) if columns is not None else schema.empty_table()]
+        return pa.concat_tables(tables).to_pandas()
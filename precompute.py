@@ -0,0 +1,87 @@
+"""기본 필터 집계 미리 계산: 데이터를 한 번 로드하고 모든 페이지의 기본 필터 집계를 결과 저장소(data.RESULT_STORE)에 기록
+
+    python precompute.py                # 배포 / 데이터 갱신 직후 실행
+    python precompute.py --workers 2 --keep-stale
+
+data.py의 로더를 이 프로세스에서 한 번 호출한 뒤, fork한 프로세스 풀에서 페이지를 Streamlit AppTest로 기본 위젯 값 그대로
+실행합니다. 자식 프로세스는 로드된 테이블(@st.cache_data)을 그대로 물려받고 저장소를 기록 모드로 바꾸므로, 페이지가 실제로
+조회하는 것과 같은 키(데이터셋 버전, 기본 필터 값, 집계 인자)로 KPI / 코호트 행렬 / MAU·DAU / 전환율 / 상위 N 집계가 저장됩니다.
+모든 페이지가 성공하면 이번에 쓰지 않은 이전 결과(이전 데이터셋 버전 등)는 삭제합니다.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT))
+
+PAGES = ["pages/Acquisition.py", "pages/2 Revenue.py", "pages/4 Activation.py", "pages/Retention.py"]
+LOADERS = ["load_all_data", "load_analytics_model", "load_filter_index", "load_revenue_cube",
+           "load_user_index", "load_path_index", "load_funnel_index", "load_demographic_crosstab",
+           "load_distribution_sketches"]
+
+
+def _quiet():
+    warnings.filterwarnings("ignore")
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+
+
+def run_page(page):
+    """(fork된 자식 프로세스) 페이지를 기본 필터로 실행하고 (쓴 결과 파일, 예외 메시지, 소요 시간)을 반환"""
+    import data
+    from streamlit.testing.v1 import AppTest
+
+    _quiet()
+    data.RESULT_STORE.record = True
+    started = time.perf_counter()
+    app = AppTest.from_file(str(ROOT / page), default_timeout=3600).run()
+    elapsed = time.perf_counter() - started
+    return sorted(data.RESULT_STORE.written), [str(e.value) for e in app.exception], elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=len(PAGES), help="동시에 실행할 페이지 수")
+    parser.add_argument("--keep-stale", action="store_true", help="이번에 쓰지 않은 이전 결과를 삭제하지 않음")
+    args = parser.parse_args()
+
+    _quiet()
+    os.chdir(ROOT)
+    import data
+
+    if data.RESULT_STORE.root is None:
+        sys.exit("ZB_RESULT_DIR가 비어 있어 결과 저장소를 쓰지 않습니다.")
+
+    started = time.perf_counter()
+    for name in LOADERS:
+        getattr(data, name)()
+    print(f"데이터 로드: {time.perf_counter() - started:.1f}s")
+
+    # 자식 프로세스가 로드된 테이블을 복사 없이 물려받도록 fork로 시작
+    context = multiprocessing.get_context("fork")
+    written, failed = set(), []
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as pool:
+        for page, (paths, errors, elapsed) in zip(PAGES, pool.map(run_page, PAGES)):
+            written.update(paths)
+            print(f"  {page:<24} {elapsed:7.1f}s  결과 {len(paths)}개")
+            for error in errors:
+                print(f"    오류: {error}")
+            if errors:
+                failed.append(page)
+
+    removed = 0
+    if not failed and not args.keep_stale:
+        removed = data.RESULT_STORE.prune(written)
+    print(f"저장 {len(written)}개, 삭제 {removed}개 -> {data.RESULT_STORE.root} ({time.perf_counter() - started:.1f}s)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import pickle
+import threading
+from pathlib import Path
+
+from metrics import NoData
+
+
+# --- 🗄️ 집계 결과 저장소 ---
+# 배치 작업(precompute.py)이 기본 필터의 집계(KPI, 코호트 행렬, MAU/DAU 등)를 미리 계산해 여기에 기록하고,
+# 페이지는 같은 키로 먼저 저장소를 조회해 세션 안에서 다시 계산하지 않습니다.
+#   - 키     : (metrics 함수 이름, 호출자가 만든 키). 키에는 cache_key(데이터셋 버전, 필터 값)와 집계 인자를 넣습니다.
+#              데이터가 바뀌면 데이터셋 버전이 달라지므로 이전 결과는 자동으로 쓰이지 않습니다.
+#   - 파일   : <root>/<함수 이름>/<키 해시>.pkl (임시 파일에 쓴 뒤 os.replace로 교체)
+#   - NoData : 데이터가 없다는 결과도 저장해 두고 조회 시 다시 발생시킵니다.
+#   - root가 None이면(ZB_RESULT_DIR="") 저장소를 쓰지 않고 매번 계산합니다. (벤치마크 등)
+
+
+def _digest(key):
+    return hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+
+
+def _function_name(func):
+    return f"{func.__module__}.{func.__qualname__}"
+
+
+class ResultStore:
+    """(함수, 키)별 집계 결과 pickle 저장소.
+
+    record=False(페이지): 저장된 결과를 읽고, 없으면 계산만 합니다. (저장하지 않음)
+    record=True(배치 작업): 항상 다시 계산해 저장하고 written에 기록합니다.
+    """
+
+    def __init__(self, root, record=False):
+        self.root = Path(root) if root else None
+        self.record = record
+        self.written = set()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, name, key):
+        return self.root / name / f"{_digest(key)}.pkl"
+
+    def get(self, name, key):
+        """(찾았는지, 값). 파일이 없거나 읽을 수 없으면 (False, None)"""
+        if self.root is None:
+            return False, None
+        try:
+            with open(self._path(name, key), "rb") as f:
+                return True, pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return False, None
+
+    def put(self, name, key, value):
+        if self.root is None:
+            return
+        path = self._path(name, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+        with self._lock:
+            self.written.add(path)
+
+    def fetch(self, func, key, *args, **kwargs):
+        """저장된 func(*args, **kwargs) 결과를 반환합니다. 없으면 계산합니다. (NoData는 그대로 발생)"""
+        name = _function_name(func)
+        found, value = (False, None) if self.record else self.get(name, key)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        if not found:
+            try:
+                value = func(*args, **kwargs)
+            except NoData as e:
+                value = e
+            if self.record:
+                self.put(name, key, value)
+        if isinstance(value, NoData):
+            raise value
+        return value
+
+    def entries(self):
+        if self.root is None or not self.root.exists():
+            return []
+        return list(self.root.glob("*/*.pkl"))
+
+    def prune(self, keep):
+        """keep에 없는 결과 파일을 삭제하고 삭제한 개수를 반환합니다. (이전 데이터셋 버전의 결과 정리)"""
+        removed = 0
+        for path in self.entries():
+            if path not in keep:
+                path.unlink()
+                removed += 1
+        return removed
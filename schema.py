@@ -0,0 +1,73 @@
+import hashlib
+
+# --- 🗂️ 테이블 스키마 레지스트리 ---
+# 페이지/차트에서 실제로 사용하는 컬럼만 읽고, 가능한 한 작은 타입으로 저장합니다.
+# 새 컬럼이 필요하면 여기에만 추가하면 CSV 로딩과 스냅샷에 함께 반영됩니다.
+
+DATETIME = "datetime"  # 읽은 뒤 pd.to_datetime으로 변환할 컬럼 표시
+
+TABLE_SCHEMAS = {
+    "users": {
+        "id": "int32",
+        "age": "int8",
+        "gender": "category",
+        "country": "category",
+        "traffic_source": "category",
+        "created_at": DATETIME,
+    },
+    "orders": {
+        "order_id": "int32",
+        "user_id": "int32",
+        "status": "category",
+        "created_at": DATETIME,
+    },
+    "order_items": {
+        "order_id": "int32",
+        "user_id": "int32",
+        "product_id": "int32",
+        "status": "category",
+        "sale_price": "float32",
+        "created_at": DATETIME,
+    },
+    "events": {
+        "user_id": "Int32",            # 비회원 세션은 user_id가 비어 있으므로 nullable 정수
+        "session_id": "object",
+        "traffic_source": "category",
+        "event_type": "category",
+        "created_at": DATETIME,
+    },
+    "products": {
+        "id": "int32",
+        "name": "object",
+        "category": "category",
+        "brand": "category",
+        "department": "category",
+        "cost": "float32",
+        "retail_price": "float32",
+    },
+    "inventory_items": {
+        "id": "int32",
+        "product_id": "int32",
+        "product_category": "category",
+        "cost": "float32",
+        "created_at": DATETIME,
+    },
+}
+
+
+def read_csv_kwargs(name):
+    """pd.read_csv에 넘길 usecols / dtype 인자를 만듭니다."""
+    columns = TABLE_SCHEMAS[name]
+    return {
+        "usecols": list(columns),
+        "dtype": {col: dtype for col, dtype in columns.items() if dtype != DATETIME},
+    }
+
+
+def datetime_columns(name):
+    return [col for col, dtype in TABLE_SCHEMAS[name].items() if dtype == DATETIME]
+
+
+def schema_version(name):
+    """스키마가 바뀌면 달라지는 짧은 해시. 스냅샷 파일명에 붙여 오래된 스냅샷을 무시합니다."""
+    return hashlib.sha1(repr(TABLE_SCHEMAS[name]).encode()).hexdigest()[:8]
@@ -0,0 +1,260 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from transformer.cohort import _counts_frame, has_complete_orders, incremental_cohort_matrix
+from transformer.model import AGE_BINS, AGE_LABELS
+
+# --- 🦆 SQL 쿼리 백엔드 (선택) ---
+# Revenue 차트의 groupby / 고유 개수 집계와 Retention 코호트 행렬을 pandas / NumPy 대신 내장 분석 엔진의 SQL로 실행합니다.
+#   - duckdb : 성능 경로 (ZB_QUERY_BACKEND=sql, requirements-sql.txt). Parquet 스냅샷을 뷰로 등록해 DataFrame을 복사하지 않고
+#              멀티스레드로 조회하며, 분석 모델의 파생 컬럼(월/주/일 키, is_complete, age_group)은 뷰의 SQL 식으로 계산
+#   - sqlite : 정확성 확인 경로 (ZB_QUERY_BACKEND=sqlite, 표준 라이브러리). 분석 모델 DataFrame을 테이블로 복사하므로
+#              메모리를 두 배로 쓰고 pandas보다 훨씬 느림. SQL 결과가 pandas 경로와 같은지 확인하는 용도로만 사용
+# 조회 SQL은 두 엔진 모두에서 도는 것만 씁니다. (Parquet 뷰 정의만 DuckDB 전용)
+#
+# 차트 / 집계 함수는 DataFrame 또는 SqlRelation을 받고 as_relation()으로 감싸 같은 메서드(group_sum, group_nunique,
+# cohort_counts)를 호출하므로, 같은 차트를 pandas 경로와 SQL 경로로 실행해 결과를 비교할 수 있습니다.
+
+try:
+    import duckdb
+except ImportError:  # 선택 의존성 (requirements-sql.txt)
+    duckdb = None
+
+# 팩트 테이블 -> 차원 테이블 외래 키 (팩트 컬럼, 차원 키 컬럼)
+FOREIGN_KEYS = {
+    "orders": ("order_id", "order_id"),
+    "users": ("user_id", "id"),
+    "products": ("product_id", "id"),
+}
+
+# Parquet 스냅샷을 DuckDB 뷰로 등록할 때 분석 모델(transformer.model)과 같은 정수 키를 SQL로 계산 (연결 시간대 UTC 기준)
+_DUCKDB_KEY_COLUMNS = """
+    CAST(floor(epoch(created_at) / 86400) AS INTEGER) AS day_key,
+    CAST(floor((floor(epoch(created_at) / 86400) - 4) / 7) AS INTEGER) AS week_key,
+    CAST((year(created_at) - 1970) * 12 + month(created_at) - 1 AS INTEGER) AS month_key
+"""
+
+# 코호트 계산에 쓰는 완료 주문 조건 (transformer.cohort._complete_mask와 같음)
+_COMPLETE = "is_complete AND user_id IS NOT NULL AND created_at IS NOT NULL"
+
+
+def _derived_columns(name):
+    """분석 모델이 붙이는 파생 컬럼 중 SQL 경로에서 쓰는 것을 SQL 식으로 (Parquet 뷰용)"""
+    if name in ("orders", "order_items"):
+        return [_DUCKDB_KEY_COLUMNS, "status = 'Complete' AS is_complete"]
+    if name == "users":
+        cases = " ".join(f"WHEN age >= {lo} AND age < {hi} THEN '{label}'"
+                         for lo, hi, label in zip(AGE_BINS[:-1], AGE_BINS[1:], AGE_LABELS))
+        return [f"CASE {cases} END AS age_group"]
+    return []
+
+
+def _identifier(name):
+    """SQL에 그대로 넣는 이름은 코드에 정의된 식별자만 허용"""
+    if not name.isidentifier():
+        raise ValueError(f"잘못된 SQL 식별자: {name!r}")
+    return name
+
+
+def _scalar(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _timestamp(value):
+    """분석 기간 경계를 DuckDB TIMESTAMPTZ 리터럴로 (뷰 정의에는 파라미터를 쓸 수 없음)"""
+    return f"TIMESTAMPTZ '{pd.Timestamp(value).isoformat()}'"
+
+
+class PandasRelation:
+    """DataFrame 집계 (기존 pandas / NumPy 경로)"""
+
+    def __init__(self, df):
+        self.df = df
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def group_sum(self, by, column):
+        return self.df.groupby(by, observed=True)[column].sum()
+
+    def group_nunique(self, by, column):
+        return self.df.groupby(by, observed=True)[column].nunique()
+
+    def has_complete_orders(self):
+        return has_complete_orders(self.df)
+
+    def cohort_counts(self, granularity, max_age, cohorts=None, state_dir=None):
+        """transformer.cohort.incremental_cohort_matrix와 같은 (counts, sizes). state_dir : 증분 상태 폴더"""
+        return incremental_cohort_matrix(self.df, granularity, max_age, cohorts, state_dir=state_dir)
+
+
+class SqlRelation:
+    """SqlBackend 위의 행 집합 (SELECT 문). 집계 메서드는 PandasRelation과 같고 결과는 키 오름차순 Series"""
+
+    def __init__(self, backend, sql, params=()):
+        self.backend = backend
+        self.sql = sql
+        self.params = list(params)
+
+    @property
+    def empty(self):
+        found = self.backend.query(f"SELECT 1 FROM ({self.sql}) AS r LIMIT 1", self.params)
+        return found.empty
+
+    def _group(self, by, expression, name):
+        by = _identifier(by)
+        result = self.backend.query(
+            f"SELECT {by} AS key, {expression} AS value FROM ({self.sql}) AS r GROUP BY {by} ORDER BY {by}",
+            self.params)
+        return pd.Series(result["value"].to_numpy(), index=pd.Index(result["key"], name=by), name=name)
+
+    def group_sum(self, by, column):
+        return self._group(by, f"SUM({_identifier(column)})", column)
+
+    def group_nunique(self, by, column):
+        return self._group(by, f"COUNT(DISTINCT {_identifier(column)})", column)
+
+    def has_complete_orders(self):
+        found = self.backend.query(f"SELECT 1 FROM ({self.sql}) AS r WHERE {_COMPLETE} LIMIT 1", self.params)
+        return not found.empty
+
+    def cohort_counts(self, granularity, max_age, cohorts=None, state_dir=None):
+        """transformer.cohort.cohort_matrix와 같은 (counts, sizes)를 SQL로 계산합니다. (완료 주문 기준)
+
+        엔진이 매번 전체 주문을 집계하므로 state_dir(증분 상태)는 쓰지 않습니다.
+        """
+        period = _identifier(f"{granularity}_key")
+        base = f"""
+            WITH o AS (SELECT user_id, {period} AS period FROM ({self.sql}) AS r WHERE {_COMPLETE}),
+                 user_cohort AS (SELECT user_id, MIN(period) AS cohort FROM o GROUP BY user_id)"""
+        cohort_filter, cohort_params = "", []
+        if cohorts is not None:
+            cohort_params = [int(cohort) for cohort in cohorts]
+            cohort_filter = (f"WHERE cohort IN ({', '.join('?' * len(cohort_params))})" if cohort_params
+                             else "WHERE 1 = 0")
+        active = self.backend.query(f"""{base},
+                 pairs AS (SELECT DISTINCT o.user_id, c.cohort, o.period - c.cohort AS age
+                           FROM o JOIN user_cohort AS c ON c.user_id = o.user_id
+                           WHERE o.period - c.cohort <= ?)
+            SELECT cohort, age, COUNT(*) AS users FROM pairs {cohort_filter} GROUP BY cohort, age""",
+                                    self.params + [max_age] + cohort_params)
+        sizes = self.backend.query(f"""{base}
+            SELECT cohort, COUNT(*) AS users FROM user_cohort {cohort_filter} GROUP BY cohort ORDER BY cohort""",
+                                   self.params + cohort_params)
+        last = self.backend.query(f"{base} SELECT MAX(period) AS last FROM o", self.params)["last"].iloc[0]
+
+        cohort_keys = sizes["cohort"].to_numpy(dtype=np.int64)
+        matrix = np.zeros((len(cohort_keys), max_age + 1), dtype=np.int64)
+        rows = np.searchsorted(cohort_keys, active["cohort"].to_numpy(dtype=np.int64))
+        matrix[rows, active["age"].to_numpy(dtype=np.int64)] = active["users"].to_numpy()
+        last_period = -1 if pd.isna(last) else int(last)
+        return _counts_frame(cohort_keys, matrix, sizes["users"].to_numpy(dtype=np.int64), last_period)
+
+
+def as_relation(source):
+    """차트 / 집계 함수 입력(DataFrame 또는 SqlRelation)을 같은 집계 인터페이스로 감쌉니다."""
+    return PandasRelation(source) if isinstance(source, pd.DataFrame) else source
+
+
+class SqlBackend:
+    """내장 SQL 엔진 연결. register_parquet() / register()로 테이블을 등록하고 relation()으로 조회합니다."""
+
+    def __init__(self, connection, engine):
+        self.connection = connection
+        self.engine = engine            # "duckdb" | "sqlite"
+        self.attrs = {}
+
+    @classmethod
+    def connect(cls, path=":memory:", engine="duckdb"):
+        """engine("duckdb" | "sqlite")에 연결합니다. duckdb가 없으면 sqlite로 바꾸지 않고 ImportError를 냅니다."""
+        if engine == "duckdb":
+            if duckdb is None:
+                raise ImportError("DuckDB 백엔드(ZB_QUERY_BACKEND=sql)를 쓰려면 duckdb를 설치하세요: "
+                                  "pip install -r requirements-sql.txt (정확성 확인용 sqlite 경로는 ZB_QUERY_BACKEND=sqlite)")
+            connection = duckdb.connect(path)
+            connection.execute("SET TimeZone = 'UTC'")
+        elif engine == "sqlite":
+            # Streamlit은 rerun마다 다른 스레드에서 실행될 수 있으므로 스레드 검사를 끔 (조회 전용)
+            connection = sqlite3.connect(path, check_same_thread=False)
+        else:
+            raise ValueError(f"engine은 'duckdb' 또는 'sqlite'여야 합니다: {engine!r}")
+        return cls(connection, engine)
+
+    # ---------------- 등록 ----------------
+    def register_parquet(self, name, paths, window=None):
+        """Parquet 스냅샷 파일들을 메모리에 올리지 않고 뷰로 등록합니다. (DuckDB 전용, 분석 모델의 파생 컬럼 포함)
+
+        window=(start, end)를 주면 분석 모델처럼 created_at이 그 기간인 행만 보입니다.
+        """
+        if self.engine != "duckdb":
+            raise NotImplementedError("Parquet 뷰는 DuckDB 백엔드에서만 지원합니다. (sqlite는 register()로 복사)")
+        files = ", ".join("'" + str(path).replace("'", "''") + "'" for path in paths)
+        derived = "".join(f", {expression}" for expression in _derived_columns(name))
+        # 파티션 폴더 이름(year= / month=)을 컬럼으로 붙이지 않도록 hive_partitioning을 끔
+        sql = (f"CREATE OR REPLACE VIEW {_identifier(name)} AS "
+               f"SELECT *{derived} FROM read_parquet([{files}], hive_partitioning = false)")
+        if window is not None:
+            sql += f" WHERE created_at >= {_timestamp(window[0])} AND created_at < {_timestamp(window[1])}"
+        self.connection.execute(sql)
+
+    def register(self, name, df):
+        """DataFrame을 테이블로 등록합니다. DuckDB는 복사 없이 조회하고, sqlite는 테이블로 복사합니다."""
+        name = _identifier(name)
+        if self.engine == "duckdb":
+            self.connection.register(name, df)
+            return
+        # sqlite: 범주형은 문자열, 날짜 / 기간은 ISO 문자열(결측은 NULL)로 저장 (집계는 정수 키 컬럼을 사용)
+        table = df.copy()
+        for column in table.columns:
+            if isinstance(table[column].dtype, pd.CategoricalDtype):
+                table[column] = table[column].astype(object)
+            elif pd.api.types.is_datetime64_any_dtype(table[column]) or isinstance(table[column].dtype, pd.PeriodDtype):
+                table[column] = table[column].astype(str).where(table[column].notna(), None)
+        table.to_sql(name, self.connection, index=False, if_exists="replace")
+
+    def query(self, sql, params=()):
+        """SQL 결과를 DataFrame으로 반환합니다."""
+        if self.engine == "duckdb":
+            return self.connection.execute(sql, list(params)).df()
+        return pd.read_sql_query(sql, self.connection, params=list(params))
+
+    # ---------------- 관계 ----------------
+    def _conditions(self, where):
+        """{차원 테이블: {컬럼: 허용 값 목록 | None}} -> 팩트 테이블 WHERE 조건과 파라미터"""
+        conditions, params = [], []
+        for table, filters in (where or {}).items():
+            fact_column, key_column = FOREIGN_KEYS[table]
+            predicates = []
+            for column, values in filters.items():
+                if values is None:
+                    continue
+                if isinstance(values, str) or not hasattr(values, "__iter__"):
+                    values = [values]
+                values = [_scalar(value) for value in values if not pd.isna(value)]
+                if not values:
+                    predicates.append("1 = 0")
+                    continue
+                predicates.append(f"{_identifier(column)} IN ({', '.join('?' * len(values))})")
+                params.extend(values)
+            subquery = f"SELECT {key_column} FROM {_identifier(table)}"
+            if predicates:
+                subquery += " WHERE " + " AND ".join(predicates)
+            conditions.append(f"f.{fact_column} IN ({subquery})")
+        return conditions, params
+
+    def relation(self, table, where=None, product_columns=()):
+        """팩트 테이블(order_items, orders 등)에서 차원 필터를 통과한 행. product_columns를 주면 products 컬럼을 붙입니다.
+
+        where : {"orders" | "users" | "products": {컬럼: 허용 값 목록 | None}} (FilterIndex.rows의 where와 같은 의미)
+        """
+        columns = "".join(f", p.{_identifier(column)}" for column in product_columns)
+        sql = f"SELECT f.*{columns} FROM {_identifier(table)} AS f"
+        if product_columns:
+            sql += " JOIN products AS p ON p.id = f.product_id"
+        conditions, params = self._conditions(where)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return SqlRelation(self, sql, params)
@@ -0,0 +1,385 @@
+import os
+import threading
+import zipfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from transformer.model import day_keys, week_keys, month_keys
+from transformer.versioning import VERSION_ATTR, dataset_source
+
+# --- 🧮 코호트 엔진 ---
+# 완료 주문을 (정수 사용자 코드, 정수 기간 키) 배열로 바꾼 뒤 NumPy만으로 코호트 행렬을 계산합니다.
+#   - 코호트 : 사용자의 첫 완료 주문이 속한 기간 (일/주/월 키)
+#   - age    : 주문 기간 키 - 코호트 기간 키
+#   - 셀 값  : (코호트, age)별 주문한 고유 사용자 수
+# groupby / merge / pivot 없이 (사용자, age) 중복 제거 후 bincount로 집계합니다.
+
+GRANULARITIES = ("day", "week", "month")
+
+# 완료 주문이 아닌 행의 기간 키 (cohort_matrix에서 제외됨). 기간 키는 1970년 이후라 항상 0 이상
+NO_PERIOD = -1
+
+# (사용자 수 x age 수)가 이 크기 이하면 bool 비트맵으로, 넘으면 np.unique로 (사용자, age) 중복 제거
+_BITMAP_MAX_CELLS = 200_000_000
+
+
+def _period_keys(orders, granularity):
+    """분석 모델의 day_key/week_key/month_key를 사용하고, 없으면 created_at에서 계산합니다."""
+    column = f"{granularity}_key"
+    if column in orders.columns:
+        return orders[column].to_numpy(dtype=np.int32)
+    if granularity == "day":
+        return day_keys(orders["created_at"])
+    if granularity == "week":
+        return week_keys(day_keys(orders["created_at"]))
+    return month_keys(orders["created_at"])
+
+
+def _complete_mask(orders):
+    if "is_complete" in orders.columns:
+        mask = orders["is_complete"].to_numpy(dtype=bool)
+    else:
+        mask = (orders["status"].astype(str).str.strip().str.lower() == "complete").to_numpy()
+    mask = mask & orders["created_at"].notna().to_numpy()
+    if orders["user_id"].hasnans:
+        mask &= orders["user_id"].notna().to_numpy()
+    return mask
+
+
+def has_complete_orders(orders):
+    """코호트 계산에 쓸 완료 주문(user_id / created_at 있음)이 하나라도 있으면 True"""
+    return bool(_complete_mask(orders).any())
+
+
+def complete_order_periods(orders, granularity):
+    """주문별 (user_id 배열, 기간 키 배열)을 반환합니다.
+
+    완료 주문이 아니거나 user_id / created_at이 없는 행은 지우지 않고 기간 키를 NO_PERIOD로 표시합니다.
+    (수천만 행을 불리언 인덱싱으로 복사하는 비용을 피하기 위함)
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity는 {GRANULARITIES} 중 하나여야 합니다: {granularity!r}")
+    mask = _complete_mask(orders)
+    user_id = orders["user_id"]
+    user_ids = user_id.to_numpy(dtype=np.int64, na_value=0) if user_id.hasnans else user_id.to_numpy()
+    return user_ids, np.where(mask, _period_keys(orders, granularity), NO_PERIOD).astype(np.int32)
+
+
+def _user_codes(user_ids):
+    """user_id를 0부터 시작하는 연속 정수 코드로 바꿉니다. (id 범위가 좁으면 해시 없이 뺄셈만 사용)"""
+    if len(user_ids) == 0:
+        return user_ids.astype(np.int64), 0
+    lo, hi = int(user_ids.min()), int(user_ids.max())
+    if hi - lo < 4 * len(user_ids) + 1_000_000:
+        return user_ids - lo, hi - lo + 1
+    codes, uniques = pd.factorize(user_ids)
+    return codes, len(uniques)
+
+
+def cohort_matrix(user_ids, periods, max_age, cohorts=None):
+    """코호트 x age(0..max_age) 활성 사용자 수 행렬과 코호트 크기를 반환합니다.
+
+    user_ids, periods : 주문별 사용자 ID와 기간 키 (complete_order_periods 결과, NO_PERIOD 행은 제외됨)
+    cohorts           : 포함할 코호트 기간 키 목록 (None이면 전체)
+
+    반환값 (counts, sizes)
+      counts : index=코호트 키, columns=age 인 DataFrame. 마지막 주문 기간 이후라 관측할 수 없는 셀은 NaN
+      sizes  : 코호트별 사용자 수 Series
+    """
+    n_ages = max_age + 1
+    codes, n_users = _user_codes(np.asarray(user_ids))
+    periods = np.asarray(periods, dtype=np.int32)
+    last_period = int(periods.max()) if len(periods) else NO_PERIOD
+
+    # 사용자별 첫 구매 기간 (= 코호트). uint32로 보면 NO_PERIOD(-1)가 가장 큰 값이라 최솟값에서 자동 제외
+    first = np.full(n_users, NO_PERIOD, dtype=np.int32)
+    np.minimum.at(first.view(np.uint32), codes, periods.view(np.uint32))
+    keep_user = first != NO_PERIOD
+    if cohorts is not None:
+        keep_user &= np.isin(first, np.asarray(cohorts, dtype=np.int32))
+
+    # 대상 사용자만 0..n_kept-1로 다시 번호를 매기고, 코호트 키는 정렬 없이 bincount로 압축
+    first_kept = first[keep_user].astype(np.int64)
+    n_kept = len(first_kept)
+    lo = int(first_kept.min()) if n_kept else 0
+    size_by_offset = np.bincount(first_kept - lo)
+    present = size_by_offset > 0
+    cohort_keys = lo + np.flatnonzero(present)
+    sizes = size_by_offset[present]
+    user_cohort = (np.cumsum(present) - 1)[first_kept - lo]
+
+    # 주문마다 (사용자 순번 * n_ages + age) 칸 번호를 계산. 대상이 아니거나 age가 0..max_age 밖이면 마지막 버림 칸으로
+    # (대상이 아닌 사용자는 시작 기간을 int32 최댓값으로 두어 age가 음수 -> uint32로 보면 매우 큰 값이 됨)
+    n_slots = n_kept * n_ages
+    use_bitmap = n_slots <= _BITMAP_MAX_CELLS
+    dtype = np.int32 if use_bitmap else np.int64
+    start = np.where(keep_user, first, np.iinfo(np.int32).max).astype(np.int32)
+    rank = np.cumsum(keep_user, dtype=dtype) - 1
+    age = periods - start[codes]
+    in_range = age.view(np.uint32) <= max_age
+    slots = np.where(in_range, rank[codes] * n_ages + age, n_slots)
+
+    # (사용자, age) 중복 제거 -> (코호트, age) 셀별 고유 사용자 수
+    if use_bitmap:
+        seen = np.zeros(n_slots + 1, dtype=bool)
+        seen[slots] = True
+        pairs = np.flatnonzero(seen[:-1])
+    else:
+        pairs = np.unique(slots[in_range])
+    cells = user_cohort[pairs // n_ages] * n_ages + pairs % n_ages
+    active = np.bincount(cells, minlength=len(cohort_keys) * n_ages).reshape(len(cohort_keys), n_ages)
+
+    return _counts_frame(cohort_keys, active, sizes, last_period)
+
+
+def _counts_frame(cohort_keys, active, sizes, last_period):
+    # 마지막 주문 기간을 넘는 셀은 관측 불가 -> NaN
+    observable = cohort_keys[:, None] + np.arange(active.shape[1])[None, :] <= last_period
+    counts = pd.DataFrame(
+        np.where(observable, active, np.nan),
+        index=pd.Index(cohort_keys, name="cohort_key"),
+        columns=pd.RangeIndex(active.shape[1], name="age"),
+    )
+    return counts, pd.Series(sizes, index=counts.index, name="cohort_size")
+
+
+def retention_matrix(counts, sizes, min_age=1):
+    """코호트 행렬을 재구매율로 바꾸고 min_age 미만 열과 관측 가능한 셀이 없는 열을 제거합니다."""
+    rates = counts.div(sizes, axis=0)
+    rates = rates.loc[:, rates.columns >= min_age]
+    return rates.dropna(axis=1, how="all")
+
+
+def cohort_cells(counts, sizes, min_age=1):
+    """관측 가능한 셀을 (cohort_key, age, active_users, cohort_size) 긴 형태로 펼칩니다."""
+    cells = counts.loc[:, counts.columns >= min_age].stack().rename("active_users").reset_index()
+    cells["cohort_size"] = sizes.reindex(cells["cohort_key"]).to_numpy()
+    return cells
+
+
+# --- 🔁 증분 코호트 상태 ---
+# 매 갱신마다 전체 주문 이력을 다시 읽지 않도록, 아래 상태를 파일로 저장해 두고 새 주문만 반영합니다.
+#   - pairs  : 완료 주문의 고유 (user_id, 기간 키) 쌍 (user_id << 32 | 기간 키, 정렬됨)
+#   - first  : 사용자별 첫 구매 기간 (= 코호트)
+#   - active : (코호트, age)별 활성 사용자 수,  sizes : 코호트별 사용자 수
+#   - fingerprint : 반영한 주문의 (order_id, user_id, created_at, 완료 여부) 행 해시 합계 (이미 반영한 주문이 바뀌었는지 확인)
+
+_PERIOD_MASK = 0xFFFFFFFF
+
+
+def _row_hashes(orders, complete):
+    """주문 행마다 (order_id, user_id, created_at, 완료 여부) 해시 (uint64). 합계는 행 순서와 무관한 지문으로 사용"""
+    rows = pd.DataFrame({"order_id": orders["order_id"], "user_id": orders["user_id"],
+                         "created_at": orders["created_at"], "complete": complete})
+    return pd.util.hash_pandas_object(rows, index=False).to_numpy()
+
+
+def _fingerprint(hashes):
+    """행 해시의 합계 (2**64로 나눈 나머지, int64로 저장)"""
+    return int(hashes.sum(dtype=np.uint64).view(np.int64))
+
+
+def _ranges(starts, stops):
+    """[starts[i], stops[i]) 구간들을 이어 붙인 인덱스 배열"""
+    lengths = stops - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(lengths.sum())
+
+
+class CohortState:
+    """완료 주문의 (사용자, 기간) 쌍과 코호트 행렬을 증분으로 유지하는 상태.
+
+    update(orders)는 order_id가 지난번보다 큰 주문만 반영하며, matrix()의 결과는 전체 재계산(cohort_matrix)과 같습니다.
+    이미 반영된 주문이 바뀌었으면(지문이 달라짐: 행 추가 / 삭제, 상태 / user_id / created_at 수정) 처음부터 다시 계산합니다.
+    """
+
+    def __init__(self, granularity):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity는 {GRANULARITIES} 중 하나여야 합니다: {granularity!r}")
+        self.granularity = granularity
+        self.reset()
+
+    def reset(self):
+        self.pairs = np.empty(0, dtype=np.int64)
+        self.users = np.empty(0, dtype=np.int64)
+        self.first = np.empty(0, dtype=np.int64)
+        self.active = np.zeros((0, 0), dtype=np.int64)
+        self.sizes = np.zeros(0, dtype=np.int64)
+        self.lo = 0                  # active / sizes의 0번 행에 해당하는 코호트 키
+        self.last_period = NO_PERIOD
+        self.last_order_id = -1      # 마지막으로 반영한 order_id
+        self.fingerprint = 0         # order_id <= last_order_id 인 행의 지문 (_fingerprint)
+        self.version = ""            # 마지막으로 반영한 orders의 버전 ID와 행 수 (같으면 지문 계산도 생략)
+
+    # ---------------- 저장 / 불러오기 ----------------
+    @classmethod
+    def load(cls, path, granularity):
+        """저장된 상태를 불러옵니다. 파일이 없거나 읽을 수 없으면 빈 상태를 반환합니다."""
+        state = cls(granularity)
+        try:
+            with np.load(path) as saved:
+                if str(saved["granularity"]) != granularity:
+                    return state
+                for name in ("pairs", "users", "first", "active", "sizes"):
+                    setattr(state, name, saved[name])
+                state.lo, state.last_period, state.last_order_id, state.fingerprint = (
+                    int(v) for v in saved["scalars"])
+                state.version = str(saved["version"])
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile):
+            # 잘린 / 손상된 npz 파일이나 이전 형식의 상태도 빈 상태에서 다시 계산
+            state.reset()
+        return state
+
+    def save(self, path):
+        """임시 파일에 쓴 뒤 교체합니다. (쓰는 도중의 파일을 다른 세션이 읽지 않도록)
+
+        같은 프로세스의 세션들은 스크립트 스레드가 다르므로 임시 파일 이름에 프로세스 / 스레드 id를 함께 붙입니다.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp_path, "wb") as f:
+                np.savez(f, granularity=self.granularity, pairs=self.pairs, users=self.users, first=self.first,
+                         active=self.active, sizes=self.sizes, version=self.version,
+                         scalars=np.array([self.lo, self.last_period, self.last_order_id, self.fingerprint],
+                                          dtype=np.int64))
+            os.replace(tmp_path, path)
+        finally:
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    # ---------------- 갱신 ----------------
+    def update(self, orders):
+        """새로 추가된 주문(order_id > last_order_id)만 반영합니다. 상태가 바뀌었으면 True를 반환합니다."""
+        # 로딩 시 붙인 버전 ID(transformer.versioning)가 지난번과 같으면 원본 파일이 그대로이므로 지문 계산도 생략
+        version = orders.attrs.get(VERSION_ATTR)
+        version = f"{version}:{len(orders)}" if version else ""
+        if version and version == self.version:
+            return False
+        order_ids = orders["order_id"].to_numpy()
+        complete = _complete_mask(orders)
+        hashes = _row_hashes(orders, complete)
+
+        old = order_ids <= self.last_order_id
+        if _fingerprint(hashes[old]) != self.fingerprint:
+            self.reset()
+            old[:] = False
+        self.version = version
+        if old.all():
+            return True
+
+        # 기간 키 계산과 쌍 추가는 새 행에 대해서만 수행 (필요한 열만 뽑아 프레임 전체 복사를 피함)
+        rows = np.flatnonzero(~old)
+        columns = [c for c in ("user_id", "created_at", "status", "is_complete", f"{self.granularity}_key")
+                   if c in orders.columns]
+        new_orders = pd.DataFrame({c: orders[c].iloc[rows] for c in columns})
+        user_ids, periods = complete_order_periods(new_orders, self.granularity)
+        valid = periods != NO_PERIOD
+        self._add_pairs(user_ids[valid].astype(np.int64), periods[valid].astype(np.int64))
+        self.last_order_id = int(order_ids.max())
+        self.fingerprint = _fingerprint(hashes)
+        return True
+
+    def _add_pairs(self, user_ids, periods):
+        keys = np.unique((user_ids << 32) | periods)
+        keys = keys[~self._contains(keys)]
+        if not len(keys):
+            return
+        self.last_period = max(self.last_period, int((keys & _PERIOD_MASK).max()))
+
+        # 새 쌍의 사용자별 최소 기간 (keys가 사용자 -> 기간 순으로 정렬되어 있으므로 그룹 첫 값)
+        new_users, starts = np.unique(keys >> 32, return_index=True)
+        new_min = keys[starts] & _PERIOD_MASK
+        pos = np.searchsorted(self.users, new_users)
+        exists = pos < len(self.users)
+        exists[exists] = self.users[pos[exists]] == new_users[exists]
+        old_first = np.full(len(new_users), np.iinfo(np.int64).max)
+        old_first[exists] = self.first[pos[exists]]
+        changed = exists & (new_min < old_first)
+
+        # 1) 첫 구매가 더 이른 주문이 들어온 사용자는 기존 코호트에서 기여분을 뺌
+        moved_users = new_users[changed]
+        moved = self.pairs[_ranges(np.searchsorted(self.pairs, moved_users << 32),
+                                   np.searchsorted(self.pairs, (moved_users + 1) << 32))]
+        moved_first = np.repeat(old_first[changed], self._user_pair_counts(moved_users))
+        self._add_cells(moved_first, moved & _PERIOD_MASK, -1)
+        self._add_sizes(old_first[changed], -1)
+
+        # 2) 사용자별 첫 구매 / 쌍 목록 갱신
+        self.first[pos[changed]] = new_min[changed]
+        added = ~exists
+        self.users = np.insert(self.users, pos[added], new_users[added])
+        self.first = np.insert(self.first, pos[added], new_min[added])
+        self.pairs = np.insert(self.pairs, np.searchsorted(self.pairs, keys), keys)
+
+        # 3) 새 쌍과 코호트가 바뀐 사용자의 기존 쌍을 새 코호트 기준으로 더함
+        add = np.concatenate([keys, moved])
+        add_first = self.first[np.searchsorted(self.users, add >> 32)]
+        self._add_cells(add_first, add & _PERIOD_MASK, 1)
+        self._add_sizes(np.concatenate([new_min[added], new_min[changed]]), 1)
+
+    def _contains(self, keys):
+        pos = np.searchsorted(self.pairs, keys)
+        found = pos < len(self.pairs)
+        found[found] = self.pairs[pos[found]] == keys[found]
+        return found
+
+    def _user_pair_counts(self, users):
+        return np.searchsorted(self.pairs, (users + 1) << 32) - np.searchsorted(self.pairs, users << 32)
+
+    def _grow(self, cohort_lo, cohort_hi, age_hi):
+        """active / sizes가 [cohort_lo, cohort_hi] 코호트와 0..age_hi age를 담도록 늘립니다."""
+        if not len(self.sizes):
+            self.lo = cohort_lo
+        before = max(self.lo - cohort_lo, 0)
+        after = max(cohort_hi - (self.lo + len(self.sizes) - 1), 0)
+        right = max(age_hi + 1 - self.active.shape[1], 0)
+        if before or after or right:
+            self.active = np.pad(self.active, ((before, after), (0, right)))
+            self.sizes = np.pad(self.sizes, (before, after))
+            self.lo -= before
+
+    def _add_cells(self, first, periods, delta):
+        if not len(first):
+            return
+        self._grow(int(first.min()), int(first.max()), int((periods - first).max()))
+        np.add.at(self.active, (first - self.lo, periods - first), delta)
+
+    def _add_sizes(self, first, delta):
+        if len(first):
+            np.add.at(self.sizes, first - self.lo, delta)
+
+    # ---------------- 조회 ----------------
+    def matrix(self, max_age, cohorts=None):
+        """cohort_matrix(...)와 같은 (counts, sizes)를 저장된 상태에서 바로 만듭니다."""
+        keys = self.lo + np.arange(len(self.sizes))
+        present = self.sizes > 0
+        if cohorts is not None:
+            present &= np.isin(keys, np.asarray(cohorts))
+        rows = np.flatnonzero(present)
+        active = np.zeros((len(rows), max_age + 1), dtype=np.int64)
+        width = min(max_age + 1, self.active.shape[1])
+        active[:, :width] = self.active[rows, :width]
+        return _counts_frame(keys[rows], active, self.sizes[rows], self.last_period)
+
+
+def incremental_cohort_matrix(orders, granularity, max_age, cohorts=None, state_dir=None):
+    """state_dir에 저장된 증분 상태를 새 주문으로 갱신한 뒤 코호트 행렬을 반환합니다.
+
+    state_dir이 없으면 전체 주문으로 다시 계산합니다. 상태를 저장할 수 없는 환경(읽기 전용 등)에서도 결과는 같습니다.
+    상태 파일은 orders의 원본 식별자(dataset_source: 데이터 폴더 / 분석 기간)마다 따로 둡니다.
+    """
+    if state_dir is None:
+        return cohort_matrix(*complete_order_periods(orders, granularity), max_age, cohorts=cohorts)
+    source = dataset_source(orders)
+    path = Path(state_dir) / (f"{granularity}.{source}.npz" if source else f"{granularity}.npz")
+    state = CohortState.load(path, granularity)
+    if state.update(orders):
+        try:
+            state.save(path)
+        except OSError:
+            pass
+    return state.matrix(max_age, cohorts)
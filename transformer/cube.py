@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+from transformer.filters import key_positions
+
+# --- 🧮 매출 큐브 (Revenue OLAP cube) ---
+# Revenue 페이지의 필터 차원(연/월, 주문 상태, 성별, 연령대, 유입 경로, 카테고리, 브랜드) 조합마다
+# order_items를 한 번만 집계해 둡니다. 필터가 바뀌면 원본 행 대신 큐브 셀만 골라 합칩니다.
+#   - 매출 합계, 상품 수 : 셀끼리 더하면 되는 가산 지표
+#   - 주문 수, 구매자 수 : 셀마다 고유 order_id / user_id 목록을 저장하고 고른 셀의 목록을 합쳐 중복 없이 셈
+#   - 전체 사용자 수     : 사용자 차원(성별, 연령대, 유입 경로) 조합별 사용자 수
+
+# (차원 이름, 값을 가져오는 테이블). 주문 하나의 상품은 모두 같은 주문 차원 값을 가짐
+ORDER_DIMENSIONS = (
+    ("month_key", "orders"),
+    ("status", "orders"),
+    ("gender", "users"),
+    ("age_group", "users"),
+    ("traffic_source", "users"),
+)
+PRODUCT_DIMENSIONS = (
+    ("category", "products"),
+    ("brand", "products"),
+)
+USER_DIMENSIONS = ("gender", "age_group", "traffic_source")
+
+
+def _codes(values):
+    """값 배열을 (코드, 값 목록)으로 바꿉니다. 결측은 -1"""
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int64), pd.Index(np.asarray(uniques))
+
+
+def _combine(codes, values, dims):
+    """여러 차원 코드를 조합 하나의 코드로 묶고, 조합별 차원 코드 표(DataFrame)를 반환합니다."""
+    combined = np.zeros(len(codes[dims[0]]), dtype=np.int64)
+    for dim in dims:
+        combined = combined * (len(values[dim]) + 1) + codes[dim] + 1   # -1 코드를 위해 한 칸 더
+    uniques, combined = np.unique(combined, return_inverse=True)
+    first = np.unique(combined, return_index=True)[1]
+    table = pd.DataFrame({dim: codes[dim][first].astype(np.int32) for dim in dims})
+    return combined, table
+
+
+def _postings(cell, ids, n_cells):
+    """셀별 고유 id 목록을 CSR(offsets, ids, id 상한) 형태로 만듭니다."""
+    size = int(ids.max()) + 1 if len(ids) else 1
+    pairs = np.unique(cell * size + ids)
+    offsets = np.searchsorted(pairs // size, np.arange(n_cells + 1))
+    return offsets, (pairs % size).astype(np.int32), size
+
+
+def _count_distinct(offsets, ids, size, cells):
+    """고른 셀들의 id 목록을 합친 고유 id 수"""
+    starts = offsets[cells]
+    lengths = offsets[cells + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return 0
+    # 셀별 [start, start + length) 구간을 하나의 위치 배열로 펼침
+    positions = np.arange(total) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+    seen = np.zeros(size, dtype=bool)
+    seen[ids[positions]] = True
+    return int(np.count_nonzero(seen))
+
+
+class RevenueCube:
+    """Revenue 페이지 KPI용 큐브. rollup(**필터)로 매출 / 상품 수 / 주문 수 / 구매자 수를 계산합니다.
+
+    order_cells   : 주문 차원 조합별 코드(-1은 결측)와 revenue, items, orders (주문은 한 조합에만 속하므로 orders도 가산)
+    product_cells : 상품 차원(category, brand) 조합별 코드
+    cells         : (주문 조합, 상품 조합) 셀별 revenue, items. 주문 / 구매자 id 목록은 CSR로 따로 저장
+    user_cells    : 사용자 차원 조합별 전체 사용자 수
+    """
+
+    def __init__(self, values, order_cells, product_cells, cells, postings, user_cells):
+        self.values = values
+        self.order_cells = order_cells
+        self.product_cells = product_cells
+        self.cells = cells
+        self.postings = postings        # {"orders" | "users" | "order_cell_users": (offsets, ids, id 상한)}
+        self.user_cells = user_cells
+        self.attrs = {}
+
+    @classmethod
+    def build(cls, orders, order_items, users, products):
+        """분석 모델 테이블(주문 / 주문 상품 팩트, 사용자 / 상품 차원)로 큐브를 만듭니다.
+
+        월 / 주문 상태는 Revenue 페이지와 같이 주문(orders) 기준이며, 주문 / 사용자 / 상품 차원에 없는 행은 -1 코드가 됩니다.
+        """
+        tables = {"orders": (orders, "order_id"), "users": (users, "id"), "products": (products, "id")}
+        item_keys = {"orders": "order_id", "users": "user_id", "products": "product_id"}
+
+        # 외래 키 위치(차원 테이블 행 번호)로 상품 행마다 차원 코드를 붙임
+        rows = {table: key_positions(order_items[item_keys[table]], df[key]) for table, (df, key) in tables.items()}
+        codes, values = {}, {}
+        for dim, table in ORDER_DIMENSIONS + PRODUCT_DIMENSIONS:
+            dim_codes, values[dim] = _codes(tables[table][0][dim])
+            codes[dim] = np.where(rows[table] >= 0, dim_codes[rows[table]], -1)
+
+        order_cell, order_cells = _combine(codes, values, [dim for dim, _ in ORDER_DIMENSIONS])
+        product_cell, product_cells = _combine(codes, values, [dim for dim, _ in PRODUCT_DIMENSIONS])
+        cell, cells = _combine({"order_cell": order_cell, "product_cell": product_cell},
+                               {"order_cell": order_cells, "product_cell": product_cells},
+                               ["order_cell", "product_cell"])
+
+        sale_price = order_items["sale_price"].to_numpy(dtype=np.float64)
+        order_ids = order_items["order_id"].to_numpy(dtype=np.int64)
+        user_ids = order_items["user_id"].to_numpy(dtype=np.int64)
+        for table, index in ((order_cells, order_cell), (cells, cell)):
+            table["revenue"] = np.bincount(index, weights=sale_price, minlength=len(table))
+            table["items"] = np.bincount(index, minlength=len(table))
+        order_cells["orders"] = np.diff(_postings(order_cell, order_ids, len(order_cells))[0])
+        postings = {
+            "orders": _postings(cell, order_ids, len(cells)),
+            "users": _postings(cell, user_ids, len(cells)),
+            "order_cell_users": _postings(order_cell, user_ids, len(order_cells)),
+        }
+
+        # 전체 사용자 수: users 테이블 자체의 (성별, 연령대, 유입 경로) 조합별 행 수
+        user_codes = pd.DataFrame({dim: _codes(users[dim])[0] for dim in USER_DIMENSIONS})
+        user_cells = user_codes.value_counts(sort=False).rename("users").reset_index()
+        return cls(values, order_cells, product_cells, cells, postings, user_cells)
+
+    # ---------------- 셀 선택 ----------------
+    def _mask(self, frame, filters):
+        """필터(None은 제한 없음, 그 외는 허용 값 목록)에 맞는 조합 마스크. 결측(-1) 코드는 값 목록과 맞지 않음"""
+        mask = np.ones(len(frame), dtype=bool)
+        for dim, allowed_values in filters.items():
+            if allowed_values is None or dim not in frame:
+                continue
+            if isinstance(allowed_values, str) or not hasattr(allowed_values, "__iter__"):
+                allowed_values = [allowed_values]
+            indexer = self.values[dim].get_indexer(list(allowed_values))
+            allowed = np.zeros(len(self.values[dim]) + 1, dtype=bool)   # 마지막 칸 = -1 코드
+            allowed[indexer[indexer >= 0]] = True
+            mask &= allowed[frame[dim].to_numpy()]
+        return mask
+
+    # ---------------- 지표 ----------------
+    def rollup(self, **filters):
+        """필터에 맞는 셀을 합쳐 {'revenue', 'items', 'orders', 'users'}를 반환합니다.
+
+        예) rollup(month_key=[636, 637], status=["Complete"], gender=None, category=["Jeans"])
+        """
+        order_ok = self._mask(self.order_cells, filters)
+        product_ok = self._mask(self.product_cells, filters)
+        if product_ok.all():
+            # 상품 필터가 전체 선택이면 주문 조합 단위로만 합침 (주문은 한 조합에만 속하므로 주문 수도 합)
+            selected = np.flatnonzero(order_ok)
+            table = self.order_cells
+            orders = int(table["orders"].to_numpy()[selected].sum())
+            users = _count_distinct(*self.postings["order_cell_users"], selected)
+        else:
+            table = self.cells
+            selected = np.flatnonzero(order_ok[table["order_cell"].to_numpy()] & product_ok[table["product_cell"].to_numpy()])
+            orders = _count_distinct(*self.postings["orders"], selected)
+            users = _count_distinct(*self.postings["users"], selected)
+        return {
+            "revenue": float(table["revenue"].to_numpy()[selected].sum()),
+            "items": int(table["items"].to_numpy()[selected].sum()),
+            "orders": orders,
+            "users": users,
+        }
+
+    def user_count(self, **filters):
+        """사용자 차원(gender, age_group, traffic_source) 필터에 맞는 전체 사용자 수"""
+        return int(self.user_cells["users"].to_numpy()[self._mask(self.user_cells, filters)].sum())
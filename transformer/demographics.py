@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+from transformer.model import day_keys
+
+# --- 👥 인구통계 교차표 ---
+# Acquisition 페이지의 유입 경로 / 인구통계 차트용. users를 (가입일, 유입 경로, 국가, 성별, 연령대) 조합별 사용자 수로
+# 데이터셋 버전마다 한 번만 집계합니다. 셀은 가입일 순으로 정렬되어 있어 날짜 필터는 searchsorted 슬라이스로 고르고,
+# 기간마다 "유입 경로 -> 차원별 사용자 수" dict를 한 번 만들어 두므로 선택한 유입 경로가 바뀌면 dict 조회만 합니다.
+# 셀 수는 (일 수 x 차원 조합 수) 이하라 사용자 수가 늘어도 커지지 않습니다.
+# 가입 월 대신 가입일로 나누는 이유: 페이지의 날짜 필터가 일 단위이고, 월 추이는 일 키에서 바로 구할 수 있기 때문
+
+CATEGORY_DIMENSIONS = ("traffic_source", "country", "gender")
+DIMENSIONS = CATEGORY_DIMENSIONS + ("age_group",)
+
+# 기간별 breakdown을 보관하는 최대 개수 (날짜 필터를 자주 바꿔도 메모리가 늘지 않도록)
+MAX_BREAKDOWNS = 32
+
+
+def _category_codes(values):
+    """범주형 컬럼을 (코드, CategoricalDtype)으로 바꿉니다. 결측은 -1"""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype("category")
+    return values.cat.codes.to_numpy().astype(np.int32), values.dtype
+
+
+class DemographicCrosstab:
+    """(가입일, 유입 경로, 국가, 성별, 연령대) 조합별 사용자 수.
+
+    cells  : day_key(정렬됨)와 차원별 코드(-1은 결측 / 연령대 구간 밖), users
+    dtypes : 차원별 CategoricalDtype (연령대는 구간 라벨 순서의 ordered 범주)
+    """
+
+    def __init__(self, dtypes, cells):
+        self.dtypes = dtypes
+        self.cells = cells
+        self.attrs = {}
+        self._breakdowns = {}
+
+    @classmethod
+    def build(cls, users, age_bins, age_labels):
+        """users(created_at, traffic_source, country, gender, age)로 교차표를 만듭니다.
+
+        연령대는 pd.cut(age, age_bins, labels=age_labels, right=False)와 같은 구간입니다.
+        """
+        codes, dtypes = {}, {}
+        for dim in CATEGORY_DIMENSIONS:
+            codes[dim], dtypes[dim] = _category_codes(users[dim])
+        bucket = np.searchsorted(np.asarray(age_bins), users["age"].to_numpy(), side="right") - 1
+        codes["age_group"] = np.where((bucket >= 0) & (bucket < len(age_labels)), bucket, -1).astype(np.int32)
+        dtypes["age_group"] = pd.CategoricalDtype(age_labels, ordered=True)
+
+        frame = pd.DataFrame({"day_key": day_keys(users["created_at"]), **codes})
+        cells = frame.value_counts(sort=False).rename("users").reset_index()
+        cells = cells.sort_values(list(frame.columns), ignore_index=True)
+        return cls(dtypes, cells)
+
+    # ---------------- 기간 선택 ----------------
+    def _rows(self, start_day, end_day):
+        """가입일 키가 [start_day, end_day]인 셀 (searchsorted 슬라이스)"""
+        day = self.cells["day_key"].to_numpy()
+        lo, hi = np.searchsorted(day, [start_day, end_day + 1], side="left")
+        return self.cells.iloc[lo:hi]
+
+    def users(self, start_day, end_day):
+        """기간 가입자 수 (유입 경로 등이 결측인 사용자 포함)"""
+        return int(self._rows(start_day, end_day)["users"].sum())
+
+    def breakdown(self, start_day, end_day):
+        """기간의 {유입 경로: {"users": 사용자 수, 차원: 범주 순서의 사용자 수 배열}}. 기간마다 한 번만 계산"""
+        key = (start_day, end_day)
+        result = self._breakdowns.get(key)
+        if result is None:
+            rows = self._rows(start_day, end_day)
+            source = rows["traffic_source"].to_numpy()
+            users = rows["users"].to_numpy()
+            result = {}
+            for code in np.unique(source[source >= 0]):
+                selected = source == code
+                entry = {"users": int(users[selected].sum())}
+                for dim in DIMENSIONS[1:]:
+                    dim_codes, weights = rows[dim].to_numpy()[selected], users[selected]
+                    known = dim_codes >= 0
+                    entry[dim] = np.bincount(dim_codes[known], weights=weights[known],
+                                             minlength=len(self.dtypes[dim].categories)).astype(np.int64)
+                result[self.dtypes["traffic_source"].categories[code]] = entry
+            # 여러 세션이 같은 교차표를 공유하므로(cache_resource) 메모는 교체만 하고, 결과는 지역 변수로 반환
+            if len(self._breakdowns) >= MAX_BREAKDOWNS:
+                self._breakdowns.clear()
+            self._breakdowns[key] = result
+        return result
+
+    # ---------------- 지표 ----------------
+    def value_counts(self, dim, start_day, end_day, traffic_source=None):
+        """기간(과 유입 경로) 사용자의 dim 값별 사용자 수. Series.value_counts()와 같은 형식 (많은 순, 0 포함)"""
+        categories = self.dtypes[dim].categories
+        breakdown = self.breakdown(start_day, end_day)
+        if dim == "traffic_source":
+            counts = np.zeros(len(categories), dtype=np.int64)
+            for source, entry in breakdown.items():
+                counts[categories.get_loc(source)] = entry["users"]
+        elif traffic_source in breakdown:
+            counts = breakdown[traffic_source][dim]
+        else:
+            counts = np.zeros(len(categories), dtype=np.int64)
+        index = pd.CategoricalIndex(categories, categories=categories, ordered=self.dtypes[dim].ordered)
+        return pd.Series(counts, index=index, name=dim).sort_values(ascending=False)
+
+    def monthly(self, start_day, end_day):
+        """가입 월(1~12) x 유입 경로별 사용자 수 DataFrame (사용자가 있는 유입 경로만, 열은 범주 순서)"""
+        rows = self._rows(start_day, end_day)
+        days = rows["day_key"].to_numpy().astype("datetime64[D]")
+        month = pd.Series(days.astype("datetime64[M]").astype(np.int64) % 12 + 1, index=rows.index, name="month")
+        source = pd.Series(pd.Categorical.from_codes(rows["traffic_source"], dtype=self.dtypes["traffic_source"]),
+                           index=rows.index, name="traffic_source")
+        counts = rows["users"].groupby([month, source], observed=True).sum().unstack(fill_value=0)
+        return counts[counts.columns.sort_values()]
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# --- 🔎 사이드바 필터 엔진 ---
+# 필터 차원마다 정수 코드(범주형이면 cat.codes 그대로)와 값 목록을 미리 만들어 두고,
+# 필터 값이 바뀌면 "허용 코드 표[코드]"로 행 마스크를 만들어 AND 합니다. (isin 해시 / 중간 DataFrame 없음)
+# 팩트 테이블의 order_id / user_id / product_id는 차원 테이블의 행 위치 배열(외래 키 위치)로 미리 바꿔 두어
+# 차원 마스크를 팩트 행 마스크로 옮길 때 조인 대신 배열 조회 한 번만 합니다.
+
+
+def key_positions(keys, ids):
+    """keys의 각 값이 ids의 몇 번째 행인지 (없으면 -1) int32 배열로 반환합니다."""
+    keys = np.asarray(keys, dtype=np.int64)
+    ids = np.asarray(ids, dtype=np.int64)
+    size = max(int(keys.max()) if len(keys) else 0, int(ids.max()) if len(ids) else 0) + 1
+    table = np.full(size, -1, dtype=np.int32)
+    table[ids] = np.arange(len(ids), dtype=np.int32)
+    return table[keys]
+
+
+def _codes(values):
+    """컬럼을 (정수 코드, 값 Index)로 바꿉니다. 결측은 -1"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), pd.Index(values.cat.categories)
+    codes, uniques = pd.factorize(values)
+    return codes, pd.Index(uniques)
+
+
+class FilterIndex:
+    """테이블 하나의 필터 차원 코드와 외래 키 위치.
+
+    codes        : {컬럼: (행별 코드, 값 Index)}
+    foreign_keys : {차원 테이블 이름: 행별 차원 테이블 행 위치 (없으면 -1)}
+    """
+
+    def __init__(self, df, columns=(), foreign_keys=None):
+        self.n_rows = len(df)
+        self.codes = {column: _codes(df[column]) for column in columns}
+        self.foreign_keys = foreign_keys or {}
+        self.attrs = {}
+
+    def mask(self, where=None, **filters):
+        """필터에 맞는 행 마스크(bool 배열).
+
+        filters : {컬럼: 허용 값 목록 | 단일 값 | None(제한 없음)}. 결측 행은 목록에 결측이 있을 때만 통과
+        where   : {차원 테이블 이름: 차원 테이블 행 마스크}. 외래 키가 가리키는 행이 마스크에 들어야 통과
+        """
+        mask = np.ones(self.n_rows, dtype=bool)
+        for column, values in filters.items():
+            if values is None:
+                continue
+            if isinstance(values, str) or not hasattr(values, "__iter__"):
+                values = [values]
+            codes, index = self.codes[column]
+            indexer = index.get_indexer(list(values))
+            allowed = np.zeros(len(index) + 1, dtype=bool)      # 마지막 칸 = 결측(-1) 코드
+            allowed[indexer[indexer >= 0]] = True
+            allowed[-1] = any(pd.isna(value) for value in values)   # isin처럼 목록에 결측이 있으면 결측 행도 통과
+            mask &= allowed[codes]
+        for table, table_mask in (where or {}).items():
+            mask &= np.append(table_mask, False)[self.foreign_keys[table]]
+        return mask
+
+    def rows(self, where=None, **filters):
+        """mask()와 같은 조건의 행 번호 배열.
+
+        외래 키 조건은 통과 비율이 낮은 차원 테이블부터, 앞 조건을 통과한 행에만 차례로 적용합니다.
+        """
+        rows = np.flatnonzero(self.mask(**filters)) if filters else None
+        for table, table_mask in sorted((where or {}).items(), key=lambda item: item[1].mean()):
+            passed = np.append(table_mask, False)
+            keys = self.foreign_keys[table]
+            rows = np.flatnonzero(passed[keys]) if rows is None else rows[passed[keys[rows]]]
+        return np.arange(self.n_rows) if rows is None else rows
+
+
+def take(df, rows):
+    """행 번호 배열(또는 마스크)에 맞는 행만 한 번에 가져옵니다. (불리언 인덱싱을 여러 번 연쇄하지 않음)"""
+    rows = np.asarray(rows)
+    return df.take(np.flatnonzero(rows) if rows.dtype == bool else rows)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from transformer.model import day_keys, week_keys
+
+# --- 🔻 퍼널 엔진 ---
+# 세션(또는 사용자)마다 event_type별 첫 발생 시각을 (경로 수, 이벤트 종류 수) 배열로 한 번만 만들어 둡니다.
+# 퍼널 단계가 바뀌면 events를 다시 읽지 않고 이 배열의 열 min / 비교만으로 단계별 도달 여부를 계산합니다.
+#   - open   : 해당 단계 이벤트가 있는 경로 (retentioneering funnel()의 기본값, 기본 퍼널 차트)
+#   - closed : 이전 단계를 모두 거치고, 단계 첫 발생 시각이 이전 단계 이후인 경로
+#   - hybrid : 순서와 관계없이 이전 단계를 모두 거친 경로
+# 시각은 UTC 나노초(int64)로 저장하며, 없는 이벤트는 MISSING입니다.
+
+FUNNEL_TYPES = ("open", "closed", "hybrid")
+MISSING = np.iinfo(np.int64).max
+SEGMENT_COLUMNS = ("traffic_source",)
+
+
+def stage_label(stage):
+    """단계 표시 이름. 여러 이벤트로 된 단계는 ' | '로 연결"""
+    return stage if isinstance(stage, str) else " | ".join(stage)
+
+
+class FunnelIndex:
+    """경로(세션 / 사용자)별 event_type 첫 발생 시각.
+
+    names    : 이벤트 이름 (first의 열 순서)
+    first    : (경로 수, 이벤트 종류 수) 첫 발생 시각(나노초). 없으면 MISSING
+    day      : 경로 첫 이벤트의 일 키
+    segments : {컬럼: (경로별 코드, 값 Index)}. 경로 첫 이벤트의 값
+    """
+
+    def __init__(self, names, first, day, segments):
+        self.names = names
+        self.first = first
+        self.day = day
+        self.segments = segments
+        self.attrs = {}
+
+    @classmethod
+    def build(cls, events, by="session_id", segment_columns=SEGMENT_COLUMNS):
+        """events(by 컬럼, event_type, created_at, 세그먼트 컬럼)로 인덱스를 만듭니다. by에 결측이 있는 이벤트는 제외"""
+        events = events[events[by].notna()]
+        paths, _ = pd.factorize(events[by])
+        codes, names = pd.factorize(events["event_type"].astype(str))
+        timestamps = events["created_at"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        n_paths = int(paths.max()) + 1 if len(paths) else 0
+
+        first = np.full(n_paths * len(names), MISSING, dtype=np.int64)
+        np.minimum.at(first, paths * len(names) + codes, timestamps)
+        first = first.reshape(n_paths, len(names))
+
+        # 경로별 첫 이벤트 행 (시각이 같으면 먼저 나온 행): 시작일과 세그먼트 값
+        order = np.lexsort((timestamps, paths))
+        heads = order[np.searchsorted(paths[order], np.arange(n_paths))]
+
+        day = day_keys(events["created_at"].iloc[heads])
+        segments = {}
+        for column in segment_columns:
+            segment_codes, values = pd.factorize(events[column].to_numpy()[heads])
+            segments[column] = (segment_codes, pd.Index(values))
+        return cls(pd.Index(names), first, day, segments)
+
+    # ---------------- 단계 ----------------
+    def stage_times(self, stages):
+        """단계별 첫 도달 시각 (경로 수, 단계 수). 단계가 이벤트 목록이면 그중 가장 이른 시각"""
+        times = np.full((len(self.first), len(stages)), MISSING, dtype=np.int64)
+        for i, stage in enumerate(stages):
+            events = [stage] if isinstance(stage, str) else list(stage)
+            columns = self.names.get_indexer(events)
+            columns = columns[columns >= 0]
+            if len(columns):
+                times[:, i] = self.first[:, columns].min(axis=1)
+        return times
+
+    def reached(self, stages, funnel_type="open", window=None):
+        """경로별 단계 도달 여부 (경로 수, 단계 수) bool 배열.
+
+        window : 첫 단계로부터 이 초 안에 도달한 단계만 인정 (closed / hybrid)
+        """
+        if funnel_type not in FUNNEL_TYPES:
+            raise ValueError(f"funnel_type은 {FUNNEL_TYPES} 중 하나여야 합니다: {funnel_type!r}")
+        times = self.stage_times(stages)
+        has = times != MISSING
+        if funnel_type == "open" or not len(stages):
+            return has
+        in_window = has if window is None else has & (times - times[:, :1] <= window * 10**9)
+        if funnel_type == "closed":
+            ordered = np.ones_like(has)
+            ordered[:, 1:] = times[:, 1:] >= times[:, :-1]
+            return np.logical_and.accumulate(in_window & ordered, axis=1)
+        return np.logical_and.accumulate(in_window & has[:, :1], axis=1)
+
+    # ---------------- 집계 ----------------
+    def _groups(self, by):
+        """경로별 그룹 코드와 그룹 값 Index"""
+        if by in ("day", "week", "month"):
+            keys = self.day
+            if by == "week":
+                keys = week_keys(keys)
+            elif by == "month":
+                keys = keys.astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+            values, codes = np.unique(keys, return_inverse=True)
+            return codes, pd.Index(values, name=f"{by}_key")
+        codes, values = self.segments[by]
+        return codes, values.rename(by)
+
+    def counts(self, stages, funnel_type="open", window=None, start_day=None, end_day=None, by=None):
+        """단계별 도달 경로 수 DataFrame (행: 단계 이름).
+
+        start_day / end_day : 경로 첫 이벤트의 일 키로 경로를 제한
+        by                  : None(열 'total' 하나) | 세그먼트 컬럼(traffic_source) | 'day' / 'week' / 'month'
+        """
+        reached = self.reached(stages, funnel_type, window)
+        selected = np.ones(len(self.first), dtype=bool)
+        if start_day is not None:
+            selected &= self.day >= start_day
+        if end_day is not None:
+            selected &= self.day <= end_day
+        index = pd.Index([stage_label(stage) for stage in stages], name="stage")
+        if by is None:
+            return pd.DataFrame({"total": reached[selected].sum(axis=0)}, index=index)
+
+        codes, values = self._groups(by)
+        valid = selected & (codes >= 0)
+        counts = np.stack([np.bincount(codes[valid & reached[:, i]], minlength=len(values))
+                           for i in range(len(stages))]) if len(stages) else np.zeros((0, len(values)), dtype=np.int64)
+        frame = pd.DataFrame(counts, index=index, columns=values)
+        return frame.loc[:, frame.sum(axis=0) > 0]
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+from transformer.bitmap import SEGMENT_COLUMNS
+from transformer.model import day_keys, week_keys
+
+# --- 🎲 HyperLogLog 근사 순 사용자 수 ---
+# 사용자 비트맵(transformer.bitmap)은 정확하지만 user_id 범위만큼 메모리가 필요합니다.
+# 월 1억 건 이상의 events에서는 일별 / 세그먼트별 HLL 스케치(레지스터 2^p개, uint8)를 저장해 두고
+# 기간 합치기는 레지스터 max(merge)로, 순 사용자 수는 추정값으로 계산합니다. 상대 표준오차는 1.04 / sqrt(2^p)
+# (p=14이면 약 0.8%, 스케치 하나 16KB / p=11이면 약 2.3%, 2KB)
+
+MIN_PRECISION, MAX_PRECISION = 11, 16     # 해시 하위 (64 - p)비트가 float64로 정확히 표현되는 범위
+
+# 2^-rank 표 (추정값 계산용)
+_INV_POW2 = np.ldexp(1.0, -np.arange(66))
+
+
+def relative_error(precision):
+    """정밀도 p 스케치의 상대 표준오차"""
+    return 1.04 / np.sqrt(2 ** precision)
+
+
+def _hash64(values):
+    """splitmix64 해시 (int64 배열 -> uint64 배열)"""
+    h = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def _register_updates(user_ids, precision):
+    """user_id마다 (레지스터 번호, rank)를 계산합니다. rank는 나머지 비트의 선행 0 개수 + 1"""
+    h = _hash64(user_ids)
+    width = 64 - precision
+    register = (h >> np.uint64(width)).astype(np.int64)
+    rest = (h & np.uint64((1 << width) - 1)).astype(np.float64)
+    rank = (width + 1 - np.frexp(rest)[1]).astype(np.uint8)
+    return register, rank
+
+
+def _fill_registers(n_rows, precision, rows, user_ids):
+    """rows[i]번째 스케치에 user_ids[i]를 넣은 (n_rows, 2^p) 레지스터 배열을 만듭니다."""
+    m = 1 << precision
+    registers = np.zeros(n_rows * m, dtype=np.uint8)
+    register, rank = _register_updates(user_ids, precision)
+    slot = rows.astype(np.int64) * m + register
+    # 같은 레지스터에 여러 값이 들어오면 가장 큰 rank가 남도록 rank 오름차순으로 나눠 대입
+    order = np.argsort(rank, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(rank, minlength=66))])
+    for r in np.flatnonzero(np.diff(bounds)):
+        registers[slot[order[bounds[r]:bounds[r + 1]]]] = r
+    return registers.reshape(n_rows, m)
+
+
+def estimate(registers):
+    """스케치(마지막 축이 레지스터)마다 순 사용자 수 추정값(int64)을 계산합니다."""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / _INV_POW2[registers].sum(axis=-1)
+    zeros = (registers == 0).sum(axis=-1)
+    # 작은 값 보정: 빈 레지스터가 남아 있으면 linear counting
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.rint(np.where((raw <= 2.5 * m) & (zeros > 0), linear, raw)).astype(np.int64)
+
+
+class UserSketchIndex:
+    """일별 / 세그먼트 값별 HLL 스케치. UserBitmapIndex와 같은 지표 메서드를 제공합니다. (근사 모드)
+
+    days     : (일 수, 2^precision) 레지스터. i번째 행은 일 키 first_day + i
+    segments : {(컬럼, 값): (일 수, 2^segment_precision) 레지스터}
+    """
+
+    def __init__(self, first_day, days, has_events, segments, precision, segment_precision):
+        self.first_day = first_day
+        self.days = days
+        self.has_events = has_events
+        self.segments = segments
+        self.precision = precision
+        self.segment_precision = segment_precision
+        self.relative_error = relative_error(precision)
+        self.attrs = {}
+
+    @classmethod
+    def build(cls, events, users=None, segment_columns=SEGMENT_COLUMNS, precision=14, segment_precision=11):
+        """events(user_id, created_at)와 users(id, 세그먼트 컬럼)로 스케치를 만듭니다."""
+        for p in (precision, segment_precision):
+            if not MIN_PRECISION <= p <= MAX_PRECISION:
+                raise ValueError(f"HLL precision은 {MIN_PRECISION}~{MAX_PRECISION} 사이여야 합니다: {p}")
+
+        day = day_keys(events["created_at"])
+        first_day = int(day.min()) if len(day) else 0
+        n_days = int(day.max()) - first_day + 1 if len(day) else 0
+        has_events = np.bincount(day - first_day, minlength=n_days) > 0
+
+        member = events["user_id"].notna().to_numpy()
+        user_ids = events["user_id"].to_numpy(dtype=np.int64, na_value=0)[member]
+        rows = day[member] - first_day
+        days = _fill_registers(n_days, precision, rows, user_ids)
+
+        segments = {}
+        if users is not None and len(user_ids):
+            # user_id -> 세그먼트 값 코드 조회 표 (users에 없는 사용자는 -1)
+            ids = users["id"].to_numpy(dtype=np.int64)
+            size = max(int(ids.max()) if len(ids) else 0, int(user_ids.max())) + 1
+            for column in segment_columns:
+                codes, values = pd.factorize(users[column])
+                lookup = np.full(size, -1, dtype=np.int64)
+                lookup[ids] = codes
+                event_codes = lookup[user_ids]
+                valid = event_codes >= 0
+                registers = _fill_registers(len(values) * n_days, segment_precision,
+                                            event_codes[valid] * n_days + rows[valid], user_ids[valid])
+                registers = registers.reshape(len(values), n_days, -1)
+                segments.update({(column, value): sketch for value, sketch in zip(values, registers)})
+        return cls(first_day, days, has_events, segments, precision, segment_precision)
+
+    # ---------------- 스케치 ----------------
+    def _rows(self, start_day, end_day):
+        lo = max(start_day - self.first_day, 0)
+        hi = min(end_day - self.first_day + 1, len(self.days))
+        return lo, max(hi, lo)
+
+    def segment(self, **filters):
+        """segment(traffic_source=['Email', 'Search']) -> 값별 일 스케치를 merge한 (일 수, 레지스터) 배열
+
+        HLL은 합집합(merge)만 정확히 지원하므로 컬럼은 하나만 지정할 수 있습니다.
+        """
+        if len(filters) != 1:
+            raise ValueError("근사 모드의 세그먼트는 컬럼 하나만 지정할 수 있습니다. (교집합은 사용자 비트맵 인덱스 사용)")
+        (column, values), = filters.items()
+        if isinstance(values, str) or not hasattr(values, "__iter__"):
+            values = [values]
+        result = np.zeros((len(self.days), 1 << self.segment_precision), dtype=np.uint8)
+        for value in values:
+            if (column, value) in self.segments:
+                np.maximum(result, self.segments[(column, value)], out=result)
+        return result
+
+    # ---------------- 지표 ----------------
+    def unique_users(self, start_day, end_day, within=None):
+        """기간 내 순 사용자 수 추정값 (within: segment() 결과로 제한)"""
+        sketches = self.days if within is None else within
+        lo, hi = self._rows(start_day, end_day)
+        return int(estimate(np.maximum.reduce(sketches[lo:hi], axis=0, initial=0)))
+
+    def daily_active(self, start_day, end_day, within=None):
+        """일 키별 DAU 추정 Series (이벤트가 있었던 날만)"""
+        sketches = self.days if within is None else within
+        lo, hi = self._rows(start_day, end_day)
+        keys = self.first_day + np.arange(lo, hi)
+        counts = pd.Series(estimate(sketches[lo:hi]), index=pd.Index(keys, name="day_key"))
+        return counts[self.has_events[lo:hi]]
+
+    def period_active(self, start_day, end_day, granularity="month", within=None):
+        """WAU(granularity='week') / MAU(granularity='month') 추정 Series. index는 주/월 키"""
+        sketches = self.days if within is None else within
+        lo, hi = self._rows(start_day, end_day)
+        keys = self.first_day + np.arange(lo, hi)
+        keep = self.has_events[lo:hi]
+        if granularity == "week":
+            periods = week_keys(keys)
+        else:
+            periods = keys.astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+        periods, starts = np.unique(periods[keep], return_index=True)
+        rows = np.flatnonzero(keep) + lo
+        # 기간별 레지스터 max (uint8 maximum.reduceat은 행 단위 루프라 느려서 구간마다 max)
+        bounds = np.append(rows[starts], rows[-1] + 1 if len(rows) else lo)
+        merged = np.zeros((len(periods), sketches.shape[1]), dtype=np.uint8)
+        for i, (s, e) in enumerate(zip(bounds[:-1], bounds[1:])):
+            merged[i] = sketches[s:e].max(axis=0)
+        return pd.Series(estimate(merged), index=pd.Index(periods, name=f"{granularity}_key"))
@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+from transformer.versioning import dataset_version, stamp_version
+
+# --- 🧱 분석 모델 (Analytics Model) ---
+# load_all_data 결과로부터 페이지/차트가 공통으로 쓰는 파생 데이터를 한 번만 계산합니다.
+#   - users       : 사용자 차원 (age_group, signup/first order 정보, activated, 코호트 키)
+#   - orders      : 주문 팩트 (is_complete, 월/주/일 정수 키)
+#   - order_items : 주문 상품 팩트 (is_complete, 월/주/일 정수 키)
+#   - products    : 상품 차원
+
+# 연령대 구간 (Revenue / Activation 페이지 공통)
+AGE_BINS = [0, 20, 30, 40, 50, 60, 100]
+AGE_LABELS = ["<20", "20s", "30s", "40s", "50s", "60+"]
+
+# Acquisition 인구통계 차트의 10세 단위 연령대 (age_group과는 구간이 다름, transformer.demographics)
+AGE_BUCKETS = [10, 20, 30, 40, 50, 60, 70]
+AGE_BUCKET_LABELS = ['10-19', '20-29', '30-39', '40-49', '50-59', '60-69']
+
+# 1970-01-01은 목요일이므로 4일 뒤(1970-01-05, 월요일)를 주 키 0의 시작으로 사용
+_WEEK_OFFSET_DAYS = 4
+
+
+def day_keys(created_at):
+    """datetime 컬럼을 1970-01-01 기준 일 수(int32)로 변환합니다. (UTC 기준)"""
+    return created_at.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int32)
+
+
+def day_key(date):
+    """날짜(date / 'YYYY-MM-DD')를 일 키로 변환합니다. 예) day_key(date(2023, 1, 1)) == 19358"""
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+def week_keys(day_key):
+    """일 키를 월요일 시작 주 키로 변환합니다."""
+    return ((day_key - _WEEK_OFFSET_DAYS) // 7).astype(np.int32)
+
+
+def month_keys(created_at):
+    """datetime 컬럼을 1970-01 기준 개월 수(int32)로 변환합니다."""
+    return created_at.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]").astype(np.int32)
+
+
+def month_key(year, month):
+    """(연, 월)을 월 키로 변환합니다. 예) month_key(2023, 1) == 636"""
+    return (year - 1970) * 12 + (month - 1)
+
+
+def month_key_to_period(key):
+    return pd.Period(year=1970 + key // 12, month=key % 12 + 1, freq="M")
+
+
+def period_starts(keys, granularity):
+    """일/주/월 키 배열을 각 기간의 시작일(DatetimeIndex)로 변환합니다."""
+    keys = np.asarray(keys, dtype=np.int64)
+    if granularity == "month":
+        return pd.DatetimeIndex(keys.astype("datetime64[M]").astype("datetime64[ns]"))
+    if granularity == "week":
+        keys = keys * 7 + _WEEK_OFFSET_DAYS
+    return pd.DatetimeIndex(keys.astype("datetime64[D]").astype("datetime64[ns]"))
+
+
+def _add_time_keys(df):
+    df["day_key"] = day_keys(df["created_at"])
+    df["week_key"] = week_keys(df["day_key"])
+    df["month_key"] = month_keys(df["created_at"])
+    return df
+
+
+def build_orders_fact(orders):
+    """주문 팩트: 완료 여부와 월/주/일 키를 붙입니다."""
+    fact = orders.copy()
+    fact["is_complete"] = (fact["status"] == "Complete").to_numpy()
+    return _add_time_keys(fact)
+
+
+def build_order_items_fact(order_items):
+    """주문 상품 팩트: 완료 여부와 월/주/일 키를 붙입니다."""
+    fact = order_items.copy()
+    fact["is_complete"] = (fact["status"] == "Complete").to_numpy()
+    return _add_time_keys(fact)
+
+
+def build_user_dim(users, orders_fact):
+    """사용자 차원: 연령대, 가입 월, 첫 구매(완료 주문 기준) 정보와 코호트 키를 붙입니다."""
+    dim = users.copy()
+    dim["age_group"] = pd.cut(dim["age"], bins=AGE_BINS, labels=AGE_LABELS, right=False)
+    dim["signup_month"] = dim["created_at"].dt.to_period("M")
+
+    # 사용자별 첫 완료 주문 (주문 일시가 가장 빠른 주문)
+    complete = orders_fact[orders_fact["is_complete"]]
+    first = complete.loc[complete.groupby("user_id")["created_at"].idxmin(),
+                         ["user_id", "order_id", "created_at", "day_key", "week_key", "month_key"]]
+    first = first.rename(columns={
+        "order_id": "first_order_id",
+        "created_at": "first_order_date",
+        "day_key": "cohort_day_key",
+        "week_key": "cohort_week_key",
+        "month_key": "cohort_month_key",
+    }).set_index("user_id")
+
+    dim = dim.join(first, on="id")
+    dim["first_order_month"] = dim["first_order_date"].dt.to_period("M")
+    dim["activated"] = dim["first_order_id"].notna().to_numpy()
+    dim["ttfp_days"] = (dim["first_order_date"] - dim["created_at"]).dt.days
+    # join 결과에는 attrs가 남지 않으므로 원본 두 테이블로 버전 ID를 다시 기록
+    return stamp_version(dim, "user_dim", dataset_version(users, orders_fact))
+
+
+def build_product_dim(products):
+    return products.copy()
+
+
+def build_analytics_model(all_data):
+    """load_all_data()의 결과로 분석 모델 dict를 만듭니다."""
+    orders = build_orders_fact(all_data["orders"])
+    return {
+        "users": build_user_dim(all_data["users"], orders),
+        "orders": orders,
+        "order_items": build_order_items_fact(all_data["order_items"]),
+        "products": build_product_dim(all_data["products"]),
+    }
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+
+from transformer.model import day_keys
+
+# --- 🔀 세션 경로 엔진 (Sankey) ---
+# events를 (session_id, created_at) 순으로 한 번만 정렬하고 event_type을 작은 정수 코드로 바꿔 둡니다.
+# 세션 i의 이벤트는 codes[offsets[i]:offsets[i + 1]]이므로, 기간이 바뀌어도 다시 정렬하지 않고
+# 세션별 (시작 위치, 길이)만 계산해 k번째 단계 이벤트를 배열 조회 한 번으로 가져옵니다.
+# 단계별 전이 수는 (출발 코드, 도착 코드) 쌍의 bincount이고, 단계마다 상위 K개가 아닌 이벤트는 '기타' 노드로 묶습니다.
+
+PATH_START, PATH_END = "path_start", "path_end"    # retentioneering Eventstream의 합성 이벤트와 같은 이름
+OTHER = "기타"
+NO_EVENT = -1       # 경로가 끝난 뒤의 단계
+
+
+class PathIndex:
+    """세션별로 정렬된 이벤트 코드.
+
+    names   : 코드 -> 이벤트 이름 (event_type 값 다음에 PATH_START, PATH_END)
+    codes   : (session_id, created_at) 순 이벤트 코드 (int16)
+    days    : codes와 같은 순서의 일 키
+    offsets : 세션 i의 이벤트 구간 [offsets[i], offsets[i + 1])
+    """
+
+    def __init__(self, names, codes, days, offsets):
+        self.names = names
+        self.codes = codes
+        self.days = days
+        self.offsets = offsets
+        self.attrs = {}
+
+    @classmethod
+    def build(cls, events):
+        """events(session_id, event_type, created_at)로 인덱스를 만듭니다."""
+        sessions, _ = pd.factorize(events["session_id"])
+        event_codes, event_names = pd.factorize(events["event_type"].astype(str))
+        timestamps = events["created_at"].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        order = np.lexsort((timestamps, sessions))
+
+        names = pd.Index([*event_names, PATH_START, PATH_END])
+        offsets = np.searchsorted(sessions[order], np.arange(sessions.max() + 2 if len(sessions) else 1))
+        return cls(names, event_codes[order].astype(np.int16), day_keys(events["created_at"])[order], offsets)
+
+    # ---------------- 세션 ----------------
+    def sessions(self, start_day, end_day):
+        """[start_day, end_day] 기간 이벤트만 남겼을 때 세션별 (시작 위치, 길이). 이벤트가 없는 세션은 제외
+
+        세션 안의 이벤트는 시간순이므로 기간 안 이벤트는 항상 연속 구간입니다.
+        """
+        if len(self.codes) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        heads = self.offsets[:-1]
+        before = np.add.reduceat((self.days < start_day).astype(np.int64), heads)
+        inside = np.add.reduceat(((self.days >= start_day) & (self.days <= end_day)).astype(np.int64), heads)
+        keep = inside > 0
+        return heads[keep] + before[keep], inside[keep]
+
+    def paths(self, start_day, end_day, max_steps=10, sample=None, seed=0):
+        """세션별 처음 max_steps 단계의 코드 행렬 (세션 수, max_steps). 첫 단계는 PATH_START, 마지막 이벤트 다음은 PATH_END
+
+        sample : 세션 표본 수(정수) 또는 비율(0~1). 전체 세션보다 적으면 무작위 표본만 사용합니다. (seed로 고정)
+        """
+        starts, lengths = self.sessions(start_day, end_day)
+        if sample is not None:
+            size = int(round(sample * len(starts))) if isinstance(sample, float) else int(sample)
+            if size < len(starts):
+                chosen = np.sort(np.random.default_rng(seed).choice(len(starts), size, replace=False))
+                starts, lengths = starts[chosen], lengths[chosen]
+
+        start_code, end_code = len(self.names) - 2, len(self.names) - 1
+        matrix = np.full((len(starts), max_steps), NO_EVENT, dtype=np.int16)
+        if max_steps:
+            matrix[:, 0] = start_code
+        for step in range(1, max_steps):
+            event = step - 1
+            has = lengths > event
+            matrix[has, step] = self.codes[starts[has] + event]
+            matrix[lengths == event, step] = end_code
+        return matrix
+
+
+def step_transitions(paths, names, thresh=0.05, top_k=None):
+    """paths() 행렬의 단계별 노드와 전이 수를 계산합니다.
+
+    단계마다 세션 비율이 thresh 미만이거나 상위 top_k개 밖인 이벤트는 OTHER 노드 하나로 묶습니다. (PATH_END 제외)
+    반환: (nodes: step, event, sessions / links: source, target, sessions). source / target은 nodes 행 번호
+    """
+    n_sessions, n_steps = paths.shape
+    other, end_code = len(names), len(names) - 1
+    labels = np.append(np.asarray(names, dtype=object), OTHER)
+    pruned = np.full_like(paths, NO_EVENT)
+    step_counts = []
+    for step in range(n_steps):
+        column = paths[:, step]
+        valid = column != NO_EVENT
+        counts = np.bincount(column[valid], minlength=len(names))
+        kept = np.flatnonzero(counts >= max(thresh * n_sessions, 1))
+        if top_k is not None and len(kept) > top_k:
+            kept = kept[np.argsort(-counts[kept], kind="stable")[:top_k]]
+        kept = np.append(kept, end_code)        # 이탈(PATH_END)은 비율과 관계없이 항상 따로 표시
+        mapping = np.full(len(names), other, dtype=np.int16)
+        mapping[kept] = kept
+        pruned[valid, step] = mapping[column[valid]]
+        step_counts.append(np.bincount(pruned[valid, step], minlength=other + 1))
+
+    # 노드 번호 = 단계 * (코드 수) + 코드. 세션이 지나간 노드만 남김
+    width = other + 1
+    counts = np.concatenate(step_counts) if step_counts else np.zeros(0, dtype=np.int64)
+    present = np.flatnonzero(counts)
+    nodes = pd.DataFrame({
+        "step": present // width + 1,
+        "event": labels[present % width],
+        "sessions": counts[present],
+    })
+    position = np.full(len(counts), -1, dtype=np.int64)
+    position[present] = np.arange(len(present))
+
+    sources, targets = [], []
+    for step in range(n_steps - 1):
+        moved = (pruned[:, step] != NO_EVENT) & (pruned[:, step + 1] != NO_EVENT)
+        sources.append(step * width + pruned[moved, step].astype(np.int64))
+        targets.append((step + 1) * width + pruned[moved, step + 1].astype(np.int64))
+    pairs = np.concatenate(sources) * len(counts) + np.concatenate(targets) if sources else np.zeros(0, dtype=np.int64)
+    pairs, link_counts = np.unique(pairs, return_counts=True)
+    links = pd.DataFrame({
+        "source": position[pairs // len(counts)],
+        "target": position[pairs % len(counts)],
+        "sessions": link_counts,
+    })
+    return nodes, links
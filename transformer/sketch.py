@@ -0,0 +1,277 @@
+import numpy as np
+import pandas as pd
+
+from transformer.filters import FilterIndex
+
+# --- 📏 분위수 / 히스토그램 스케치 ---
+# 사용자별 값(첫 구매까지 걸린 일 수, 사용자별 매출)을 세그먼트(사용자 차원 조합)마다 고정 구간 히스토그램으로
+# 한 번만 집계해 둡니다. 같은 구간을 쓰는 스케치는 구간별 개수를 더하면 합쳐지므로(merge), 필터가 바뀌면
+# 사용자 행 대신 필터에 맞는 세그먼트의 개수 배열만 더해 평균 / 분위수 / 히스토그램을 계산합니다.
+#   - IntegerBins : 정수 값 하나가 구간 하나 (일 수 등). 분위수 / 최댓값 / 히스토그램이 원래 값과 정확히 같음
+#   - LogBins     : 상대 오차 alpha의 로그 구간 (DDSketch). 분위수의 상대 오차가 alpha 이하
+# 합계 / 최솟값 / 최댓값은 세그먼트마다 정확히 저장하므로 평균과 히스토그램 범위는 근사가 아닙니다.
+# 사용자 수 / 활성화 수처럼 더하기만 하면 되는 값은 세그먼트별 개수 표(SegmentCounts)로 같은 필터 규칙을 적용합니다.
+
+
+class IntegerBins:
+    """정수 값 구간: offset + i 값이 i번째 구간"""
+
+    def __init__(self, low, high):
+        self.offset = int(low)
+        self.n_bins = int(high) - int(low) + 1
+
+    @classmethod
+    def fit(cls, values):
+        return cls(values.min(), values.max()) if len(values) else cls(0, 0)
+
+    def index(self, values):
+        return values.astype(np.int64) - self.offset
+
+    def values(self):
+        """구간마다 대표 값"""
+        return np.arange(self.n_bins, dtype=np.float64) + self.offset
+
+
+class LogBins:
+    """로그 구간 (DDSketch): 값 v는 ceil(log_gamma(v))번째 구간, gamma = (1 + alpha) / (1 - alpha)
+
+    0 이하 값은 가장 작은 양수 구간에 넣습니다. (대표 값 대신 정확한 최솟값으로 범위를 잡으므로 히스토그램에는 영향이 작음)
+    """
+
+    def __init__(self, low_index, high_index, alpha):
+        self.alpha = alpha
+        self.log_gamma = np.log1p(2 * alpha / (1 - alpha))
+        self.offset = int(low_index)
+        self.n_bins = int(high_index) - int(low_index) + 1
+
+    @classmethod
+    def fit(cls, values, alpha=0.005):
+        log_gamma = np.log1p(2 * alpha / (1 - alpha))
+        positive = values[values > 0]
+        if not len(positive):
+            return cls(0, 0, alpha)
+        return cls(np.ceil(np.log(positive.min()) / log_gamma), np.ceil(np.log(positive.max()) / log_gamma), alpha)
+
+    def index(self, values):
+        raw = np.ceil(np.log(np.maximum(values, np.finfo(np.float64).tiny)) / self.log_gamma)
+        return np.clip(raw.astype(np.int64) - self.offset, 0, self.n_bins - 1)
+
+    def values(self):
+        gamma = np.exp(self.log_gamma)
+        return 2 * gamma ** (np.arange(self.n_bins) + self.offset) / (gamma + 1)
+
+
+class Sketch:
+    """합쳐진 스케치 하나 (구간별 개수, 합계, 최솟값, 최댓값)"""
+
+    def __init__(self, bins, counts, total, minimum, maximum):
+        self.bins = bins
+        self.counts = counts
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @property
+    def count(self):
+        return int(self.counts.sum())
+
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def quantile(self, q):
+        """pandas / numpy 기본(linear)과 같은 보간. 정수 구간이면 원래 값의 분위수와 같음"""
+        n = self.count
+        if n == 0:
+            return np.nan
+        position = (n - 1) * q
+        lower = int(np.floor(position))
+        below = np.searchsorted(np.cumsum(self.counts), [lower, min(lower + 1, n - 1)], side="right")
+        a, b = self.bins.values()[below]
+        a, b = np.clip([a, b], self.minimum, self.maximum)
+        t = position - lower
+        # numpy의 선형 보간과 같은 식 (t >= 0.5이면 위쪽 값 기준으로 계산)
+        return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+    def histogram(self, bins=20):
+        """np.histogram(values, bins)와 같은 형식의 (구간별 개수, 구간 경계). 범위는 정확한 최솟값 / 최댓값"""
+        if self.count == 0:
+            return np.histogram([], bins=bins)
+        low, high = float(self.minimum), float(self.maximum)
+        if low == high:
+            low, high = low - 0.5, high + 0.5
+        edges = np.linspace(low, high, bins + 1)
+        present = np.flatnonzero(self.counts)
+        values = np.clip(self.bins.values()[present], self.minimum, self.maximum)
+        counts, _ = np.histogram(values, bins=edges, weights=self.counts[present])
+        return counts.astype(np.int64), edges
+
+
+class SegmentSketches:
+    """세그먼트(차원 값 조합)별 스케치. merge(**필터)로 필터에 맞는 세그먼트를 합칩니다.
+
+    segments : 세그먼트별 차원 값 DataFrame (필터는 transformer.filters.FilterIndex와 같은 규칙, 결측은 목록에 결측이 있을 때만 통과)
+    counts   : (세그먼트 수, 구간 수) 개수 배열 / totals, minimums, maximums : 세그먼트별 합계, 최솟값, 최댓값
+    """
+
+    def __init__(self, bins, segments, counts, totals, minimums, maximums):
+        self.bins = bins
+        self.segments = segments
+        self.counts = counts
+        self.totals = totals
+        self.minimums = minimums
+        self.maximums = maximums
+        self.index = FilterIndex(segments, list(segments.columns))
+
+    @classmethod
+    def build(cls, rows, dimensions, values, bins):
+        """rows(행마다 차원 값)와 같은 길이의 values로 세그먼트별 스케치를 만듭니다. 결측 값은 넣지 않습니다."""
+        values = np.asarray(values, dtype=np.float64)
+        known = ~np.isnan(values)
+        rows, values = rows.loc[known, list(dimensions)], values[known]
+        segment = rows.groupby(list(dimensions), observed=True, dropna=False, sort=False).ngroup().to_numpy()
+        first = np.unique(segment, return_index=True)[1]
+        n_segments = len(first)
+
+        flat = segment * bins.n_bins + bins.index(values)
+        # 구간별 개수는 사용자 수라 int32로 충분 (세그먼트 x 구간 배열 메모리 절반)
+        counts = np.bincount(flat, minlength=n_segments * bins.n_bins).reshape(n_segments, bins.n_bins).astype(np.int32)
+        by_segment = pd.Series(values).groupby(segment)
+        return cls(bins, rows.iloc[first].reset_index(drop=True), counts,
+                   np.bincount(segment, weights=values, minlength=n_segments),
+                   by_segment.min().to_numpy(), by_segment.max().to_numpy())
+
+    def merge(self, **filters):
+        """필터에 맞는 세그먼트를 합친 Sketch. filters : {차원: 허용 값 목록 | 단일 값 | None(제한 없음)}"""
+        selected = np.flatnonzero(self.index.mask(**filters))
+        if not len(selected):
+            return Sketch(self.bins, np.zeros(self.bins.n_bins, dtype=np.int64), 0.0, np.nan, np.nan)
+        return Sketch(self.bins, self.counts[selected].sum(axis=0), float(self.totals[selected].sum()),
+                      self.minimums[selected].min(), self.maximums[selected].max())
+
+
+class SegmentCounts:
+    """세그먼트(차원 값 조합)별 개수 표. select(**필터)로 필터에 맞는 세그먼트 행만 고릅니다.
+
+    table : 세그먼트마다 한 행인 DataFrame (차원 컬럼 + 개수 컬럼). 필터 규칙은 SegmentSketches.merge와 같음
+    """
+
+    def __init__(self, table, dimensions):
+        self.table = table
+        self.dimensions = list(dimensions)
+        self.index = FilterIndex(table, self.dimensions)
+
+    @classmethod
+    def build(cls, rows, dimensions, counts):
+        """rows(행마다 차원 값)를 세그먼트로 묶어 센 표를 만듭니다.
+
+        counts : {개수 컬럼 이름: 행마다 더할 값 배열 (None이면 행 수)}
+        """
+        segment = rows.groupby(list(dimensions), observed=True, dropna=False, sort=False).ngroup().to_numpy()
+        first = np.unique(segment, return_index=True)[1]
+        table = rows[list(dimensions)].iloc[first].reset_index(drop=True)
+        for name, weights in counts.items():
+            table[name] = np.bincount(segment, weights=weights, minlength=len(first)).astype(np.int64)
+        return cls(table, dimensions)
+
+    def select(self, **filters):
+        """필터에 맞는 세그먼트 행 DataFrame. filters : {차원: 허용 값 목록 | 단일 값 | None(제한 없음)}"""
+        return self.table[self.index.mask(**filters)]
+
+
+USER_DIMENSIONS = ("gender", "age_group", "traffic_source")
+TTFP_DIMENSIONS = ("signup_month",) + USER_DIMENSIONS
+REVENUE_DIMENSIONS = ("month_key",) + USER_DIMENSIONS
+
+# 매출 스케치의 month_key 값: 전체 기간 사용자별 매출 (나머지 세그먼트는 그 달의 사용자별 매출)
+ALL_MONTHS = -1
+
+
+class DistributionSketches:
+    """Activation / Revenue 페이지의 세그먼트별 사전 집계 (사용자 행 대신 필터에 맞는 세그먼트만 합침).
+
+    ttfp       : 활성화 사용자의 첫 구매까지 걸린 일 수 (가입 월, 성별, 연령대, 유입 경로 세그먼트, 정수 구간)
+    activation : 세그먼트(가입 월, 성별, 연령대, 유입 경로)별 사용자 수(total_users) / 활성화 사용자 수(activated_users)
+    first_purchase_price      : 활성화 사용자의 첫 주문 상품 판매가 (TTFP와 같은 세그먼트, 로그 구간)
+    first_purchase_categories : 세그먼트 x 상품 카테고리별 첫 주문 상품 수(items)
+    revenue    : {주문 상태(None = 전체 상태): 사용자별 매출 (주문 월, 성별, 연령대, 유입 경로 세그먼트, 로그 구간)}
+                 주문 월이 ALL_MONTHS인 세그먼트는 전체 기간, 나머지는 그 달 안의 사용자별 매출.
+                 사용자별 합계는 상태별 / 월별 스케치를 더해 만들 수 없어 상태 전체 / 단일 상태, 기간 전체 / 한 달만 보관
+    revenue_months : 매출 스케치에 들어간 주문의 month_key 목록
+    """
+
+    def __init__(self, ttfp, activation, first_purchase_price, first_purchase_categories, revenue, revenue_months):
+        self.ttfp = ttfp
+        self.activation = activation
+        self.first_purchase_price = first_purchase_price
+        self.first_purchase_categories = first_purchase_categories
+        self.revenue = revenue
+        self.revenue_months = revenue_months
+        self.attrs = {}
+
+    def revenue_sketch(self, month_keys, status=None, **user_filters):
+        """기간(month_key 목록)과 주문 상태(None = 전체)에 맞는 사용자별 매출 Sketch. 스케치로 계산할 수 없으면 None
+
+        선택한 월 중 매출 스케치에 들어간 월이 전부이면 전체 기간, 한 달뿐이면 그 달의 세그먼트를 합칩니다.
+        """
+        if status not in self.revenue:
+            return None
+        months = set(self.revenue_months) & set(month_keys)
+        if months == set(self.revenue_months):
+            month = ALL_MONTHS
+        elif len(months) == 1:
+            month = months.pop()
+        else:
+            return None
+        return self.revenue[status].merge(month_key=month, **user_filters)
+
+    @classmethod
+    def build(cls, users, orders, products, order_items, foreign_keys, alpha=0.005):
+        """분석 모델의 users / orders / products / order_items와 order_items의 외래 키 위치(transformer.filters)로 만듭니다.
+
+        사용자별 매출은 order_items 필터(FilterIndex.rows)와 같이 주문 / 사용자 / 상품 행이 있는 주문 상품만 합칩니다.
+        """
+        activated_mask = users["activated"].to_numpy()
+        activated = users[activated_mask]
+        ttfp_days = activated["ttfp_days"].to_numpy(dtype=np.float64)
+        ttfp = SegmentSketches.build(activated, TTFP_DIMENSIONS, ttfp_days,
+                                     IntegerBins.fit(ttfp_days[~np.isnan(ttfp_days)]))
+        activation = SegmentCounts.build(users, TTFP_DIMENSIONS,
+                                         {"total_users": None, "activated_users": activated_mask})
+
+        # 첫 구매 상품: order_id가 활성화 사용자의 first_order_id인 주문 상품 (그 사용자의 세그먼트로 집계)
+        first_order = users["first_order_id"].to_numpy(dtype=np.float64)
+        buyers = np.flatnonzero(activated_mask & ~np.isnan(first_order))
+        owner = pd.Index(first_order[buyers]).get_indexer(order_items["order_id"].to_numpy(dtype=np.float64))
+        first_items = np.flatnonzero(owner >= 0)
+        first_rows = users.iloc[buyers[owner[first_items]]].reset_index(drop=True)
+        first_price = order_items["sale_price"].to_numpy(dtype=np.float64)[first_items]
+        first_purchase_price = SegmentSketches.build(first_rows, TTFP_DIMENSIONS, first_price,
+                                                     LogBins.fit(first_price[~np.isnan(first_price)], alpha))
+        category = np.append(products["category"].to_numpy(dtype=object), None)[
+            foreign_keys["products"][first_items]]
+        first_purchase_categories = SegmentCounts.build(first_rows.assign(category=category),
+                                                        TTFP_DIMENSIONS + ("category",), {"items": None})
+
+        order_pos, user_pos, product_pos = (foreign_keys[table] for table in ("orders", "users", "products"))
+        valid = (order_pos >= 0) & (user_pos >= 0) & (product_pos >= 0)
+        user_pos, price = user_pos[valid], order_items["sale_price"].to_numpy(dtype=np.float64)[valid]
+        status = orders["status"].to_numpy()[order_pos[valid]]
+        months, month_code = np.unique(orders["month_key"].to_numpy()[order_pos[valid]], return_inverse=True)
+        n_months = max(len(months), 1)
+        user_dims = users[list(USER_DIMENSIONS)]
+        revenue = {}
+        for scope in [None, *orders["status"].dropna().unique()]:
+            selected = slice(None) if scope is None else status == scope
+            # 전체 기간 사용자별 매출 (month_key = ALL_MONTHS)
+            items = np.bincount(user_pos[selected], minlength=len(users))
+            per_user = np.bincount(user_pos[selected], weights=price[selected], minlength=len(users))
+            buyers = np.flatnonzero(items)
+            # 월별 사용자별 매출: (사용자, 월) 쌍마다 한 행
+            pairs, pair_code = np.unique(user_pos[selected] * n_months + month_code[selected], return_inverse=True)
+            per_pair = np.bincount(pair_code, weights=price[selected], minlength=len(pairs))
+            rows = pd.concat([user_dims.iloc[buyers].assign(month_key=ALL_MONTHS),
+                              user_dims.iloc[pairs // n_months].assign(month_key=months[pairs % n_months])],
+                             ignore_index=True)
+            values = np.concatenate([per_user[buyers], per_pair])
+            revenue[scope] = SegmentSketches.build(rows, REVENUE_DIMENSIONS, values, LogBins.fit(values, alpha))
+        return cls(ttfp, activation, first_purchase_price, first_purchase_categories, revenue, months.tolist())
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+# --- ⏱️ 시간 정렬 인덱스 ---
+# 팩트 테이블(events, orders, order_items)은 로딩할 때 created_at 순으로 한 번 정렬해 두고 df.attrs에 표시합니다.
+# 날짜 / 월 범위는 created_at의 int64 epoch(UTC 나노초) 배열에서 searchsorted 두 번으로 [lo, hi) 행 위치를 찾고
+# df.iloc[lo:hi]로 잘라내므로, 전체 컬럼 비교나 타임스탬프 문자열 변환 없이 O(log n)이며 행을 복사하지 않습니다.
+# 결측(NaT)은 int64 최솟값이므로 맨 앞에 두어 epoch 배열이 전체적으로 정렬된 상태를 유지합니다.
+
+SORTED_ATTR = "sorted_by"
+
+
+def sort_by_time(df, column="created_at"):
+    """column 순으로 (안정) 정렬하고 정렬 표시를 붙여 반환합니다. 이미 정렬되어 있으면 복사하지 않습니다."""
+    epoch = _epoch(df[column])
+    if len(epoch) > 1 and not (epoch[1:] >= epoch[:-1]).all():
+        df = df.iloc[np.argsort(epoch, kind="stable")].reset_index(drop=True)
+    df.attrs[SORTED_ATTR] = column
+    return df
+
+
+def is_time_sorted(df, column="created_at"):
+    return df.attrs.get(SORTED_ATTR) == column
+
+
+def _epoch(values):
+    """datetime 컬럼의 int64 epoch(UTC 나노초) 배열 (tz가 있는 컬럼은 복사 없이 내부 배열을 그대로 봄)"""
+    return values.array.asi8
+
+
+def _epoch_value(when):
+    when = pd.Timestamp(when)
+    return (when if when.tzinfo is not None else when.tz_localize("UTC")).value
+
+
+def time_bounds(df, start, end, column="created_at"):
+    """created_at이 [start, end)인 행 위치 범위 (lo, hi). df는 sort_by_time으로 정렬되어 있어야 합니다."""
+    epoch = _epoch(df[column])
+    lo, hi = np.searchsorted(epoch, [_epoch_value(start), _epoch_value(end)], side="left")
+    return int(lo), int(max(lo, hi))
+
+
+def time_slice(df, start, end, column="created_at"):
+    """created_at이 [start, end)인 행. 정렬된 테이블이면 searchsorted 슬라이스(뷰), 아니면 불리언 마스크"""
+    if not is_time_sorted(df, column):
+        epoch = _epoch(df[column])
+        return df[(epoch >= _epoch_value(start)) & (epoch < _epoch_value(end))]
+    lo, hi = time_bounds(df, start, end, column)
+    return df.iloc[lo:hi]
+
+
+def time_range(df, column="created_at"):
+    """(가장 이른 시각, 가장 늦은 시각). 정렬된 테이블이면 양 끝 행만 봅니다."""
+    values = df[column]
+    if not is_time_sorted(df, column) or len(values) == 0:
+        return values.min(), values.max()
+    n_missing = int(np.searchsorted(_epoch(values), np.iinfo(np.int64).min, side="right"))
+    if n_missing == len(values):
+        return pd.NaT, pd.NaT
+    return values.iloc[n_missing], values.iloc[-1]
+
+
+def months_present(df, column="created_at"):
+    """행이 있는 월('YYYY-MM') 목록. 정렬된 테이블이면 월마다 searchsorted로 확인 (타임스탬프 문자열 변환 없음)"""
+    first, last = time_range(df, column)
+    if pd.isna(first):
+        return []
+    if not is_time_sorted(df, column):
+        return sorted(df[column].dt.to_period("M").astype(str).unique())
+    months = pd.period_range(first.tz_convert(None).to_period("M"), last.tz_convert(None).to_period("M"), freq="M")
+    starts = months.start_time.tz_localize("UTC").asi8
+    ends = (months + 1).start_time.tz_localize("UTC").asi8
+    epoch = _epoch(df[column])
+    present = np.searchsorted(epoch, ends, side="left") > np.searchsorted(epoch, starts, side="left")
+    return [str(month) for month in months[present]]
@@ -0,0 +1,66 @@
+import hashlib
+
+import pandas as pd
+
+# --- 🏷️ 데이터셋 버전 / 캐시 키 ---
+# @st.cache_data는 인자로 받은 DataFrame 내용을 매번 해시합니다. (수백만 행이면 rerun마다 수 초)
+# 로딩 시점에 테이블마다 가벼운 버전 ID를 붙여 두고, 차트 함수는 DataFrame 인자를 `_`로 시작하는
+# 이름으로 받아 해시에서 제외한 뒤 (데이터셋 버전, 필터 값)으로 만든 cache_key로만 캐시를 찾습니다.
+
+VERSION_ATTR = "dataset_version"
+# 파일 내용이 바뀌어도(행 추가 등) 그대로인 원본 식별자 (데이터 폴더 / 테이블 / 분석 기간). 증분 상태 파일 이름 등에 사용
+SOURCE_ATTR = "dataset_source"
+
+
+def _digest(*parts):
+    return hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=8).hexdigest()
+
+
+def stamp_version(df, *parts):
+    """df.attrs에 버전 ID를 기록하고 df를 반환합니다. (필터링/복사 시에도 attrs는 유지됨)"""
+    df.attrs[VERSION_ATTR] = _digest(*parts)
+    return df
+
+
+def stamp_source(df, *parts):
+    """df.attrs에 원본 식별자를 기록하고 df를 반환합니다."""
+    df.attrs[SOURCE_ATTR] = _digest(*parts)
+    return df
+
+
+def dataset_source(df):
+    """stamp_source로 기록한 원본 식별자를 반환합니다. 없으면 None"""
+    return df.attrs.get(SOURCE_ATTR)
+
+
+def dataset_version(*frames):
+    """여러 테이블의 버전 ID를 합친 값을 반환합니다.
+
+    버전이 없는 프레임(merge 결과 등)은 내용 전체를 해시하므로, 가능하면 원본 테이블을 넘기세요.
+    """
+    versions = []
+    for df in frames:
+        version = df.attrs.get(VERSION_ATTR)
+        if version is None:
+            version = _digest(len(df), pd.util.hash_pandas_object(df, index=True).sum())
+        versions.append(version)
+    return _digest(*versions)
+
+
+def cache_key(*frames, **params):
+    """(데이터셋 버전, 필터 값) 형태의 차트 캐시 키를 만듭니다.
+
+    frames : 차트에 넘기는 데이터가 만들어진 원본 테이블들
+    params : 그 데이터를 만들 때 사용한 필터 값 (리스트/집합은 튜플로 바뀌어 저장됨)
+
+    차트 함수(charts/)의 DataFrame / 인덱스 인자는 `_`로 시작해 캐시 해시에서 제외하고, 이 키를 cache_key 인자로 받아
+    캐시를 구분합니다. (필터링된 DataFrame 내용을 rerun마다 해시하지 않음)
+    """
+    items = []
+    for name, value in sorted(params.items()):
+        if isinstance(value, (set, frozenset)):
+            value = tuple(sorted(value, key=repr))
+        elif isinstance(value, list):
+            value = tuple(value)
+        items.append((name, value))
+    return (dataset_version(*frames), tuple(items))